@@ -0,0 +1,38 @@
+"""Add route driver/status and route stop order indexes
+
+Revision ID: 002_add_route_driver_status_indexes
+Revises: 001_add_product_and_orderitem_models
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '002_add_route_driver_status_indexes'
+down_revision: Union[str, Sequence[str], None] = '001_add_product_and_orderitem_models'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction on PostgreSQL
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_route_driver_status', 'routes', ['driver_id', 'status'],
+            unique=False, postgresql_concurrently=True
+        )
+        op.create_index(
+            op.f('ix_route_stops_order_id'), 'route_stops', ['order_id'],
+            unique=False, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_route_stops_order_id'), table_name='route_stops', postgresql_concurrently=True)
+        op.drop_index('ix_route_driver_status', table_name='routes', postgresql_concurrently=True)
@@ -0,0 +1,52 @@
+"""Add denormalized route aggregates to drivers
+
+Revision ID: 003_add_driver_route_aggregates
+Revises: 002_add_route_driver_status_indexes
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '003_add_driver_route_aggregates'
+down_revision: Union[str, Sequence[str], None] = '002_add_route_driver_status_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('drivers', sa.Column('active_routes_count', sa.Integer(), nullable=True, server_default=sa.text('0')))
+    op.add_column('drivers', sa.Column('active_total_duration', sa.Integer(), nullable=True, server_default=sa.text('0')))
+    op.add_column('drivers', sa.Column('completed_routes', sa.Integer(), nullable=True, server_default=sa.text('0')))
+    
+    # Backfill from existing routes; afterwards Route mapper events keep the counters current
+    op.execute(
+        """
+        UPDATE drivers SET
+            active_routes_count = (
+                SELECT COUNT(*) FROM routes
+                WHERE routes.driver_id = drivers.id AND routes.status IN ('PLANNED', 'ACTIVE')
+            ),
+            active_total_duration = (
+                SELECT COALESCE(SUM(routes.total_duration), 0) FROM routes
+                WHERE routes.driver_id = drivers.id AND routes.status IN ('PLANNED', 'ACTIVE')
+            ),
+            completed_routes = (
+                SELECT COUNT(*) FROM routes
+                WHERE routes.driver_id = drivers.id AND routes.status = 'COMPLETED'
+            )
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('drivers') as batch_op:
+        batch_op.drop_column('completed_routes')
+        batch_op.drop_column('active_total_duration')
+        batch_op.drop_column('active_routes_count')
@@ -0,0 +1,43 @@
+"""Add partial indexes for active routes and unnotified events
+
+Revision ID: 004_add_monitoring_partial_indexes
+Revises: 003_add_driver_route_aggregates
+Create Date: 2026-10-16 18:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '004_add_monitoring_partial_indexes'
+down_revision: Union[str, Sequence[str], None] = '003_add_driver_route_aggregates'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction on PostgreSQL
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_routes_active', 'routes', ['id'],
+            unique=False, postgresql_concurrently=True,
+            postgresql_where=sa.text("status = 'ACTIVE'"),
+            sqlite_where=sa.text("status = 'ACTIVE'")
+        )
+        op.create_index(
+            'ix_events_unnotified', 'events', ['id'],
+            unique=False, postgresql_concurrently=True,
+            postgresql_where=sa.text('notifications_sent = false'),
+            sqlite_where=sa.text('notifications_sent = 0')
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_events_unnotified', table_name='events', postgresql_concurrently=True)
+        op.drop_index('ix_routes_active', table_name='routes', postgresql_concurrently=True)
@@ -0,0 +1,34 @@
+"""Add status indexes for orders, vehicles and drivers
+
+Revision ID: 005_add_status_indexes
+Revises: 004_add_monitoring_partial_indexes
+Create Date: 2026-10-16 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '005_add_status_indexes'
+down_revision: Union[str, Sequence[str], None] = '004_add_monitoring_partial_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction on PostgreSQL
+    with op.get_context().autocommit_block():
+        op.create_index('ix_orders_status', 'orders', ['status'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_vehicles_status', 'vehicles', ['status'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_drivers_status', 'drivers', ['status'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_drivers_status', table_name='drivers', postgresql_concurrently=True)
+        op.drop_index('ix_vehicles_status', table_name='vehicles', postgresql_concurrently=True)
+        op.drop_index('ix_orders_status', table_name='orders', postgresql_concurrently=True)
@@ -0,0 +1,82 @@
+"""Store HH:MM time columns as minutes since midnight
+
+Revision ID: 006_store_times_as_minutes
+Revises: 005_add_status_indexes
+Create Date: 2026-10-16 19:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '006_store_times_as_minutes'
+down_revision: Union[str, Sequence[str], None] = '005_add_status_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TIME_COLUMNS = {
+    'customers': (
+        'preferred_delivery_start', 'preferred_delivery_end',
+        'actual_working_hours_start', 'actual_working_hours_end',
+        'lunch_break_start', 'lunch_break_end',
+    ),
+    'drivers': ('shift_start_time', 'shift_end_time'),
+}
+
+
+def _to_minutes(value):
+    if not value:
+        return None
+    try:
+        hours, minutes = value.split(':')[:2]
+        return int(hours) * 60 + int(minutes)
+    except ValueError:
+        return None
+
+
+def _to_hhmm(value):
+    if value is None:
+        return None
+    return f"{value // 60:02d}:{value % 60:02d}"
+
+
+def _convert(table_name: str, columns: Sequence[str], new_type, convert) -> None:
+    """Add *_tmp columns, copy converted values, then swap them in place of the originals"""
+    bind = op.get_bind()
+    # Some databases were created before the extended customer time columns existed
+    existing = {c['name'] for c in sa.inspect(bind).get_columns(table_name)}
+    columns = [c for c in columns if c in existing]
+    if not columns:
+        return
+
+    for column in columns:
+        op.add_column(table_name, sa.Column(f'{column}_tmp', new_type, nullable=True))
+
+    table = sa.table(table_name, sa.column('id'), *(sa.column(c) for c in columns),
+                     *(sa.column(f'{c}_tmp') for c in columns))
+    rows = bind.execute(sa.select(table.c.id, *(table.c[c] for c in columns))).all()
+    for row in rows:
+        values = {f'{c}_tmp': convert(row[i + 1]) for i, c in enumerate(columns)}
+        if any(v is not None for v in values.values()):
+            bind.execute(table.update().where(table.c.id == row[0]).values(**values))
+
+    with op.batch_alter_table(table_name) as batch_op:
+        for column in columns:
+            batch_op.drop_column(column)
+            batch_op.alter_column(f'{column}_tmp', new_column_name=column)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table_name, columns in TIME_COLUMNS.items():
+        _convert(table_name, columns, sa.SmallInteger(), _to_minutes)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name, columns in TIME_COLUMNS.items():
+        _convert(table_name, columns, sa.String(length=5), _to_hhmm)
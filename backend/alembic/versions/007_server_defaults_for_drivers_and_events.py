@@ -0,0 +1,77 @@
+"""Move literal column defaults of drivers and events to the database
+
+Revision ID: 007_server_defaults_for_drivers_and_events
+Revises: 006_store_times_as_minutes
+Create Date: 2026-10-16 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '007_server_defaults_for_drivers_and_events'
+down_revision: Union[str, Sequence[str], None] = '006_store_times_as_minutes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SERVER_DEFAULTS = {
+    'drivers': {
+        'experience_level': sa.text("'JUNIOR'"),
+        'years_of_experience': sa.text('0.0'),
+        'max_stops_per_route': sa.text('15'),
+        'max_working_hours': sa.text('8'),
+        'status': sa.text("'OFF_DUTY'"),
+        'average_delivery_time': sa.text('0.0'),
+        'on_time_delivery_rate': sa.text('0.0'),
+        'customer_rating': sa.text('5.0'),
+        'total_deliveries': sa.text('0'),
+        'active_routes_count': sa.text('0'),
+        'active_total_duration': sa.text('0'),
+        'completed_routes': sa.text('0'),
+        'can_handle_fragile': sa.true(),
+        'can_handle_high_value': sa.false(),
+        'specialization': sa.text("'Стандартная доставка'"),
+        'can_work_nights': sa.false(),
+        'can_work_weekends': sa.true(),
+    },
+    'events': {
+        'severity': sa.text("'MEDIUM'"),
+        'status': sa.text("'ACTIVE'"),
+        'estimated_delay_minutes': sa.text('0'),
+        'affected_orders_count': sa.text('0'),
+        'cost_impact': sa.text('0.0'),
+        'triggers_reoptimization': sa.false(),
+        'reoptimization_threshold_exceeded': sa.false(),
+        'notifications_sent': sa.false(),
+    },
+}
+
+
+def _set_defaults(use_defaults: bool) -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for table_name, defaults in SERVER_DEFAULTS.items():
+        # Older databases may lack some of these columns
+        existing = {c['name']: c['type'] for c in inspector.get_columns(table_name)}
+        with op.batch_alter_table(table_name) as batch_op:
+            for column, default in defaults.items():
+                if column in existing:
+                    batch_op.alter_column(
+                        column,
+                        existing_type=existing[column],
+                        server_default=default if use_defaults else None
+                    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _set_defaults(True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _set_defaults(False)
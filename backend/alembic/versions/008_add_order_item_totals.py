@@ -0,0 +1,58 @@
+"""Add denormalized order item totals to orders
+
+Revision ID: 008_add_order_item_totals
+Revises: 007_server_defaults_for_drivers_and_events
+Create Date: 2026-10-16 20:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '008_add_order_item_totals'
+down_revision: Union[str, Sequence[str], None] = '007_server_defaults_for_drivers_and_events'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('orders', sa.Column('total_value', sa.Float(), nullable=True, server_default=sa.text('0')))
+    op.add_column('orders', sa.Column('total_weight', sa.Float(), nullable=True, server_default=sa.text('0')))
+    op.add_column('orders', sa.Column('total_volume', sa.Float(), nullable=True, server_default=sa.text('0')))
+    op.add_column('orders', sa.Column('total_items', sa.Integer(), nullable=True, server_default=sa.text('0')))
+    
+    # Backfill from existing items; afterwards OrderItem mapper events keep the totals current
+    op.execute(
+        """
+        UPDATE orders SET
+            total_value = (
+                SELECT COALESCE(SUM(order_items.final_price), 0) FROM order_items
+                WHERE order_items.order_id = orders.id
+            ),
+            total_weight = (
+                SELECT COALESCE(SUM(order_items.product_weight * order_items.quantity), 0) FROM order_items
+                WHERE order_items.order_id = orders.id
+            ),
+            total_volume = (
+                SELECT COALESCE(SUM(order_items.product_volume * order_items.quantity), 0) FROM order_items
+                WHERE order_items.order_id = orders.id
+            ),
+            total_items = (
+                SELECT COALESCE(SUM(order_items.quantity), 0) FROM order_items
+                WHERE order_items.order_id = orders.id
+            )
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.drop_column('total_items')
+        batch_op.drop_column('total_volume')
+        batch_op.drop_column('total_weight')
+        batch_op.drop_column('total_value')
@@ -0,0 +1,33 @@
+"""Replace order_items.order_id index with (order_id, product_id)
+
+Revision ID: 009_order_items_composite_index
+Revises: 008_add_order_item_totals
+Create Date: 2026-10-16 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '009_order_items_composite_index'
+down_revision: Union[str, Sequence[str], None] = '008_add_order_item_totals'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction on PostgreSQL
+    with op.get_context().autocommit_block():
+        op.create_index('ix_order_items_order_product', 'order_items', ['order_id', 'product_id'], unique=False, postgresql_concurrently=True)
+        # The composite index covers order_id lookups on its leading column
+        op.drop_index('ix_order_items_order_id', table_name='order_items', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_order_items_order_id', 'order_items', ['order_id'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_order_items_order_product', table_name='order_items', postgresql_concurrently=True)
@@ -0,0 +1,137 @@
+"""Store order, vehicle, route, stop and product enums as SMALLINT ordinals
+
+Revision ID: 010_store_enums_as_smallint
+Revises: 009_order_items_composite_index
+Create Date: 2026-10-16 21:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '010_store_enums_as_smallint'
+down_revision: Union[str, Sequence[str], None] = '009_order_items_composite_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Member names in definition order (the ordinal is the position), native type name,
+# NOT NULL flag and the fallback member for values that are not members any more
+ENUM_COLUMNS = {
+    'orders': {
+        'status': (('PENDING', 'ASSIGNED', 'IN_TRANSIT', 'DELIVERED', 'FAILED', 'CANCELLED'),
+                   'orderstatus', False, None),
+        'priority': (('LOW', 'MEDIUM', 'HIGH', 'URGENT'), 'orderpriority', False, None),
+    },
+    'vehicles': {
+        'vehicle_type': (('VAN', 'TRUCK', 'MOTORCYCLE', 'CAR'), 'vehicletype', True, 'VAN'),
+        'status': (('AVAILABLE', 'IN_USE', 'MAINTENANCE', 'OUT_OF_SERVICE'), 'vehiclestatus', False, None),
+    },
+    'routes': {
+        'optimization_type': (('STATIC', 'ADAPTIVE', 'MANUAL'), 'optimizationtype', False, None),
+        'status': (('PLANNED', 'ACTIVE', 'COMPLETED', 'CANCELLED', 'OPTIMIZING'), 'routestatus', False, None),
+    },
+    'route_stops': {
+        'stop_type': (('DEPOT', 'DELIVERY', 'PICKUP', 'BREAK'), 'stoptype', False, None),
+        'status': (('PENDING', 'APPROACHING', 'ARRIVED', 'IN_PROGRESS', 'COMPLETED', 'FAILED', 'SKIPPED'),
+                   'stopstatus', False, None),
+    },
+    'products': {
+        'category': (('ELECTRONICS', 'CLOTHING', 'FOOD', 'BOOKS', 'HOME_GARDEN', 'SPORTS', 'AUTOMOTIVE',
+                      'HEALTH_BEAUTY', 'TOYS', 'OTHER'), 'productcategory', True, 'OTHER'),
+        'condition': (('NEW', 'USED', 'REFURBISHED'), 'productcondition', False, None),
+    },
+}
+
+# The partial index predicate compares routes.status with a literal
+ROUTES_ACTIVE_WHERE = {True: 'status = 1', False: "status = 'ACTIVE'"}
+
+
+def _to_ordinal(names, fallback):
+    ordinals = {name: i for i, name in enumerate(names)}
+    # Rows may hold member values ("active") written by code that assigned enum .value
+    ordinals.update({name.lower(): i for i, name in enumerate(names)})
+    default = ordinals.get(fallback)
+    return lambda value: ordinals.get(value, default) if value is not None else None
+
+
+def _to_name(names, fallback):
+    return lambda value: names[value] if value is not None and 0 <= value < len(names) else fallback
+
+
+def _convert_table(table_name: str, columns: dict, to_ordinals: bool) -> None:
+    """Swap enum columns for converted *_tmp copies, keeping their plain indexes"""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing = {c['name'] for c in inspector.get_columns(table_name)}
+    columns = {c: spec for c, spec in columns.items() if c in existing}
+    if not columns:
+        return
+
+    indexes = [ix for ix in inspector.get_indexes(table_name)
+               if set(ix['column_names']) & set(columns)]
+    for ix in indexes:
+        op.drop_index(ix['name'], table_name=table_name)
+
+    is_postgresql = bind.dialect.name == 'postgresql'
+    for column, (names, type_name, _, _) in columns.items():
+        if to_ordinals:
+            new_type = sa.SmallInteger()
+        else:
+            new_type = sa.Enum(*names, name=type_name)
+            if is_postgresql:
+                new_type.create(bind, checkfirst=True)
+        op.add_column(table_name, sa.Column(f'{column}_tmp', new_type, nullable=True))
+
+    converters = {
+        column: (_to_ordinal if to_ordinals else _to_name)(names, fallback)
+        for column, (names, _, _, fallback) in columns.items()
+    }
+    table = sa.table(table_name, sa.column('id'), *(sa.column(c) for c in columns),
+                     *(sa.column(f'{c}_tmp') for c in columns))
+    rows = bind.execute(sa.select(table.c.id, *(table.c[c] for c in columns))).all()
+    for row in rows:
+        values = {f'{c}_tmp': converters[c](row[i + 1]) for i, c in enumerate(columns)}
+        if any(v is not None for v in values.values()):
+            bind.execute(table.update().where(table.c.id == row[0]).values(**values))
+
+    with op.batch_alter_table(table_name) as batch_op:
+        for column, (_, _, not_null, _) in columns.items():
+            batch_op.drop_column(column)
+            batch_op.alter_column(f'{column}_tmp', new_column_name=column, nullable=not not_null)
+
+    if to_ordinals and is_postgresql:
+        for _, type_name, _, _ in columns.values():
+            sa.Enum(name=type_name).drop(bind, checkfirst=True)
+
+    for ix in indexes:
+        op.create_index(ix['name'], table_name, ix['column_names'], unique=bool(ix['unique']))
+
+
+def _convert(to_ordinals: bool) -> None:
+    routes_active = 'ix_routes_active' in {
+        ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes('routes')
+    }
+    if routes_active:
+        op.drop_index('ix_routes_active', table_name='routes')
+
+    for table_name, columns in ENUM_COLUMNS.items():
+        _convert_table(table_name, columns, to_ordinals)
+
+    if routes_active:
+        where = sa.text(ROUTES_ACTIVE_WHERE[to_ordinals])
+        op.create_index('ix_routes_active', 'routes', ['id'], unique=False,
+                        postgresql_where=where, sqlite_where=where)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _convert(True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _convert(False)
@@ -0,0 +1,51 @@
+"""Add stored generated volume/weight columns to products and order_items
+
+Revision ID: 011_add_generated_volume_columns
+Revises: 010_store_enums_as_smallint
+Create Date: 2026-10-16 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '011_add_generated_volume_columns'
+down_revision: Union[str, Sequence[str], None] = '010_store_enums_as_smallint'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+GENERATED_COLUMNS = {
+    'products': {
+        'volume_m3': 'length * width * height / 1000000.0',
+    },
+    'order_items': {
+        'total_weight': 'product_weight * quantity',
+        'total_volume': 'product_volume * quantity',
+    },
+}
+
+
+def _batch_alter_table(table_name: str):
+    # SQLite cannot ALTER TABLE ADD a STORED generated column, so the table is rebuilt there
+    recreate = 'always' if op.get_bind().dialect.name == 'sqlite' else 'auto'
+    return op.batch_alter_table(table_name, recreate=recreate)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table_name, columns in GENERATED_COLUMNS.items():
+        with _batch_alter_table(table_name) as batch_op:
+            for column, expression in columns.items():
+                batch_op.add_column(sa.Column(column, sa.Float(), sa.Computed(expression, persisted=True)))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name, columns in GENERATED_COLUMNS.items():
+        with _batch_alter_table(table_name) as batch_op:
+            for column in columns:
+                batch_op.drop_column(column)
@@ -0,0 +1,53 @@
+"""Add epoch-second mirrors of the order time window
+
+Revision ID: 012_add_order_time_window_epochs
+Revises: 011_add_generated_volume_columns
+Create Date: 2026-10-16 22:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '012_add_order_time_window_epochs'
+down_revision: Union[str, Sequence[str], None] = '011_add_generated_volume_columns'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+EPOCH_COLUMNS = {
+    'time_window_start_epoch': 'time_window_start',
+    'time_window_end_epoch': 'time_window_end',
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column in EPOCH_COLUMNS:
+        op.add_column('orders', sa.Column(column, sa.BigInteger(), nullable=True))
+
+    # Backfill with datetime.timestamp(), exactly as the ORM derives new values
+    bind = op.get_bind()
+    orders = sa.table(
+        'orders', sa.column('id'),
+        *(sa.column(source, sa.DateTime(timezone=True)) for source in EPOCH_COLUMNS.values()),
+        *(sa.column(column) for column in EPOCH_COLUMNS)
+    )
+    rows = bind.execute(sa.select(orders.c.id, *(orders.c[s] for s in EPOCH_COLUMNS.values()))).all()
+    for row in rows:
+        values = {
+            column: int(value.timestamp())
+            for column, value in zip(EPOCH_COLUMNS, row[1:]) if value is not None
+        }
+        if values:
+            bind.execute(orders.update().where(orders.c.id == row[0]).values(**values))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('orders') as batch_op:
+        for column in EPOCH_COLUMNS:
+            batch_op.drop_column(column)
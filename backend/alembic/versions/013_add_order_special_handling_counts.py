@@ -0,0 +1,53 @@
+"""Add fragile / temperature-controlled item counts to orders
+
+Revision ID: 013_add_order_special_handling_counts
+Revises: 012_add_order_time_window_epochs
+Create Date: 2026-10-16 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '013_add_order_special_handling_counts'
+down_revision: Union[str, Sequence[str], None] = '012_add_order_time_window_epochs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('orders', sa.Column('fragile_items', sa.Integer(), nullable=True, server_default=sa.text('0')))
+    op.add_column('orders', sa.Column('temperature_controlled_items', sa.Integer(), nullable=True, server_default=sa.text('0')))
+    
+    # Backfill from existing items; afterwards OrderItem mapper events keep the counts current
+    op.execute(
+        """
+        UPDATE orders SET
+            fragile_items = (
+                SELECT COUNT(*) FROM order_items
+                WHERE order_items.order_id = orders.id AND order_items.fragile
+            ),
+            temperature_controlled_items = (
+                SELECT COUNT(*) FROM order_items
+                WHERE order_items.order_id = orders.id AND order_items.temperature_controlled
+            )
+        """
+    )
+    
+    with op.get_context().autocommit_block():
+        op.create_index('ix_orders_fragile_items', 'orders', ['fragile_items'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_orders_temperature_controlled_items', 'orders', ['temperature_controlled_items'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_orders_temperature_controlled_items', table_name='orders', postgresql_concurrently=True)
+        op.drop_index('ix_orders_fragile_items', table_name='orders', postgresql_concurrently=True)
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.drop_column('temperature_controlled_items')
+        batch_op.drop_column('fragile_items')
@@ -0,0 +1,42 @@
+"""Add partial status indexes over active orders, open stops and available vehicles
+
+Revision ID: 014_add_active_status_partial_indexes
+Revises: 013_add_order_special_handling_counts
+Create Date: 2026-10-16 23:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '014_add_active_status_partial_indexes'
+down_revision: Union[str, Sequence[str], None] = '013_add_order_special_handling_counts'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Status ordinals as stored since 010_store_enums_as_smallint
+PARTIAL_INDEXES = {
+    'ix_orders_active_status': ('orders', 'status IN (0, 1, 2)'),  # pending, assigned, in_transit
+    'ix_route_stops_open_status': ('route_stops', 'status IN (0, 1, 3)'),  # pending, approaching, in_progress
+    'ix_vehicles_available_status': ('vehicles', 'status IN (0)'),  # available
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction on PostgreSQL
+    with op.get_context().autocommit_block():
+        for index_name, (table_name, where) in PARTIAL_INDEXES.items():
+            op.create_index(index_name, table_name, ['status'], unique=False, postgresql_concurrently=True,
+                            postgresql_where=sa.text(where), sqlite_where=sa.text(where))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for index_name, (table_name, _) in PARTIAL_INDEXES.items():
+            op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True)
@@ -0,0 +1,37 @@
+"""Store route waypoints as JSON (JSONB on PostgreSQL)
+
+Revision ID: 015_store_route_waypoints_as_json
+Revises: 014_add_active_status_partial_indexes
+Create Date: 2026-10-16 23:45:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '015_store_route_waypoints_as_json'
+down_revision: Union[str, Sequence[str], None] = '014_add_active_status_partial_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+WAYPOINTS_JSON = sa.JSON().with_variant(postgresql.JSONB(), 'postgresql')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing values are already JSON text; SQLite keeps storing JSON as TEXT
+    with op.batch_alter_table('routes') as batch_op:
+        batch_op.alter_column('waypoints', existing_type=sa.Text(), type_=WAYPOINTS_JSON,
+                              existing_nullable=True, postgresql_using='waypoints::jsonb')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('routes') as batch_op:
+        batch_op.alter_column('waypoints', existing_type=WAYPOINTS_JSON, type_=sa.Text(),
+                              existing_nullable=True, postgresql_using='waypoints::text')
@@ -0,0 +1,30 @@
+"""Add composite (route_id, stop_sequence) index on route_stops
+
+Revision ID: 016_route_stops_route_sequence_index
+Revises: 015_store_route_waypoints_as_json
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '016_route_stops_route_sequence_index'
+down_revision: Union[str, Sequence[str], None] = '015_store_route_waypoints_as_json'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction on PostgreSQL
+    with op.get_context().autocommit_block():
+        op.create_index('ix_route_stops_route_seq', 'route_stops', ['route_id', 'stop_sequence'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_route_stops_route_seq', table_name='route_stops', postgresql_concurrently=True)
@@ -1,12 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, undefer
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date
 import logging
 
+from app.core.config import settings
 from app.database import get_db
 from app.models import Route, Order, Vehicle, Driver, Customer, RouteStop, Event
+from app.models.route import RouteStatus
+from app.models.vehicle import VehicleStatus, VehicleType
 from app.optimization.vrptw_solver import VRPTWSolver
 from app.optimization.adaptive_optimizer import AdaptiveOptimizer
 from app.optimization.eta_predictor import ETAPredictor
@@ -22,7 +26,10 @@ logger = logging.getLogger(__name__)
 # Initialize services
 vrptw_solver = VRPTWSolver()
 eta_predictor = ETAPredictor()
-adaptive_optimizer = AdaptiveOptimizer(vrptw_solver, eta_predictor)
+# Real traffic for route monitoring needs the Yandex API key; without it traffic is simulated.
+# Its pooled HTTP session is closed on application shutdown (main.py lifespan)
+maps_service = YandexMapsService() if settings.yandex_maps_api_key else None
+adaptive_optimizer = AdaptiveOptimizer(vrptw_solver, eta_predictor, maps_service=maps_service)
 
 router = APIRouter(tags=["VRPTW System"])
 
@@ -134,8 +141,9 @@ async def optimize_routes(
         if not drivers:
             raise HTTPException(status_code=400, detail="No valid drivers found")
         
-        # Solve VRPTW
-        solution = vrptw_solver.solve_vrptw(
+        # Solve VRPTW in a worker thread: the solve and its Redis cache lookups block
+        solution = await run_in_threadpool(
+            vrptw_solver.solve_vrptw,
             orders=orders,
             vehicles=vehicles,
             drivers=drivers,
@@ -224,7 +232,8 @@ async def get_routes(
     Get routes with optional filtering
     """
     try:
-        query = db.query(Route)
+        # route_geometry is part of the response: load it with the rows, not per route
+        query = db.query(Route).options(undefer(Route.route_geometry))
         
         if date_filter:
             query = query.filter(Route.planned_date == date_filter)
@@ -265,7 +274,7 @@ async def get_route(route_id: int, db: Session = Depends(get_db)):
 @router.put("/routes/{route_id}/status")
 async def update_route_status(
     route_id: int,
-    status: str,
+    status: RouteStatus,
     current_stop_index: Optional[int] = None,
     current_latitude: Optional[float] = None,
     current_longitude: Optional[float] = None,
@@ -293,9 +302,9 @@ async def update_route_status(
             route.last_location_update = datetime.utcnow()
         
         # Update timestamps based on status
-        if status == "in_progress" and old_status == "planned":
+        if status == RouteStatus.ACTIVE and old_status == RouteStatus.PLANNED:
             route.actual_start_time = datetime.utcnow()
-        elif status == "completed":
+        elif status == RouteStatus.COMPLETED:
             route.actual_end_time = datetime.utcnow()
             route.actual_duration = (
                 (route.actual_end_time - route.actual_start_time).total_seconds() / 60
@@ -336,7 +345,7 @@ async def reoptimize_route(
         if not route:
             raise HTTPException(status_code=404, detail="Route not found")
         
-        if route.status not in ["planned", "in_progress"]:
+        if route.status not in (RouteStatus.PLANNED, RouteStatus.ACTIVE):
             raise HTTPException(
                 status_code=400, 
                 detail=f"Cannot reoptimize route with status: {route.status}"
@@ -549,8 +558,8 @@ async def update_order_time_window(
 
 @router.get("/vehicles", response_model=List[VehicleResponse])
 async def get_vehicles(
-    status: Optional[str] = Query(None, description="Filter by vehicle status"),
-    vehicle_type: Optional[str] = Query(None, description="Filter by vehicle type"),
+    status: Optional[VehicleStatus] = Query(None, description="Filter by vehicle status"),
+    vehicle_type: Optional[VehicleType] = Query(None, description="Filter by vehicle type"),
     available_only: bool = Query(False, description="Show only available vehicles"),
     db: Session = Depends(get_db)
 ):
@@ -565,7 +574,7 @@ async def get_vehicles(
         if vehicle_type:
             query = query.filter(Vehicle.vehicle_type == vehicle_type)
         if available_only:
-            query = query.filter(Vehicle.status == "available")
+            query = query.filter(Vehicle.status == VehicleStatus.AVAILABLE)
         
         vehicles = query.all()
         
@@ -3,6 +3,8 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime, date, time
 from enum import Enum
 
+from app.models.time_of_day import minutes_to_time
+
 # Enums
 class VehicleType(str, Enum):
     VAN = "van"
@@ -90,6 +92,11 @@ class CustomerResponse(BaseModel):
     preferred_delivery_start: Optional[time] = None
     preferred_delivery_end: Optional[time] = None
     
+    # В БД время хранится в минутах от полуночи
+    @validator('preferred_delivery_start', 'preferred_delivery_end', pre=True)
+    def convert_minutes(cls, v):
+        return minutes_to_time(v) if isinstance(v, int) else v
+    
     class Config:
         from_attributes = True
 
@@ -165,6 +172,11 @@ class DriverResponse(BaseModel):
     current_longitude: Optional[float] = None
     average_delivery_time: Optional[float] = None
     
+    # В БД время хранится в минутах от полуночи
+    @validator('shift_start_time', 'shift_end_time', pre=True)
+    def convert_minutes(cls, v):
+        return minutes_to_time(v) if isinstance(v, int) else v
+    
     class Config:
         from_attributes = True
 
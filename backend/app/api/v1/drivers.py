@@ -5,7 +5,7 @@ API эндпоинты для управления водителями
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, undefer
 from pydantic import BaseModel, Field
 
 from app.database import get_db
@@ -399,7 +399,8 @@ async def get_driver_current_orders(
         raise HTTPException(status_code=404, detail="Водитель не найден")
     
     # Получаем текущие заказы
-    current_orders = db.query(Order).filter(
+    # special_instructions отложено (deferred) - загружаем вместе со строками
+    current_orders = db.query(Order).options(undefer(Order.special_instructions)).filter(
         and_(
             Order.driver_id == driver_id,
             Order.status.in_([OrderStatus.ASSIGNED, OrderStatus.IN_PROGRESS])
@@ -9,8 +9,7 @@ from app.models.vehicle import Vehicle
 from app.models.order import Order
 from app.core.metrics import (
     api_requests_total, api_request_duration_seconds, optimization_duration_seconds,
-    orders_total, vehicles_total, drivers_total,
-    update_business_metrics, get_metrics, CONTENT_TYPE_LATEST
+    get_metrics, CONTENT_TYPE_LATEST
 )
 from datetime import datetime, timedelta
 import json
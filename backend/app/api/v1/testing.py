@@ -1,16 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional
-from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Optional, Tuple, Set, Callable, Awaitable
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 import asyncio
 import json
 import logging
+import numpy as np
+import orjson
 
-from app.database import get_db
-from app.models.route import Route
+from fastapi.concurrency import run_in_threadpool
+
+from app.database import get_db, SessionLocal
+from app.models.route import Route, RouteStatus
 from app.models.route_stop import RouteStop
-from app.models.vehicle import Vehicle
+from app.models.vehicle import Vehicle, VehicleStatus
 from app.models.driver import Driver
 from app.models.order import Order
 from app.services.route_management import RouteManagementService, OptimizationParameters
@@ -21,6 +28,8 @@ router = APIRouter()
 
 # Новые модели для отслеживания времени доставки
 class DeliveryTimeEvent(BaseModel):
+    model_config = ConfigDict(extra='ignore', frozen=True)
+    
     event_type: str = Field(..., description="Тип события: delay, speedup, breakdown, traffic, weather")
     time_impact: int = Field(..., description="Влияние на время в минутах (+ задержка, - ускорение)")
     description: str = Field(..., description="Описание события")
@@ -28,12 +37,16 @@ class DeliveryTimeEvent(BaseModel):
     route_id: Optional[int] = Field(None, description="ID затронутого маршрута")
 
 class DeliveryTimeTracker(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
     scenario_id: str
     initial_delivery_time: int = Field(..., description="Изначальное время доставки в минутах")
     current_delivery_time: int = Field(..., description="Текущее время доставки в минутах")
     time_saved: int = Field(default=0, description="Сэкономленное время в минутах")
     time_lost: int = Field(default=0, description="Потерянное время в минутах")
-    events: List[DeliveryTimeEvent] = Field(default_factory=list)
+    # События хранятся как dict с полями DeliveryTimeEvent: данные формируем мы сами,
+    # поэтому валидировать каждое событие pydantic-моделью не требуется
+    events: List[Dict[str, Any]] = Field(default_factory=list)
     start_time: datetime = Field(default_factory=datetime.now)
     last_update: datetime = Field(default_factory=datetime.now)
     is_active: bool = Field(default=True)
@@ -65,6 +78,8 @@ class TestScenario(BaseModel):
     allow_manual_changes: bool = Field(default=True, description="Разрешить ручные изменения во время выполнения")
 
 class TestResult(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
     scenario_id: str
     start_time: datetime
     end_time: Optional[datetime]
@@ -96,13 +111,125 @@ class VehicleDistributionAnalysis(BaseModel):
     efficiency_score: float
     recommendations: List[str]
 
+# Состояние сценариев в памяти: изменяется на протяжении всего теста, поэтому хранится
+# в легких dataclass со slots, а в pydantic-модели превращается только при ответе
+@dataclass(slots=True)
+class DeliveryTimeTrackerState:
+    scenario_id: str
+    initial_delivery_time: int
+    current_delivery_time: int
+    time_saved: int = 0
+    time_lost: int = 0
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    start_time: datetime = field(default_factory=datetime.now)
+    last_update: datetime = field(default_factory=datetime.now)
+    is_active: bool = True
+
+@dataclass(slots=True)
+class TestResultState:
+    scenario_id: str
+    start_time: datetime
+    status: str  # running, completed, failed, paused
+    metrics_before: Dict[str, Any]
+    end_time: Optional[datetime] = None
+    metrics_after: Optional[Dict[str, Any]] = None
+    parameter_changes: List[Dict[str, Any]] = field(default_factory=list)
+    manual_changes: List[Dict[str, Any]] = field(default_factory=list)
+    reoptimization_count: int = 0
+    performance_impact: Optional[Dict[str, Any]] = None
+    time_tracker: Optional[DeliveryTimeTrackerState] = None
+
+# Валидатор списка параметров, собранный один раз при импорте модуля
+_PARAM_LIST_ADAPTER = TypeAdapter(List[DynamicParameter])
+
+# Тело читается вручную, поэтому его схема описывается для OpenAPI явно
+# (DynamicParameter без вложенных моделей, схема не содержит ссылок)
+_PARAM_LIST_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {"type": "array", "items": DynamicParameter.model_json_schema()}
+            }
+        }
+    }
+}
+
+# Максимальное число одновременно применяемых изменений параметров (защита пула соединений)
+PARAMETER_CHANGE_CONCURRENCY = 10
+
 # Global storage for active test scenarios
-active_scenarios: Dict[str, TestResult] = {}
+active_scenarios: Dict[str, TestResultState] = {}
 
 # Глобальное хранилище для отслеживания времени доставки
-delivery_time_trackers: Dict[str, DeliveryTimeTracker] = {}
+delivery_time_trackers: Dict[str, DeliveryTimeTrackerState] = {}
+
+class ScenarioRunner:
+    """Исполнитель фоновых задач сценариев с ограничением параллельности"""
+    
+    def __init__(self, max_concurrency: int = 20, shutdown_timeout_seconds: float = 10.0):
+        self.max_concurrency = max_concurrency
+        self.shutdown_timeout_seconds = shutdown_timeout_seconds
+        self._sem = asyncio.Semaphore(max_concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+    
+    @property
+    def active_tasks(self) -> int:
+        """Количество запущенных и ожидающих задач"""
+        return len(self._tasks)
+    
+    def submit(self, scenario_id: str, coro_factory: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Поставить задачу сценария в очередь; выполняется не более max_concurrency задач одновременно"""
+        async def _run():
+            async with self._sem:
+                return await coro_factory()
+        
+        return self._track(_run(), f"scenario:{scenario_id}")
+    
+    def spawn(self, name: str, coro: Awaitable[Any]) -> asyncio.Task:
+        """Запустить лёгкую задачу (таймер сценария) вне лимита; она тоже ожидается при остановке"""
+        return self._track(coro, name)
+    
+    def _track(self, coro: Awaitable[Any], name: str) -> asyncio.Task:
+        task = asyncio.create_task(coro, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+    
+    async def shutdown(self):
+        """Дождаться завершения задач (с таймаутом) и отменить оставшиеся"""
+        if not self._tasks:
+            return
+        
+        logger.info(f"Waiting for {len(self._tasks)} scenario tasks to finish")
+        _, pending = await asyncio.wait(set(self._tasks), timeout=self.shutdown_timeout_seconds)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+scenario_runner = ScenarioRunner()
+
+def get_route_service(db: Session = Depends(get_db)) -> RouteManagementService:
+    """Сервис управления маршрутами в рамках одного запроса"""
+    return RouteManagementService(db)
 
 # Новые вспомогательные функции
+def _make_delivery_event(
+    event_type: str,
+    time_impact: int,
+    description: str,
+    timestamp: Optional[datetime] = None,
+    route_id: Optional[int] = None
+) -> Dict[str, Any]:
+    """Создание события времени доставки в виде dict (поля DeliveryTimeEvent)"""
+    return {
+        "event_type": event_type,
+        "time_impact": time_impact,
+        "description": description,
+        "timestamp": timestamp or datetime.now(),
+        "route_id": route_id
+    }
+
 async def _run_delivery_countdown(scenario_id: str):
     """Запуск обратного отсчета времени доставки"""
     try:
@@ -121,12 +248,9 @@ async def _run_delivery_countdown(scenario_id: str):
             if tracker.current_delivery_time <= 0:
                 tracker.is_active = False
                 # Добавляем событие завершения
-                completion_event = DeliveryTimeEvent(
-                    event_type="completion",
-                    time_impact=0,
-                    description="Доставка завершена"
+                tracker.events.append(
+                    _make_delivery_event("completion", 0, "Доставка завершена")
                 )
-                tracker.events.append(completion_event)
                 break
                 
     except Exception as e:
@@ -140,11 +264,7 @@ async def _update_delivery_time(scenario_id: str, time_impact: int, description:
     tracker = delivery_time_trackers[scenario_id]
     
     # Создаем событие
-    event = DeliveryTimeEvent(
-        event_type=event_type,
-        time_impact=time_impact,
-        description=description
-    )
+    event = _make_delivery_event(event_type, time_impact, description)
     
     # Обновляем время
     tracker.current_delivery_time += time_impact
@@ -174,7 +294,6 @@ async def _handle_simulation_time_event(scenario_id: str, event, time_impact: in
 @router.post("/scenarios/create", response_model=Dict[str, str])
 async def create_test_scenario(
     scenario: TestScenario,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """Создать и запустить тестовый сценарий с отслеживанием времени"""
@@ -182,7 +301,7 @@ async def create_test_scenario(
         scenario_id = f"test_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         
         # Создаем трекер времени доставки
-        time_tracker = DeliveryTimeTracker(
+        time_tracker = DeliveryTimeTrackerState(
             scenario_id=scenario_id,
             initial_delivery_time=scenario.initial_delivery_time,
             current_delivery_time=scenario.initial_delivery_time
@@ -193,35 +312,20 @@ async def create_test_scenario(
         metrics_before = await _collect_system_metrics(db)
         
         # Создаем результат теста
-        test_result = TestResult(
+        test_result = TestResultState(
             scenario_id=scenario_id,
             start_time=datetime.now(),
-            end_time=None,
             status="running",
             metrics_before=metrics_before,
-            metrics_after=None,
-            parameter_changes=[],
-            manual_changes=[],
-            reoptimization_count=0,
-            performance_impact=None,
             time_tracker=time_tracker
         )
         
         active_scenarios[scenario_id] = test_result
         
-        # Запускаем сценарий в фоне
-        background_tasks.add_task(
-            _execute_test_scenario,
-            scenario_id,
-            scenario,
-            db
-        )
-        
-        # Запускаем обратный отсчет времени
-        background_tasks.add_task(
-            _run_delivery_countdown,
-            scenario_id
-        )
+        # Запускаем сценарий в фоне: слот исполнителя и сессия БД заняты только на время
+        # применения изменений; обратный отсчет и завершение сценария идут вне лимита
+        scenario_runner.submit(scenario_id, lambda: _execute_test_scenario_in_session(scenario_id, scenario))
+        scenario_runner.spawn(f"countdown:{scenario_id}", _run_delivery_countdown(scenario_id))
         
         logger.info(f"Created test scenario {scenario_id}: {scenario.name}")
         
@@ -239,7 +343,8 @@ async def create_test_scenario(
 async def modify_parameter_manually(
     scenario_id: str,
     change: ManualParameterChange,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    route_service: RouteManagementService = Depends(get_route_service)
 ):
     """Ручное изменение параметра во время выполнения теста"""
     if scenario_id not in active_scenarios:
@@ -250,8 +355,6 @@ async def modify_parameter_manually(
         raise HTTPException(status_code=400, detail="Сценарий не активен")
     
     try:
-        route_service = RouteManagementService(db)
-        
         # Применяем изменение
         param = DynamicParameter(
             parameter_type=change.parameter_type,
@@ -261,7 +364,7 @@ async def modify_parameter_manually(
             time_impact=change.time_impact_minutes
         )
         
-        result = await _apply_parameter_change(param, route_service, db)
+        result = _apply_parameter_change(param, route_service, db)
         
         # Записываем ручное изменение
         manual_change = {
@@ -290,13 +393,16 @@ async def modify_parameter_manually(
         logger.error(f"Failed to modify parameter manually: {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка изменения параметра: {str(e)}")
 
-@router.get("/scenarios/{scenario_id}/time-tracker", response_model=DeliveryTimeTracker)
+# Ответы ниже уже собраны из pydantic-моделей, поэтому response_model не указываем
+# (схема остается в OpenAPI через responses) и отдаем их через orjson без повторной валидации
+@router.get("/scenarios/{scenario_id}/time-tracker", responses={200: {"model": DeliveryTimeTracker}})
 async def get_delivery_time_tracker(scenario_id: str):
     """Получить информацию о времени доставки"""
     if scenario_id not in delivery_time_trackers:
         raise HTTPException(status_code=404, detail="Трекер времени не найден")
     
-    return delivery_time_trackers[scenario_id]
+    time_tracker = DeliveryTimeTracker.model_validate(delivery_time_trackers[scenario_id])
+    return ORJSONResponse(time_tracker.model_dump(mode="json", by_alias=True))
 
 @router.post("/scenarios/{scenario_id}/add-event")
 async def add_delivery_event(
@@ -320,7 +426,7 @@ async def add_delivery_event(
         "current_time": delivery_time_trackers[scenario_id].current_delivery_time
     }
 
-@router.get("/scenarios/{scenario_id}/status", response_model=TestResult)
+@router.get("/scenarios/{scenario_id}/status", responses={200: {"model": TestResult}})
 async def get_scenario_status(scenario_id: str):
     """Получить статус тестового сценария с информацией о времени"""
     if scenario_id not in active_scenarios:
@@ -332,12 +438,22 @@ async def get_scenario_status(scenario_id: str):
     if scenario_id in delivery_time_trackers:
         test_result.time_tracker = delivery_time_trackers[scenario_id]
     
-    return test_result
+    return ORJSONResponse(TestResult.model_validate(test_result).model_dump(mode="json", by_alias=True))
 
-@router.get("/scenarios/active", response_model=List[TestResult])
+@router.get("/scenarios/active", responses={200: {"model": List[TestResult]}})
 async def get_active_scenarios():
     """Получить список активных сценариев"""
-    return list(active_scenarios.values())
+    # Отдаем сценарии потоком по одному, не собирая весь список в памяти
+    async def _generate():
+        yield b"["
+        first = True
+        for test_result in list(active_scenarios.values()):
+            chunk = orjson.dumps(TestResult.model_validate(test_result).model_dump(mode="json", by_alias=True))
+            yield chunk if first else b"," + chunk
+            first = False
+        yield b"]"
+    
+    return StreamingResponse(_generate(), media_type="application/json")
 
 @router.post("/scenarios/{scenario_id}/stop")
 async def stop_scenario(scenario_id: str):
@@ -356,19 +472,44 @@ async def stop_scenario(scenario_id: str):
     
     return {"status": test_result.status, "message": "Сценарий уже завершен"}
 
-@router.post("/parameters/modify")
-async def modify_delivery_parameters(
-    parameters: List[DynamicParameter],
-    db: Session = Depends(get_db)
-):
+@router.post("/parameters/modify", openapi_extra=_PARAM_LIST_OPENAPI)
+async def modify_delivery_parameters(request: Request):
     """Динамическое изменение параметров доставки"""
+    # Валидируем весь список одним вызовом вместо поэлементной обработки FastAPI
     try:
-        results = []
-        route_service = RouteManagementService(db)
+        parameters = _PARAM_LIST_ADAPTER.validate_json(await request.body())
+    except ValidationError as e:
+        # loc начинается с "body", как в ошибках валидации самого FastAPI
+        raise RequestValidationError([
+            {**error, "loc": ("body", *error["loc"])} for error in e.errors()
+        ])
+    
+    try:
+        # Параметры независимы (разные маршруты/заказы), поэтому применяем их
+        # параллельно, каждый в своей сессии, ограничивая число одновременных задач
+        semaphore = asyncio.Semaphore(PARAMETER_CHANGE_CONCURRENCY)
+        
+        async def _run(param: DynamicParameter) -> Dict[str, Any]:
+            async with semaphore:
+                return await run_in_threadpool(_apply_parameter_change_in_session, param)
         
-        for param in parameters:
-            result = await _apply_parameter_change(param, route_service, db)
-            results.append(result)
+        outcomes = await asyncio.gather(*map(_run, parameters), return_exceptions=True)
+        
+        results = []
+        for param, outcome in zip(parameters, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Failed to apply parameter change {param.parameter_type}: {outcome}")
+                outcome = {
+                    "parameter_type": param.parameter_type,
+                    "target_id": param.target_id,
+                    "value": param.value,
+                    "timestamp": datetime.now(),
+                    "success": False,
+                    "requires_reoptimization": False,
+                    "affected_routes": [],
+                    "error": str(outcome)
+                }
+            results.append(outcome)
         
         return {
             "status": "success",
@@ -388,7 +529,7 @@ async def analyze_driver_load(db: Session = Depends(get_db)):
         analyses = []
         
         for driver in drivers:
-            analysis = await _analyze_driver_load(driver, db)
+            analysis = await _analyze_driver_load(driver)
             analyses.append(analysis)
         
         return analyses
@@ -414,12 +555,10 @@ async def simulate_virtual_delivery(
     traffic_multiplier: float = 1.0,
     weather_impact: float = 1.0,
     unexpected_delays: Optional[List[Dict[str, Any]]] = None,
-    db: Session = Depends(get_db)
+    route_service: RouteManagementService = Depends(get_route_service)
 ):
     """Симуляция виртуальной доставки"""
     try:
-        route_service = RouteManagementService(db)
-        
         # Используем существующий метод симуляции
         simulation_result = route_service.simulate_real_time_conditions(
             route_id=route_id,
@@ -440,28 +579,35 @@ async def simulate_virtual_delivery(
         raise HTTPException(status_code=500, detail=f"Ошибка симуляции: {str(e)}")
 
 # Helper functions
-async def _execute_test_scenario(scenario_id: str, scenario: TestScenario, db: Session):
-    """Выполнение тестового сценария в фоне"""
+async def _execute_test_scenario_in_session(scenario_id: str, scenario: TestScenario):
+    """Выполнение сценария в собственной сессии БД (сессия запроса к этому моменту закрыта)"""
+    db = SessionLocal()
     try:
-        test_result = active_scenarios[scenario_id]
-        route_service = RouteManagementService(db)
-        
-        # Инициализируем трекер времени доставки
-        initial_time = scenario.initial_delivery_time
-        delivery_time_trackers[scenario_id] = DeliveryTimeTracker(
-            scenario_id=scenario_id,
-            initial_delivery_time=initial_time,
-            current_delivery_time=initial_time,
-            events=[],
-            start_time=datetime.now()
+        await _execute_test_scenario(scenario_id, scenario, RouteManagementService(db), db)
+    finally:
+        db.close()
+    
+    # Длительность сценария выжидается вне слота исполнителя и без открытой сессии
+    if active_scenarios[scenario_id].status == "running":
+        scenario_runner.spawn(
+            f"finish:{scenario_id}",
+            _finish_test_scenario(scenario_id, scenario.duration_minutes)
         )
-        
-        # Запускаем обратный отсчет времени
-        asyncio.create_task(_run_delivery_countdown(scenario_id))
+
+async def _execute_test_scenario(
+    scenario_id: str,
+    scenario: TestScenario,
+    route_service: RouteManagementService,
+    db: Session
+):
+    """Применение изменений тестового сценария в фоне"""
+    try:
+        # Трекер времени и обратный отсчет уже созданы в create_test_scenario
+        test_result = active_scenarios[scenario_id]
         
         # Применяем изменения параметров
         for param in scenario.parameters:
-            change_result = await _apply_parameter_change(param, route_service, db)
+            change_result = _apply_parameter_change(param, route_service, db)
             test_result.parameter_changes.append(change_result)
             
             # Обновляем время доставки если есть влияние
@@ -478,9 +624,18 @@ async def _execute_test_scenario(scenario_id: str, scenario: TestScenario, db: S
                 await _trigger_reoptimization(change_result.get("affected_routes", []), route_service)
                 test_result.reoptimization_count += 1
         
-        # Ждем завершения сценария
-        await asyncio.sleep(scenario.duration_minutes * 60)
-        
+    except Exception as e:
+        logger.error(f"Error executing scenario {scenario_id}: {e}")
+        test_result.status = "failed"
+        test_result.end_time = datetime.now()
+
+async def _finish_test_scenario(scenario_id: str, duration_minutes: int):
+    """Завершение сценария по истечении его длительности: финальные метрики в новой сессии БД"""
+    await asyncio.sleep(duration_minutes * 60)
+    
+    test_result = active_scenarios[scenario_id]
+    db = SessionLocal()
+    try:
         # Собираем финальные метрики
         test_result.metrics_after = await _collect_system_metrics(db)
         test_result.performance_impact = _calculate_performance_impact(
@@ -494,11 +649,21 @@ async def _execute_test_scenario(scenario_id: str, scenario: TestScenario, db: S
         logger.info(f"Completed test scenario {scenario_id}")
         
     except Exception as e:
-        logger.error(f"Error executing scenario {scenario_id}: {e}")
+        logger.error(f"Error finishing scenario {scenario_id}: {e}")
         test_result.status = "failed"
         test_result.end_time = datetime.now()
+    finally:
+        db.close()
 
-async def _apply_parameter_change(param: DynamicParameter, route_service: RouteManagementService, db: Session):
+def _apply_parameter_change_in_session(param: DynamicParameter) -> Dict[str, Any]:
+    """Применение изменения параметра в отдельной сессии БД (для параллельного выполнения)"""
+    db = SessionLocal()
+    try:
+        return _apply_parameter_change(param, RouteManagementService(db), db)
+    finally:
+        db.close()
+
+def _apply_parameter_change(param: DynamicParameter, route_service: RouteManagementService, db: Session):
     """Применение изменения параметра"""
     result = {
         "parameter_type": param.parameter_type,
@@ -594,7 +759,7 @@ async def _collect_system_metrics(db: Session) -> Dict[str, Any]:
     """Сбор системных метрик"""
     try:
         total_routes = db.query(Route).count()
-        active_routes = db.query(Route).filter(Route.status.in_(["planned", "in_progress"])).count()
+        active_routes = db.query(Route).filter(Route.status.in_([RouteStatus.PLANNED, RouteStatus.ACTIVE])).count()
         total_orders = db.query(Order).count()
         total_vehicles = db.query(Vehicle).count()
         total_drivers = db.query(Driver).count()
@@ -611,38 +776,52 @@ async def _collect_system_metrics(db: Session) -> Dict[str, Any]:
         logger.error(f"Failed to collect metrics: {e}")
         return {}
 
+def _impact_kernel(before: np.ndarray, after: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Абсолютное и процентное изменение метрик за один векторный проход"""
+    delta = after - before
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(before != 0, delta / before * 100, np.nan)
+    return delta, pct
+
 def _calculate_performance_impact(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
     """Расчет влияния на производительность"""
     try:
         impact = {}
         
-        for key in before.keys():
-            if key != "timestamp" and key in after:
-                before_val = before[key]
-                after_val = after[key]
-                
-                if isinstance(before_val, (int, float)) and isinstance(after_val, (int, float)):
-                    if before_val != 0:
-                        change_percent = ((after_val - before_val) / before_val) * 100
-                        impact[f"{key}_change_percent"] = round(change_percent, 2)
-                    impact[f"{key}_absolute_change"] = after_val - before_val
+        keys = [
+            key for key in before.keys()
+            if key != "timestamp" and key in after
+            and isinstance(before[key], (int, float)) and isinstance(after[key], (int, float))
+        ]
+        if not keys:
+            return impact
+        
+        before_arr = np.fromiter((before[key] for key in keys), dtype=np.float64, count=len(keys))
+        after_arr = np.fromiter((after[key] for key in keys), dtype=np.float64, count=len(keys))
+        delta, pct = _impact_kernel(before_arr, after_arr)
+        
+        for i, key in enumerate(keys):
+            if not np.isnan(pct[i]):
+                impact[f"{key}_change_percent"] = round(float(pct[i]), 2)
+            if isinstance(before[key], int) and isinstance(after[key], int):
+                impact[f"{key}_absolute_change"] = after[key] - before[key]
+            else:
+                impact[f"{key}_absolute_change"] = float(delta[i])
         
         return impact
     except Exception as e:
         logger.error(f"Failed to calculate performance impact: {e}")
         return {}
 
-async def _analyze_driver_load(driver: Driver, db: Session) -> DriverLoadAnalysis:
+async def _analyze_driver_load(driver: Driver) -> DriverLoadAnalysis:
     """Анализ нагрузки конкретного водителя"""
     try:
-        # Получаем активные маршруты водителя
-        active_routes = db.query(Route).filter(
-            Route.driver_id == driver.id,
-            Route.status.in_(["planned", "in_progress"])
-        ).all()
+        # Агрегаты по маршрутам хранятся в самой записи водителя
+        # (обновляются событиями модели Route), запросы к routes не нужны
+        active_routes_count = driver.active_routes_count or 0
         
         # Рассчитываем текущую нагрузку
-        total_duration = sum(route.total_duration for route in active_routes)
+        total_duration = driver.active_total_duration or 0
         max_work_hours = 8 * 60  # 8 часов в минутах
         current_load = min(total_duration / max_work_hours, 1.0)
         
@@ -650,10 +829,7 @@ async def _analyze_driver_load(driver: Driver, db: Session) -> DriverLoadAnalysi
         experience_factor = min(driver.experience_years / 10.0, 1.0) if hasattr(driver, 'experience_years') else 0.5
         
         # Оценка эффективности
-        completed_routes = db.query(Route).filter(
-            Route.driver_id == driver.id,
-            Route.status == "completed"
-        ).count()
+        completed_routes = driver.completed_routes or 0
         
         efficiency_score = min(completed_routes / 100.0, 1.0)  # Упрощенная оценка
         
@@ -667,7 +843,7 @@ async def _analyze_driver_load(driver: Driver, db: Session) -> DriverLoadAnalysi
         elif current_load > 0.8:
             stress_indicators.append("Высокая нагрузка")
         
-        if len(active_routes) > 5:
+        if active_routes_count > 5:
             stress_indicators.append("Слишком много активных маршрутов")
         
         return DriverLoadAnalysis(
@@ -676,8 +852,8 @@ async def _analyze_driver_load(driver: Driver, db: Session) -> DriverLoadAnalysi
             experience_factor=experience_factor,
             efficiency_score=efficiency_score,
             recommended_max_load=recommended_max_load,
-            current_routes=len(active_routes),
-            avg_delivery_time=total_duration / max(len(active_routes), 1),
+            current_routes=active_routes_count,
+            avg_delivery_time=total_duration / max(active_routes_count, 1),
             stress_indicators=stress_indicators
         )
         
@@ -698,7 +874,7 @@ async def _analyze_vehicle_distribution(db: Session) -> VehicleDistributionAnaly
     """Анализ распределения транспортных средств"""
     try:
         total_vehicles = db.query(Vehicle).count()
-        available_vehicles = db.query(Vehicle).filter(Vehicle.status == "available").count()
+        available_vehicles = db.query(Vehicle).filter(Vehicle.status == VehicleStatus.AVAILABLE).count()
         
         utilization_rate = (total_vehicles - available_vehicles) / max(total_vehicles, 1)
         
@@ -752,51 +928,47 @@ async def _analyze_vehicle_distribution(db: Session) -> VehicleDistributionAnaly
         )
 
 # Добавляем тестовые данные для демонстрации
+@dataclass(slots=True, frozen=True)
+class _DemoDeliveryEvent:
+    event_type: str
+    time_impact: int
+    description: str
+    minutes_ago: int
+
+# Неизменяемый шаблон событий демо-трекера; время отсчитывается от момента инициализации
+_DEMO_DELIVERY_EVENTS = (
+    _DemoDeliveryEvent("delay", 5, "Увеличение объема заказов", 10),
+    _DemoDeliveryEvent("traffic", 8, "Задержка из-за пробок", 5),
+    _DemoDeliveryEvent("speedup", -6, "Оптимизация маршрута", 2),
+)
+
 def _initialize_demo_data():
     """Инициализация демонстрационных данных"""
     demo_scenario_id = "demo-scenario-001"
+    now = datetime.now()
     
     # Создаем демо-трекер времени с некоторыми событиями
-    demo_tracker = DeliveryTimeTracker(
+    demo_tracker = DeliveryTimeTrackerState(
         scenario_id=demo_scenario_id,
         initial_delivery_time=45,  # 45 минут изначально
         current_delivery_time=52,  # 52 минуты сейчас (потеряно 7 минут)
         events=[
-            DeliveryTimeEvent(
-                event_type="delay",
-                time_impact=5,
-                timestamp=datetime.now() - timedelta(minutes=10),
-                description="Увеличение объема заказов"
-            ),
-            DeliveryTimeEvent(
-                event_type="traffic",
-                time_impact=8,
-                timestamp=datetime.now() - timedelta(minutes=5),
-                description="Задержка из-за пробок"
-            ),
-            DeliveryTimeEvent(
-                event_type="speedup",
-                time_impact=-6,
-                timestamp=datetime.now() - timedelta(minutes=2),
-                description="Оптимизация маршрута"
+            _make_delivery_event(
+                demo.event_type, demo.time_impact, demo.description,
+                timestamp=now - timedelta(minutes=demo.minutes_ago)
             )
-        ]
+            for demo in _DEMO_DELIVERY_EVENTS
+        ],
+        start_time=now,
+        last_update=now
     )
     
     # Создаем демо-сценарий
-    demo_scenario = TestResult(
+    demo_scenario = TestResultState(
         scenario_id=demo_scenario_id,
-        name="Демонстрационный сценарий",
-        description="Показывает работу отслеживания времени",
-        start_time=datetime.now() - timedelta(minutes=15),
-        end_time=None,
+        start_time=now - timedelta(minutes=15),
         status="running",
         metrics_before={},
-        metrics_after=None,
-        parameter_changes=[],
-        manual_changes=[],
-        reoptimization_count=0,
-        performance_impact=None,
         time_tracker=demo_tracker
     )
     
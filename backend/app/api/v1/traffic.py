@@ -6,8 +6,11 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional, Tuple
 from datetime import datetime
 from pydantic import BaseModel, Field
+import asyncio
 import logging
+import numpy as np
 
+from app.core.cache import traffic_level_cache
 from app.services.traffic_service import TrafficService
 from app.services.yandex_maps_service import YandexMapsService
 
@@ -15,6 +18,22 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Traffic"])
 
+# Max concurrent upstream traffic requests per heatmap (Yandex API rate limits)
+HEATMAP_CONCURRENCY = 16
+
+# Heatmap points are snapped to fixed cells of this size (~500 m); the cell id is
+# the cache key, so overlapping heatmap requests reuse each other's traffic levels
+HEATMAP_CELL_DEGREES = 0.005
+
+# Heatmap color per traffic level 0-10
+_TRAFFIC_COLORS = np.array(
+    ["#10B981"] * 3    # Green
+    + ["#84CC16"] * 2  # Light green
+    + ["#F59E0B"] * 2  # Amber
+    + ["#F97316"] * 2  # Orange
+    + ["#EF4444"] * 2  # Red
+)
+
 # Initialize services
 yandex_service = YandexMapsService()
 traffic_service = TrafficService(yandex_service)
@@ -205,25 +224,55 @@ async def get_traffic_heatmap(
         lat_step = (max_lat - min_lat) / grid_size
         lon_step = (max_lon - min_lon) / grid_size
         
-        heatmap_data = []
+        lat_centers = np.linspace(min_lat + lat_step / 2, max_lat - lat_step / 2, grid_size)
+        lon_centers = np.linspace(min_lon + lon_step / 2, max_lon - lon_step / 2, grid_size)
+        lat_grid, lon_grid = np.meshgrid(lat_centers, lon_centers, indexing="ij")
+        coords = list(zip(lat_grid.ravel().tolist(), lon_grid.ravel().tolist()))
+        
+        # Map grid points to cells
+        lat_idx = np.floor(lat_grid.ravel() / HEATMAP_CELL_DEGREES).astype(np.int64).tolist()
+        lon_idx = np.floor(lon_grid.ravel() / HEATMAP_CELL_DEGREES).astype(np.int64).tolist()
+        cells = [f"{i}:{j}" for i, j in zip(lat_idx, lon_idx)]
+        cell_centers = {
+            cell: ((i + 0.5) * HEATMAP_CELL_DEGREES, (j + 0.5) * HEATMAP_CELL_DEGREES)
+            for cell, i, j in zip(cells, lat_idx, lon_idx)
+        }
+        
+        # Cached cells in one batch, the rest fetched concurrently (bounded by HEATMAP_CONCURRENCY)
+        unique_cells = list(cell_centers)
+        cell_levels = {
+            cell: level
+            for cell, level in zip(unique_cells, await traffic_level_cache.aget_many(unique_cells))
+            if level is not None
+        }
+        missing_cells = [cell for cell in unique_cells if cell not in cell_levels]
+        
+        sem = asyncio.Semaphore(HEATMAP_CONCURRENCY)
         
-        for i in range(grid_size):
-            for j in range(grid_size):
-                lat = min_lat + (i + 0.5) * lat_step
-                lon = min_lon + (j + 0.5) * lon_step
-                
-                # Get traffic level for this point
-                traffic_level = await traffic_service.get_current_traffic_level(
-                    location=(lat, lon),
+        async def _one(cell: str) -> int:
+            async with sem:
+                return await traffic_service.get_current_traffic_level(
+                    location=cell_centers[cell],
                     radius_meters=1000
                 )
-                
-                heatmap_data.append({
-                    "latitude": lat,
-                    "longitude": lon,
-                    "traffic_level": traffic_level,
-                    "color": _get_traffic_color(traffic_level)
-                })
+        
+        if missing_cells:
+            fetched = dict(zip(missing_cells, await asyncio.gather(*[_one(cell) for cell in missing_cells])))
+            await traffic_level_cache.aset_many(fetched)
+            cell_levels.update(fetched)
+        
+        levels = [cell_levels[cell] for cell in cells]
+        colors = _get_traffic_colors(levels)
+        
+        heatmap_data = [
+            {
+                "latitude": lat,
+                "longitude": lon,
+                "traffic_level": traffic_level,
+                "color": color
+            }
+            for (lat, lon), traffic_level, color in zip(coords, levels, colors)
+        ]
         
         return {
             "success": True,
@@ -252,6 +301,8 @@ async def clear_traffic_cache():
     """
     try:
         traffic_service.clear_cache()
+        # Heatmap cell levels are cached separately; Redis SCAN/DEL runs off the event loop
+        await asyncio.to_thread(traffic_level_cache.clear)
         
         return {
             "success": True,
@@ -285,13 +336,9 @@ async def cleanup_expired_cache():
 
 def _get_traffic_color(level: int) -> str:
     """Get color hex code for traffic level"""
-    if level <= 2:
-        return "#10B981"  # Green
-    elif level <= 4:
-        return "#84CC16"  # Light green
-    elif level <= 6:
-        return "#F59E0B"  # Amber
-    elif level <= 8:
-        return "#F97316"  # Orange
-    else:
-        return "#EF4444"  # Red
+    return str(_TRAFFIC_COLORS[min(max(int(level), 0), 10)])
+
+
+def _get_traffic_colors(levels: List[int]) -> List[str]:
+    """Vectorized _get_traffic_color for a batch of traffic levels"""
+    return _TRAFFIC_COLORS[np.clip(np.asarray(levels, dtype=np.int64), 0, 10)].tolist()
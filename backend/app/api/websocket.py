@@ -1,13 +1,17 @@
 from fastapi import WebSocket, WebSocketDisconnect, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.routing import APIRouter
+from sqlalchemy import event as sa_event, inspect, update
 from sqlalchemy.orm import Session
-from typing import Dict, List, Set
-import json
+from typing import Dict, List, Set, Optional, Iterable
+import orjson
 import asyncio
 import logging
+import time
+import numpy as np
 from datetime import datetime
 
-from app.database import get_db
+from app.database import get_db, SessionLocal
 from app.models import Route, Event, RouteStop
 from app.api.schemas import (
     WebSocketMessage, RouteUpdateMessage, EventMessage, 
@@ -16,9 +20,23 @@ from app.api.schemas import (
 
 logger = logging.getLogger(__name__)
 
+# Naive datetimes (utcnow) are serialized as UTC; anything orjson can't encode falls back to str().
+# Messages go out as binary frames of UTF-8 JSON: clients decode them
+# (binaryType = "arraybuffer" + TextDecoder) before JSON.parse
+_ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+
+def _dumps(message: dict) -> bytes:
+    """Serialize an outgoing WebSocket message"""
+    return orjson.dumps(message, default=str, option=_ORJSON_OPTIONS)
+
 class ConnectionManager:
     """Manages WebSocket connections for real-time updates"""
     
+    # A client that can't take a frame within this time is treated as disconnected
+    SEND_TIMEOUT_SECONDS = 0.25
+    # Max in-flight sends per broadcast
+    BROADCAST_CONCURRENCY = 100
+    
     def __init__(self):
         # Store active connections by type
         self.active_connections: Dict[str, Set[WebSocket]] = {
@@ -28,10 +46,19 @@ class ConnectionManager:
             "monitoring": set(),
             "all": set()
         }
-        # Store connection metadata
-        self.connection_metadata: Dict[WebSocket, Dict] = {}
+        # Connection metadata as parallel arrays, indexed via id(websocket)
+        self._type_names: List[str] = list(self.active_connections)
+        self._websockets: List[WebSocket] = []
+        self._type_codes: List[int] = []
+        self._connected_at: List[float] = []  # time.time()
+        self._index: Dict[int, int] = {}
         
-    async def connect(self, websocket: WebSocket, connection_type: str = "all", **metadata):
+    def _type_code(self, connection_type: str) -> int:
+        if connection_type not in self._type_names:
+            self._type_names.append(connection_type)
+        return self._type_names.index(connection_type)
+        
+    async def connect(self, websocket: WebSocket, connection_type: str = "all"):
         """Accept a new WebSocket connection"""
         await websocket.accept()
         
@@ -41,11 +68,10 @@ class ConnectionManager:
         self.active_connections["all"].add(websocket)
         
         # Store metadata
-        self.connection_metadata[websocket] = {
-            "type": connection_type,
-            "connected_at": datetime.utcnow(),
-            **metadata
-        }
+        self._index[id(websocket)] = len(self._websockets)
+        self._websockets.append(websocket)
+        self._type_codes.append(self._type_code(connection_type))
+        self._connected_at.append(time.time())
         
         logger.info(f"WebSocket connected: {connection_type}, total connections: {len(self.active_connections['all'])}")
         
@@ -55,32 +81,74 @@ class ConnectionManager:
         for connection_set in self.active_connections.values():
             connection_set.discard(websocket)
         
-        # Remove metadata
-        metadata = self.connection_metadata.pop(websocket, {})
-        connection_type = metadata.get("type", "unknown")
+        # Remove metadata: move the last entry into the freed slot
+        connection_type = "unknown"
+        idx = self._index.pop(id(websocket), None)
+        if idx is not None:
+            connection_type = self._type_names[self._type_codes[idx]]
+            last = len(self._websockets) - 1
+            if idx != last:
+                self._websockets[idx] = self._websockets[last]
+                self._type_codes[idx] = self._type_codes[last]
+                self._connected_at[idx] = self._connected_at[last]
+                self._index[id(self._websockets[idx])] = idx
+            self._websockets.pop()
+            self._type_codes.pop()
+            self._connected_at.pop()
         
         logger.info(f"WebSocket disconnected: {connection_type}, remaining connections: {len(self.active_connections['all'])}")
         
+    async def _close(self, websocket: WebSocket):
+        """Close a connection dropped after a failed send, without waiting on a stuck client"""
+        try:
+            await asyncio.wait_for(websocket.close(), self.SEND_TIMEOUT_SECONDS)
+        except Exception:
+            # Already closed by the client, or the close frame could not be sent either
+            pass
+        
     async def send_personal_message(self, message: dict, websocket: WebSocket):
         """Send a message to a specific WebSocket"""
         try:
-            await websocket.send_text(json.dumps(message, default=str))
+            await websocket.send_bytes(_dumps(message))
         except Exception as e:
             logger.error(f"Error sending personal message: {e}")
             self.disconnect(websocket)
+            await self._close(websocket)
             
     async def broadcast_to_type(self, message: dict, connection_type: str):
         """Broadcast a message to all connections of a specific type"""
         if connection_type not in self.active_connections:
             return
-            
-        disconnected = set()
-        for websocket in self.active_connections[connection_type].copy():
+        
+        await self._broadcast_to_types(_dumps(message), (connection_type,))
+        
+    async def _broadcast_to_types(self, payload: bytes, connection_types: Iterable[str]):
+        """Send an already serialized payload once to every connection subscribed to any of the types"""
+        connection_types = tuple(connection_types)
+        websockets = set().union(
+            *(self.active_connections.get(connection_type, set()) for connection_type in connection_types)
+        )
+        if not websockets:
+            return
+        
+        # Send to all clients concurrently with a per-send timeout, so a slow client
+        # neither blocks the rest nor holds its task until the socket times out
+        sem = asyncio.Semaphore(self.BROADCAST_CONCURRENCY)
+        disconnected: List[WebSocket] = []
+        
+        async def _send_one(websocket: WebSocket):
             try:
-                await websocket.send_text(json.dumps(message, default=str))
+                async with sem:
+                    await asyncio.wait_for(websocket.send_bytes(payload), self.SEND_TIMEOUT_SECONDS)
             except Exception as e:
-                logger.error(f"Error broadcasting to {connection_type}: {e}")
-                disconnected.add(websocket)
+                logger.error(f"Error broadcasting to {'/'.join(connection_types)}: {e!r}")
+                disconnected.append(websocket)
+                # Close the socket too, so the client sees the drop and its handler exits
+                await self._close(websocket)
+        
+        async with asyncio.TaskGroup() as tg:
+            for websocket in websockets:
+                tg.create_task(_send_one(websocket))
         
         # Clean up disconnected websockets
         for websocket in disconnected:
@@ -99,8 +167,7 @@ class ConnectionManager:
             current_stop=current_stop
         ).dict()
         
-        await self.broadcast_to_type(message, "routes")
-        await self.broadcast_to_type(message, "monitoring")
+        await self._broadcast_to_types(_dumps(message), ("routes", "monitoring"))
         
     async def send_event_notification(self, event_data: dict):
         """Send event notification to relevant connections"""
@@ -108,8 +175,7 @@ class ConnectionManager:
             event=event_data
         ).dict()
         
-        await self.broadcast_to_type(message, "events")
-        await self.broadcast_to_type(message, "monitoring")
+        await self._broadcast_to_types(_dumps(message), ("events", "monitoring"))
         
     async def send_eta_update(self, route_id: int, eta_predictions: list):
         """Send ETA update to relevant connections"""
@@ -118,8 +184,7 @@ class ConnectionManager:
             eta_predictions=eta_predictions
         ).dict()
         
-        await self.broadcast_to_type(message, "eta")
-        await self.broadcast_to_type(message, "monitoring")
+        await self._broadcast_to_types(_dumps(message), ("eta", "monitoring"))
         
     async def send_reoptimization_notification(self, route_id: int, trigger_type: str, status: str, new_route: dict = None):
         """Send reoptimization notification"""
@@ -130,27 +195,30 @@ class ConnectionManager:
             new_route=new_route
         ).dict()
         
-        await self.broadcast_to_type(message, "routes")
-        await self.broadcast_to_type(message, "monitoring")
+        await self._broadcast_to_types(_dumps(message), ("routes", "monitoring"))
         
     def get_connection_stats(self):
         """Get statistics about active connections"""
+        type_codes = np.asarray(self._type_codes, dtype=np.int64)
+        connected_at = np.asarray(self._connected_at, dtype=np.float64)
+        counts = np.bincount(type_codes, minlength=len(self._type_names)).tolist()
+        durations = (time.time() - connected_at).tolist()
+        connected_at_dt = (connected_at * 1e6).astype("datetime64[us]").tolist()
+        
         return {
             "total_connections": len(self.active_connections["all"]),
             "connections_by_type": {
-                conn_type: len(connections) 
-                for conn_type, connections in self.active_connections.items()
-                if conn_type != "all"
+                conn_type: counts[code]
+                for code, conn_type in enumerate(self._type_names)
+                if conn_type in self.active_connections and conn_type != "all"
             },
             "connection_metadata": [
                 {
-                    "type": metadata.get("type"),
-                    "connected_at": metadata.get("connected_at"),
-                    "duration_seconds": (
-                        datetime.utcnow() - metadata.get("connected_at", datetime.utcnow())
-                    ).total_seconds()
+                    "type": self._type_names[code],
+                    "connected_at": connected,
+                    "duration_seconds": duration
                 }
-                for metadata in self.connection_metadata.values()
+                for code, connected, duration in zip(self._type_codes, connected_at_dt, durations)
             ]
         }
 
@@ -168,7 +236,7 @@ async def websocket_routes_endpoint(websocket: WebSocket):
         while True:
             # Keep connection alive and handle incoming messages
             data = await websocket.receive_text()
-            message = json.loads(data)
+            message = orjson.loads(data)
             
             # Handle different message types
             if message.get("type") == "ping":
@@ -196,7 +264,7 @@ async def websocket_events_endpoint(websocket: WebSocket):
     try:
         while True:
             data = await websocket.receive_text()
-            message = json.loads(data)
+            message = orjson.loads(data)
             
             if message.get("type") == "ping":
                 await manager.send_personal_message({"type": "pong", "timestamp": datetime.utcnow()}, websocket)
@@ -214,7 +282,7 @@ async def websocket_eta_endpoint(websocket: WebSocket):
     try:
         while True:
             data = await websocket.receive_text()
-            message = json.loads(data)
+            message = orjson.loads(data)
             
             if message.get("type") == "ping":
                 await manager.send_personal_message({"type": "pong", "timestamp": datetime.utcnow()}, websocket)
@@ -232,7 +300,7 @@ async def websocket_monitoring_endpoint(websocket: WebSocket):
     try:
         while True:
             data = await websocket.receive_text()
-            message = json.loads(data)
+            message = orjson.loads(data)
             
             if message.get("type") == "ping":
                 await manager.send_personal_message({"type": "pong", "timestamp": datetime.utcnow()}, websocket)
@@ -250,26 +318,8 @@ async def websocket_monitoring_endpoint(websocket: WebSocket):
         logger.error(f"WebSocket error in monitoring endpoint: {e}")
         manager.disconnect(websocket)
 
-# Background task for periodic updates
-async def periodic_updates_task():
-    """Background task to send periodic updates to connected clients"""
-    while True:
-        try:
-            # Send periodic heartbeat to all connections
-            if len(manager.active_connections["all"]) > 0:
-                heartbeat_message = {
-                    "type": "heartbeat",
-                    "timestamp": datetime.utcnow(),
-                    "active_connections": len(manager.active_connections["all"])
-                }
-                await manager.broadcast_to_all(heartbeat_message)
-            
-            # Wait for next heartbeat (every 30 seconds)
-            await asyncio.sleep(30)
-            
-        except Exception as e:
-            logger.error(f"Error in periodic updates task: {e}")
-            await asyncio.sleep(30)
+# Keep-alive is handled by WebSocket ping/pong control frames at the server level
+# (uvicorn ws_ping_interval / ws_ping_timeout), not by application heartbeat messages
 
 # Utility functions for sending notifications
 async def notify_route_status_change(route_id: int, old_status: str, new_status: str, current_location: dict = None):
@@ -292,62 +342,107 @@ async def notify_reoptimization(route_id: int, trigger_type: str, status: str, n
     """Notify about route reoptimization"""
     await manager.send_reoptimization_notification(route_id, trigger_type, status, new_route)
 
-# Real-time monitoring functions
-async def start_real_time_monitoring(db: Session):
+# Real-time monitoring: change feed instead of polling
+#
+# Session hooks collect new events and route status changes at flush time and
+# publish them once the transaction commits. start_real_time_monitoring consumes
+# the feed and broadcasts, so nothing scans the tables on a timer. Sessions may
+# run in worker threads, hence call_soon_threadsafe into the monitoring loop.
+_change_queue: Optional[asyncio.Queue] = None
+_change_loop: Optional[asyncio.AbstractEventLoop] = None
+# Upper bound on changes broadcast together and marked in one UPDATE
+CHANGE_BATCH_SIZE = 200
+
+def _enum_value(value):
+    return getattr(value, "value", value)
+
+@sa_event.listens_for(Session, "after_flush")
+def _collect_realtime_changes(session, flush_context):
+    if _change_queue is None:
+        return
+    changes = session.info.setdefault("realtime_changes", [])
+    
+    for obj in session.new:
+        if isinstance(obj, Event):
+            changes.append(("event", {
+                "id": obj.id,
+                "event_type": _enum_value(obj.event_type),
+                "severity": _enum_value(obj.severity),
+                "title": obj.title,
+                "description": obj.description,
+                "route_id": obj.route_id,
+                "timestamp": obj.event_timestamp
+            }))
+    
+    for obj in session.dirty:
+        if isinstance(obj, Route) and inspect(obj).attrs.status.history.has_changes():
+            changes.append(("route", {
+                "route_id": obj.id,
+                "status": _enum_value(obj.status),
+                "current_stop": obj.current_stop_index
+            }))
+
+@sa_event.listens_for(Session, "after_commit")
+def _publish_realtime_changes(session):
+    changes = session.info.pop("realtime_changes", None)
+    if not changes or _change_queue is None or _change_loop is None:
+        return
+    for change in changes:
+        _change_loop.call_soon_threadsafe(_change_queue.put_nowait, change)
+
+@sa_event.listens_for(Session, "after_rollback")
+def _discard_realtime_changes(session):
+    session.info.pop("realtime_changes", None)
+
+def _mark_events_notified(event_ids: List[int]):
+    """Persist that the events were broadcast (runs in a worker thread)"""
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(Event)
+            .where(Event.id.in_(event_ids))
+            .values(notifications_sent=True)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+async def start_real_time_monitoring():
     """Start real-time monitoring of routes and events"""
+    global _change_queue, _change_loop
+    
     logger.info("Starting real-time monitoring...")
+    _change_loop = asyncio.get_running_loop()
+    _change_queue = asyncio.Queue()
     
-    while True:
-        try:
-            # Check for active routes that need monitoring
-            active_routes = db.query(Route).filter(Route.status == "in_progress").all()
-            
-            for route in active_routes:
-                # Check if route needs ETA updates
-                if route.last_eta_update is None or (
-                    datetime.utcnow() - route.last_eta_update
-                ).total_seconds() > 300:  # Update every 5 minutes
-                    
-                    # Calculate new ETAs (this would integrate with your ETA predictor)
-                    # For now, we'll just send a notification that ETA calculation is needed
-                    await manager.send_route_update(
-                        route_id=route.id,
-                        status=route.status,
-                        current_location={
-                            "latitude": route.current_latitude,
-                            "longitude": route.current_longitude
-                        } if route.current_latitude and route.current_longitude else None,
-                        current_stop=route.current_stop_index
-                    )
-            
-            # Check for new events
-            recent_events = db.query(Event).filter(
-                Event.notification_sent == False,
-                Event.status.in_(["active", "pending"])
-            ).all()
-            
-            for event in recent_events:
-                await notify_new_event({
-                    "id": event.id,
-                    "event_type": event.event_type,
-                    "severity": event.severity,
-                    "title": event.title,
-                    "description": event.description,
-                    "route_id": event.route_id,
-                    "timestamp": event.timestamp
-                })
-                
-                # Mark as notified
-                event.notification_sent = True
+    try:
+        while True:
+            # Wait for one change, then drain whatever else a burst has queued
+            batch = [await _change_queue.get()]
+            while len(batch) < CHANGE_BATCH_SIZE and not _change_queue.empty():
+                batch.append(_change_queue.get_nowait())
             
-            db.commit()
+            sends = []
+            event_ids = []
+            for kind, payload in batch:
+                if kind == "route":
+                    sends.append(manager.send_route_update(**payload))
+                else:
+                    sends.append(notify_new_event(payload))
+                    event_ids.append(payload["id"])
             
-            # Wait before next monitoring cycle
-            await asyncio.sleep(10)  # Monitor every 10 seconds
+            for result in await asyncio.gather(*sends, return_exceptions=True):
+                if isinstance(result, Exception):
+                    logger.error(f"Error in real-time monitoring: {result}")
             
-        except Exception as e:
-            logger.error(f"Error in real-time monitoring: {e}")
-            await asyncio.sleep(10)
+            if event_ids:
+                try:
+                    await run_in_threadpool(_mark_events_notified, event_ids)
+                except Exception as e:
+                    logger.error(f"Error marking events as notified: {e}")
+    finally:
+        _change_queue = None
+        _change_loop = None
 
 # Export the manager and router
 __all__ = ["manager", "websocket_router", "notify_route_status_change", "notify_new_event", "notify_eta_change", "notify_reoptimization"]
\ No newline at end of file
@@ -2,51 +2,77 @@
 Caching utilities for VRPTW optimization system
 """
 
+import asyncio
 import hashlib
-import json
 import logging
-from typing import Any, Optional, Callable
+import struct
+import time
+from typing import Any, Optional, Callable, Tuple
+from collections import OrderedDict
 from functools import wraps
-from datetime import datetime, timedelta
 import numpy as np
+import orjson
+import redis
+
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 
 class SimpleCache:
-    """Simple in-memory cache with TTL support"""
+    """Simple in-memory LRU cache with TTL support"""
     
-    def __init__(self, default_ttl_seconds: int = 3600):
-        self.cache: dict = {}
+    def __init__(self, default_ttl_seconds: int = 3600, maxsize: int = 10000):
+        # key -> (value, expires_at as time.monotonic() seconds), least recently used first
+        self.cache: OrderedDict = OrderedDict()
         self.default_ttl = default_ttl_seconds
+        self.maxsize = maxsize
+        self._cleanup_handle: Optional[asyncio.TimerHandle] = None
         
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
-        if key not in self.cache:
+        entry = self.cache.get(key)
+        if entry is None:
             return None
-            
-        entry = self.cache[key]
         
         # Check if expired
-        if datetime.now() > entry['expires_at']:
+        if time.monotonic() > entry[1]:
             del self.cache[key]
             return None
-            
+        
+        self.cache.move_to_end(key)
         logger.debug(f"Cache hit for key: {key}")
-        return entry['value']
+        return entry[0]
         
     def set(self, key: str, value: Any, ttl: Optional[int] = None):
         """Set value in cache"""
         ttl = ttl or self.default_ttl
-        expires_at = datetime.now() + timedelta(seconds=ttl)
+        self.cache[key] = (value, time.monotonic() + ttl)
+        self.cache.move_to_end(key)
         
-        self.cache[key] = {
-            'value': value,
-            'expires_at': expires_at
-        }
+        # Evict least recently used entries
+        while len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
         
         logger.debug(f"Cache set for key: {key}, TTL: {ttl}s")
         
+    def get_many(self, keys: list) -> list:
+        """Get several values at once (None for misses)"""
+        return [self.get(key) for key in keys]
+        
+    def set_many(self, items: dict, ttl: Optional[int] = None):
+        """Set several values at once"""
+        for key, value in items.items():
+            self.set(key, value, ttl)
+        
+    async def aget_many(self, keys: list) -> list:
+        """get_many for async callers"""
+        return self.get_many(keys)
+        
+    async def aset_many(self, items: dict, ttl: Optional[int] = None):
+        """set_many for async callers"""
+        self.set_many(items, ttl)
+        
     def delete(self, key: str):
         """Delete value from cache"""
         if key in self.cache:
@@ -60,45 +86,305 @@ class SimpleCache:
         
     def cleanup_expired(self):
         """Remove expired entries"""
-        now = datetime.now()
-        expired_keys = [
-            key for key, entry in self.cache.items()
-            if now > entry['expires_at']
-        ]
+        now = time.monotonic()
+        size_before = len(self.cache)
+        self.cache = OrderedDict(
+            (key, entry) for key, entry in self.cache.items() if entry[1] > now
+        )
         
-        for key in expired_keys:
-            del self.cache[key]
+        expired_count = size_before - len(self.cache)
+        if expired_count:
+            logger.info(f"Cleaned up {expired_count} expired cache entries")
             
-        if expired_keys:
-            logger.info(f"Cleaned up {len(expired_keys)} expired cache entries")
+    def schedule_cleanup(self, interval_seconds: float = 300.0):
+        """Run cleanup_expired periodically on the running event loop"""
+        loop = asyncio.get_running_loop()
+        
+        def _tick():
+            self.cleanup_expired()
+            self._cleanup_handle = loop.call_later(interval_seconds, _tick)
+            
+        self.cancel_cleanup()
+        self._cleanup_handle = loop.call_later(interval_seconds, _tick)
+        
+    def cancel_cleanup(self):
+        """Stop periodic cleanup"""
+        if self._cleanup_handle is not None:
+            self._cleanup_handle.cancel()
+            self._cleanup_handle = None
 
 
-class DistanceMatrixCache(SimpleCache):
+class RedisCache(SimpleCache):
+    """
+    Redis-backed cache shared between workers and restarts
+    
+    Keys are namespaced as "{prefix}:{key}" and expire via SETEX, so no cleanup
+    pass is needed. If Redis is unreachable the cache falls back to the
+    in-process storage of SimpleCache and retries the connection later.
+    
+    Values are stored as JSON (orjson), never pickled: anyone able to write to
+    the shared Redis could otherwise run code in the workers on load. The
+    client is synchronous, so async code uses aget_many/aset_many, which run
+    the Redis round-trips in a worker thread.
+    """
+    
+    RETRY_INTERVAL_SECONDS = 60
+    
+    def __init__(
+        self,
+        prefix: str,
+        default_ttl_seconds: int = 3600,
+        maxsize: int = 10000,
+        redis_url: Optional[str] = None
+    ):
+        super().__init__(default_ttl_seconds=default_ttl_seconds, maxsize=maxsize)
+        self.prefix = prefix
+        self.redis_url = redis_url or settings.redis_url
+        self._client: Optional[redis.Redis] = None
+        self._retry_at = 0.0
+        
+    def _namespaced(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+        
+    def _get_client(self) -> Optional[redis.Redis]:
+        """Return a connected client, or None while Redis is unavailable"""
+        if self._client is not None:
+            return self._client
+        if time.monotonic() < self._retry_at:
+            return None
+        try:
+            client = redis.Redis.from_url(
+                self.redis_url,
+                socket_connect_timeout=0.5,
+                socket_timeout=1.0
+            )
+            client.ping()
+            self._client = client
+            logger.info(f"Cache '{self.prefix}' connected to Redis")
+        except redis.RedisError as e:
+            self._on_redis_error(e)
+        return self._client
+        
+    async def _aget_client(self) -> Optional[redis.Redis]:
+        """_get_client without blocking the event loop on (re)connecting"""
+        if self._client is not None or time.monotonic() < self._retry_at:
+            return self._client
+        return await asyncio.to_thread(self._get_client)
+        
+    def _dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+        
+    def _loads(self, raw: bytes) -> Any:
+        return orjson.loads(raw)
+        
+    def _decode(self, key: str, raw: Optional[bytes]) -> Optional[Any]:
+        """Stored value, or None for a miss or a value this cache did not write"""
+        if raw is None:
+            return None
+        try:
+            return self._loads(raw)
+        except (ValueError, struct.error):
+            logger.warning(f"Ignoring undecodable value for key '{key}' in cache '{self.prefix}'")
+            return None
+        
+    def _on_redis_error(self, error: Exception):
+        logger.warning(f"Redis unavailable for cache '{self.prefix}', using in-process cache: {error}")
+        self._client = None
+        self._retry_at = time.monotonic() + self.RETRY_INTERVAL_SECONDS
+        
+    def get(self, key: str) -> Optional[Any]:
+        """Get value from cache"""
+        client = self._get_client()
+        if client is None:
+            return super().get(key)
+        try:
+            raw = client.get(self._namespaced(key))
+        except redis.RedisError as e:
+            self._on_redis_error(e)
+            return super().get(key)
+        
+        value = self._decode(key, raw)
+        if value is not None:
+            logger.debug(f"Cache hit for key: {key}")
+        return value
+        
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        """Set value in cache"""
+        client = self._get_client()
+        if client is None:
+            return super().set(key, value, ttl)
+        ttl = ttl or self.default_ttl
+        try:
+            client.setex(self._namespaced(key), ttl, self._dumps(value))
+        except redis.RedisError as e:
+            self._on_redis_error(e)
+            return super().set(key, value, ttl)
+        logger.debug(f"Cache set for key: {key}, TTL: {ttl}s")
+        
+    def get_many(self, keys: list) -> list:
+        """Get several values in one MGET round-trip (None for misses)"""
+        client = self._get_client()
+        if client is None or not keys:
+            return super().get_many(keys)
+        try:
+            raws = client.mget([self._namespaced(key) for key in keys])
+        except redis.RedisError as e:
+            self._on_redis_error(e)
+            return super().get_many(keys)
+        return [self._decode(key, raw) for key, raw in zip(keys, raws)]
+        
+    def set_many(self, items: dict, ttl: Optional[int] = None):
+        """Set several values in one pipelined round-trip"""
+        client = self._get_client()
+        if client is None or not items:
+            return super().set_many(items, ttl)
+        ttl = ttl or self.default_ttl
+        try:
+            self._setex_pipeline(client, items, ttl)
+        except redis.RedisError as e:
+            self._on_redis_error(e)
+            super().set_many(items, ttl)
+        
+    def _setex_pipeline(self, client: redis.Redis, items: dict, ttl: int):
+        pipe = client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.setex(self._namespaced(key), ttl, self._dumps(value))
+        pipe.execute()
+        
+    async def aget_many(self, keys: list) -> list:
+        """get_many with the MGET round-trip off the event loop"""
+        client = await self._aget_client()
+        if client is None or not keys:
+            return super().get_many(keys)
+        try:
+            raws = await asyncio.to_thread(client.mget, [self._namespaced(key) for key in keys])
+        except redis.RedisError as e:
+            self._on_redis_error(e)
+            return super().get_many(keys)
+        return [self._decode(key, raw) for key, raw in zip(keys, raws)]
+        
+    async def aset_many(self, items: dict, ttl: Optional[int] = None):
+        """set_many with the pipelined round-trip off the event loop"""
+        client = await self._aget_client()
+        if client is None or not items:
+            return super().set_many(items, ttl)
+        ttl = ttl or self.default_ttl
+        try:
+            await asyncio.to_thread(self._setex_pipeline, client, items, ttl)
+        except redis.RedisError as e:
+            self._on_redis_error(e)
+            super().set_many(items, ttl)
+        
+    def delete(self, key: str):
+        """Delete value from cache"""
+        super().delete(key)
+        client = self._get_client()
+        if client is None:
+            return
+        try:
+            client.delete(self._namespaced(key))
+        except redis.RedisError as e:
+            self._on_redis_error(e)
+            
+    def clear(self):
+        """Clear all cache entries under this prefix"""
+        super().clear()
+        client = self._get_client()
+        if client is None:
+            return
+        try:
+            keys = list(client.scan_iter(match=self._namespaced("*"), count=500))
+            if keys:
+                client.unlink(*keys)
+        except redis.RedisError as e:
+            self._on_redis_error(e)
+
+
+class DistanceMatrixCache(RedisCache):
     """Specialized cache for distance matrices"""
     
-    def __init__(self, ttl_seconds: int = 86400):  # 24 hours default
-        super().__init__(default_ttl_seconds=ttl_seconds)
+    # Stored in Redis as the matrix shape (two uint32) followed by the raw float32 data
+    _SHAPE = struct.Struct("<II")
+    
+    def __init__(self, ttl_seconds: int = 86400, maxsize: int = 512):  # 24 hours default
+        super().__init__(prefix="distance_matrix", default_ttl_seconds=ttl_seconds, maxsize=maxsize)
+        
+    def _dumps(self, value: dict) -> bytes:
+        return self._SHAPE.pack(*value['shape']) + value['data']
+        
+    def _loads(self, raw: bytes) -> dict:
+        return {'shape': self._SHAPE.unpack_from(raw), 'data': raw[self._SHAPE.size:]}
+        
+    def _key_and_order(self, locations: list) -> Tuple[str, np.ndarray]:
+        """Cache key for the location set and the permutation sorting the locations"""
+        # Sort locations (by latitude, then longitude) to ensure consistent hashing,
+        # then hash the packed float64 pairs instead of a JSON string
+        coords = np.asarray(locations, dtype=np.float64).reshape(-1, 2)
+        order = np.lexsort((coords[:, 1], coords[:, 0]))
+        return hashlib.blake2b(coords[order].tobytes(), digest_size=16).hexdigest(), order
         
     def get_matrix_key(self, locations: list) -> str:
         """Generate cache key for location set"""
-        # Sort locations to ensure consistent hashing
-        sorted_locations = sorted([tuple(loc) for loc in locations])
-        location_str = json.dumps(sorted_locations)
-        return hashlib.md5(location_str.encode()).hexdigest()
+        return self._key_and_order(locations)[0]
         
     def get_matrix(self, locations: list) -> Optional[np.ndarray]:
-        """Get distance matrix from cache"""
-        key = self.get_matrix_key(locations)
+        """Get distance matrix from cache, rows/columns in the order of locations"""
+        key, order = self._key_and_order(locations)
         cached = self.get(key)
         
         if cached is not None:
-            return np.array(cached)
+            matrix = np.frombuffer(cached['data'], dtype=np.float32).reshape(cached['shape'])
+            # Stored in sorted-location order (the key's order): map back to the caller's order
+            inverse = np.argsort(order)
+            return matrix[np.ix_(inverse, inverse)]
         return None
         
     def set_matrix(self, locations: list, matrix: np.ndarray):
         """Set distance matrix in cache"""
-        key = self.get_matrix_key(locations)
-        self.set(key, matrix.tolist())
+        key, order = self._key_and_order(locations)
+        # Raw float32 bytes: distances in km keep sub-meter precision,
+        # and no per-element Python floats are created on either side
+        self.set(key, {
+            'shape': matrix.shape,
+            'data': matrix[np.ix_(order, order)].astype(np.float32, copy=False).tobytes()
+        })
+
+
+def _build_fallback_key(prefix: str, args: tuple, kwargs: dict) -> str:
+    """Key for arguments JSON cannot encode: scalars verbatim, sequences by length"""
+    key_parts = [prefix]
+    
+    # Add args to key
+    for arg in args:
+        if isinstance(arg, (str, int, float, bool)):
+            key_parts.append(str(arg))
+        elif isinstance(arg, (list, tuple)):
+            key_parts.append(str(len(arg)))
+            
+    # Add kwargs to key
+    for k, v in sorted(kwargs.items()):
+        if isinstance(v, (str, int, float, bool)):
+            key_parts.append(f"{k}={v}")
+            
+    return ":".join(key_parts)
+
+
+# Canonical JSON of the arguments: dict keys sorted, NumPy values by content
+_KEY_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _build_cache_key(prefix: str, args: tuple, kwargs: dict) -> str:
+    """
+    Key stable across processes, so workers sharing Redis agree on it
+
+    JSON keeps argument types apart (1, 1.0 and true differ) and, unlike
+    hash() and repr(), depends on no per-process salt or object address.
+    """
+    try:
+        payload = orjson.dumps((args, kwargs), option=_KEY_OPTIONS)
+    except TypeError:
+        return _build_fallback_key(prefix, args, kwargs)
+    return f"{prefix}:{hashlib.blake2b(payload, digest_size=16).hexdigest()}"
 
 
 def cache_result(cache_instance: SimpleCache, ttl: Optional[int] = None, key_prefix: str = ""):
@@ -111,24 +397,12 @@ def cache_result(cache_instance: SimpleCache, ttl: Optional[int] = None, key_pre
         key_prefix: Prefix for cache key
     """
     def decorator(func: Callable):
+        prefix = f"{key_prefix}:{func.__name__}"
+        
         @wraps(func)
         def wrapper(*args, **kwargs):
             # Generate cache key from function name and arguments
-            key_parts = [key_prefix, func.__name__]
-            
-            # Add args to key
-            for arg in args:
-                if isinstance(arg, (str, int, float, bool)):
-                    key_parts.append(str(arg))
-                elif isinstance(arg, (list, tuple)):
-                    key_parts.append(str(len(arg)))
-                    
-            # Add kwargs to key
-            for k, v in sorted(kwargs.items()):
-                if isinstance(v, (str, int, float, bool)):
-                    key_parts.append(f"{k}={v}")
-                    
-            cache_key = ":".join(key_parts)
+            cache_key = _build_cache_key(prefix, args, kwargs)
             
             # Try to get from cache
             cached_result = cache_instance.get(cache_key)
@@ -150,5 +424,19 @@ def cache_result(cache_instance: SimpleCache, ttl: Optional[int] = None, key_pre
 
 # Global cache instances
 distance_cache = DistanceMatrixCache()
-route_cache = SimpleCache(default_ttl_seconds=1800)  # 30 minutes
-geocoding_cache = SimpleCache(default_ttl_seconds=86400)  # 24 hours
+route_cache = RedisCache(prefix="route", default_ttl_seconds=1800)  # 30 minutes
+geocoding_cache = RedisCache(prefix="geocoding", default_ttl_seconds=86400)  # 24 hours
+traffic_level_cache = RedisCache(prefix="traffic_cell", default_ttl_seconds=300)  # 5 minutes
+traffic_leg_cache = RedisCache(prefix="traffic_leg", default_ttl_seconds=300)  # 5 minutes
+
+
+def start_cache_cleanup(interval_seconds: float = 300.0):
+    """Schedule periodic expiry of the global caches' in-process entries"""
+    for cache in (distance_cache, route_cache, geocoding_cache, traffic_level_cache, traffic_leg_cache):
+        cache.schedule_cleanup(interval_seconds)
+
+
+def stop_cache_cleanup():
+    """Cancel periodic expiry of the global caches"""
+    for cache in (distance_cache, route_cache, geocoding_cache, traffic_level_cache, traffic_leg_cache):
+        cache.cancel_cleanup()
@@ -1,8 +1,11 @@
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from functools import lru_cache
 from typing import Optional
 import os
 
 class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=False, frozen=True)
+    
     # Database
     database_url: str = "sqlite:///./vrptw.db"
     
@@ -35,12 +38,17 @@ class Settings(BaseSettings):
     ws_heartbeat_interval: int = 30
     ws_max_connections: int = 100
     
+    # Monitoring (METRICS_ENABLED=0 disables the track_*_metrics decorators)
+    metrics_enabled: bool = True
+    
     # Celery
     celery_broker_url: str = "redis://localhost:6379/0"
     celery_result_backend: str = "redis://localhost:6379/0"
-    
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
 
-settings = Settings()
\ No newline at end of file
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Settings are parsed from the environment and .env once per process"""
+    return Settings()
+
+settings = get_settings()
\ No newline at end of file
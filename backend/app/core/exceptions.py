@@ -8,6 +8,9 @@ from typing import Optional, Dict, Any
 class VRPTWException(Exception):
     """Base exception for VRPTW system"""
     
+    # Fixed attributes live in slots; the instance __dict__ is never allocated
+    __slots__ = ('message', 'details')
+    
     def __init__(self, message: str, details: Optional[Dict[str, Any]] = None):
         self.message = message
         self.details = details or {}
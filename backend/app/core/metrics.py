@@ -2,10 +2,17 @@
 Модуль для сбора метрик Prometheus
 """
 from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
-from prometheus_client.core import CollectorRegistry
+from prometheus_client.core import CollectorRegistry, GaugeMetricFamily
+from app.core.config import settings
+from app.database import SessionLocal
+from sqlalchemy import text
+import asyncio
+import gzip
+import logging
 import time
-from functools import wraps
-from typing import Callable, Any
+from typing import Callable, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
 
 # Создаем собственный реестр метрик
 REGISTRY = CollectorRegistry()
@@ -22,6 +29,7 @@ api_request_duration_seconds = Histogram(
     'api_request_duration_seconds',
     'API request duration in seconds',
     ['method', 'endpoint'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float('inf')),
     registry=REGISTRY
 )
 
@@ -37,6 +45,8 @@ optimization_duration_seconds = Histogram(
     'optimization_duration_seconds',
     'Optimization duration in seconds',
     ['algorithm'],
+    # Решение VRPTW занимает от долей секунды до лимита времени решателя (до 10 минут)
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, float('inf')),
     registry=REGISTRY
 )
 
@@ -58,6 +68,21 @@ optimization_total_cost = Gauge(
     registry=REGISTRY
 )
 
+# Метрики адаптивного мониторинга маршрутов
+route_monitoring_cycle_duration_seconds = Histogram(
+    'route_monitoring_cycle_duration_seconds',
+    'Duration of adaptive route monitoring cycles in seconds',
+    # Цикл запускается раз в интервал мониторинга (по умолчанию 60 с)
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, float('inf')),
+    registry=REGISTRY
+)
+
+route_monitoring_overruns_total = Counter(
+    'route_monitoring_overruns_total',
+    'Monitoring cycles that took longer than the monitoring interval',
+    registry=REGISTRY
+)
+
 # Метрики для базы данных
 db_connections_active = Gauge(
     'db_connections_active',
@@ -69,143 +94,238 @@ db_query_duration_seconds = Histogram(
     'db_query_duration_seconds',
     'Database query duration in seconds',
     ['operation'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, float('inf')),
     registry=REGISTRY
 )
 
-# Метрики для заказов
-orders_total = Gauge(
-    'orders_total',
-    'Total number of orders',
-    ['status'],
-    registry=REGISTRY
-)
-
-vehicles_total = Gauge(
-    'vehicles_total',
-    'Total number of vehicles',
-    ['status'],
-    registry=REGISTRY
-)
-
-drivers_total = Gauge(
-    'drivers_total',
-    'Total number of drivers',
-    ['status'],
-    registry=REGISTRY
-)
+def _cheap_wraps(wrapper: Callable, func: Callable) -> Callable:
+    """Копирует только имя и docstring (без __dict__ и цепочки __wrapped__)"""
+    wrapper.__name__ = func.__name__
+    wrapper.__qualname__ = func.__qualname__
+    wrapper.__doc__ = func.__doc__
+    return wrapper
 
 # Декораторы для автоматического сбора метрик
 def track_api_metrics(endpoint: str):
     """Декоратор для отслеживания метрик API"""
+    method = "GET"  # По умолчанию, можно улучшить
+    # Дочерние метрики с привязанными метками создаем один раз, а не на каждый запрос
+    requests_ok = api_requests_total.labels(method=method, endpoint=endpoint, status_code="200")
+    requests_failed = api_requests_total.labels(method=method, endpoint=endpoint, status_code="500")
+    request_duration = api_request_duration_seconds.labels(method=method, endpoint=endpoint)
+    
     def decorator(func: Callable) -> Callable:
-        @wraps(func)
+        if not settings.metrics_enabled:
+            return func
+        
         async def wrapper(*args, **kwargs):
-            start_time = time.time()
-            method = "GET"  # По умолчанию, можно улучшить
-            status_code = "200"
+            start_ns = time.perf_counter_ns()
+            requests_counter = requests_ok
             
             try:
                 result = await func(*args, **kwargs)
                 return result
             except Exception as e:
-                status_code = "500"
+                requests_counter = requests_failed
                 raise
             finally:
-                duration = time.time() - start_time
-                api_requests_total.labels(
-                    method=method,
-                    endpoint=endpoint,
-                    status_code=status_code
-                ).inc()
-                api_request_duration_seconds.labels(
-                    method=method,
-                    endpoint=endpoint
-                ).observe(duration)
+                duration = (time.perf_counter_ns() - start_ns) * 1e-9
+                requests_counter.inc()
+                request_duration.observe(duration)
         
-        return wrapper
+        # FastAPI строит зависимости эндпоинта по сигнатуре из __wrapped__
+        wrapper.__wrapped__ = func
+        return _cheap_wraps(wrapper, func)
     return decorator
 
 def track_optimization_metrics(algorithm: str):
     """Декоратор для отслеживания метрик оптимизации"""
+    requests_success = optimization_requests_total.labels(algorithm=algorithm, status="success")
+    requests_error = optimization_requests_total.labels(algorithm=algorithm, status="error")
+    duration_histogram = optimization_duration_seconds.labels(algorithm=algorithm)
+    
     def decorator(func: Callable) -> Callable:
-        @wraps(func)
+        if not settings.metrics_enabled:
+            return func
+        
         def wrapper(*args, **kwargs):
-            start_time = time.time()
-            status = "success"
+            start_ns = time.perf_counter_ns()
+            requests_counter = requests_success
             
             try:
                 result = func(*args, **kwargs)
                 
-                # Обновляем метрики на основе результата
-                if hasattr(result, 'routes'):
-                    optimization_routes_generated.set(len(result.routes))
-                if hasattr(result, 'total_distance'):
-                    optimization_total_distance.set(result.total_distance)
-                if hasattr(result, 'total_cost'):
-                    optimization_total_cost.set(result.total_cost)
+                # Обновляем метрики на основе результата: VRPTWSolver возвращает dict,
+                # остальные оптимизаторы - объекты с атрибутами
+                if isinstance(result, dict):
+                    routes = result.get('routes')
+                    total_distance = result.get('total_distance')
+                    total_cost = result.get('total_cost')
+                else:
+                    routes = getattr(result, 'routes', None)
+                    total_distance = getattr(result, 'total_distance', None)
+                    total_cost = getattr(result, 'total_cost', None)
+                
+                if routes is not None:
+                    optimization_routes_generated.set(len(routes))
+                if total_distance is not None:
+                    optimization_total_distance.set(total_distance)
+                if total_cost is not None:
+                    optimization_total_cost.set(total_cost)
                 
                 return result
             except Exception as e:
-                status = "error"
+                requests_counter = requests_error
                 raise
             finally:
-                duration = time.time() - start_time
-                optimization_requests_total.labels(
-                    algorithm=algorithm,
-                    status=status
-                ).inc()
-                optimization_duration_seconds.labels(
-                    algorithm=algorithm
-                ).observe(duration)
+                duration = (time.perf_counter_ns() - start_ns) * 1e-9
+                requests_counter.inc()
+                duration_histogram.observe(duration)
         
-        return wrapper
+        return _cheap_wraps(wrapper, func)
     return decorator
 
 def track_db_metrics(operation: str):
     """Декоратор для отслеживания метрик базы данных"""
+    query_duration = db_query_duration_seconds.labels(operation=operation)
+    
     def decorator(func: Callable) -> Callable:
-        @wraps(func)
+        if not settings.metrics_enabled:
+            return func
+        
         async def wrapper(*args, **kwargs):
-            start_time = time.time()
+            start_ns = time.perf_counter_ns()
             
             try:
                 result = await func(*args, **kwargs)
                 return result
             finally:
-                duration = time.time() - start_time
-                db_query_duration_seconds.labels(
-                    operation=operation
-                ).observe(duration)
+                duration = (time.perf_counter_ns() - start_ns) * 1e-9
+                query_duration.observe(duration)
         
-        return wrapper
+        return _cheap_wraps(wrapper, func)
     return decorator
 
-def get_metrics():
-    """Возвращает метрики в формате Prometheus"""
-    return generate_latest(REGISTRY)
+def get_metrics(accept_encoding: str = "") -> Tuple[bytes, Optional[str]]:
+    """
+    Возвращает метрики в формате Prometheus и Content-Encoding ответа
+    
+    Если клиент принимает gzip, тело сжимается с compresslevel=1: текстовый
+    формат очень повторяющийся и хорошо сжимается даже на минимальном уровне.
+    """
+    body = generate_latest(REGISTRY)
+    if "gzip" in accept_encoding:
+        return gzip.compress(body, compresslevel=1), "gzip"
+    return body, None
+
+# Бизнес-метрики (заказы, транспорт, водители по статусам)
+_BUSINESS_METRICS = (
+    ('orders_total', 'Total number of orders'),
+    ('vehicles_total', 'Total number of vehicles'),
+    ('drivers_total', 'Total number of drivers'),
+)
+
+# Все группировки одним UNION ALL: один запрос к БД и согласованный снимок всех
+# трех таблиц. Текст запроса статичен, поэтому собирается один раз при импорте;
+# status приводится к тексту в каждой ветке: столбцы разных типов (SMALLINT у
+# orders/vehicles, enum driverstatus у drivers) PostgreSQL в одном UNION не
+# объединяет. Получается строка порядкового номера члена enum для orders/vehicles
+# (SmallIntEnum) и имя члена для drivers
+_BUSINESS_COUNTS_SQL = text(
+    "SELECT 'orders_total' AS metric_name, CAST(status AS TEXT) AS status, COUNT(*) AS count "
+    "FROM orders GROUP BY status "
+    "UNION ALL "
+    "SELECT 'vehicles_total', CAST(status AS TEXT), COUNT(*) FROM vehicles GROUP BY status "
+    "UNION ALL "
+    "SELECT 'drivers_total', CAST(status AS TEXT), COUNT(*) FROM drivers GROUP BY status"
+)
 
-def update_business_metrics(session):
-    """Обновляет бизнес-метрики из базы данных"""
-    from app.models import Order, Vehicle, Driver
-    from app.models.order import OrderStatus
-    from app.models.vehicle import VehicleStatus
-    from app.models.driver import DriverStatus
+class BusinessMetricsCollector:
+    """
+    Коллектор бизнес-метрик, отдающий снимок, который обновляется в фоне
+    
+    Запросы к БД выполняет фоновая задача (refresh), scrape только отдает
+    последний снимок. Снимок заменяется целиком одним присваиванием,
+    поэтому блокировки между задачей и scrape не нужны.
+    """
+    
+    # Не чаще одного сообщения об ошибке в минуту при недоступной БД
+    ERROR_LOG_INTERVAL_SECONDS = 60
+    
+    def __init__(self, session_factory: Callable):
+        self.session_factory = session_factory
+        self._last_error_log = float("-inf")
+        # Пары (имя в БД, значение метки) по семействам, вычисляются при первом обновлении
+        self._status_labels: Optional[tuple] = None
+        self._families: tuple = ()
+        self._refresh_task: Optional[asyncio.Task] = None
     
-    try:
-        # Метрики заказов
-        for status in OrderStatus:
-            count = session.query(Order).filter(Order.status == status).count()
-            orders_total.labels(status=status.value).set(count)
+    def describe(self):
+        # Набор семейств известен заранее, даже до первого обновления снимка
+        for name, documentation in _BUSINESS_METRICS:
+            yield GaugeMetricFamily(name, documentation, labels=['status'])
+    
+    def _get_status_labels(self) -> tuple:
+        if self._status_labels is None:
+            # Ленивый импорт моделей: app.models не должен загружаться вместе с метриками
+            from app.models.order import OrderStatus
+            from app.models.vehicle import VehicleStatus
+            from app.models.driver import DriverStatus
+            from app.models.enum_type import enum_ordinal
+            
+            self._status_labels = (
+                tuple((str(enum_ordinal(status)), status.value) for status in OrderStatus),
+                tuple((str(enum_ordinal(status)), status.value) for status in VehicleStatus),
+                tuple((status.name, status.value) for status in DriverStatus),
+            )
+        return self._status_labels
+    
+    def refresh(self):
+        """Перечитывает счетчики из БД (синхронно, вызывается из пула потоков)"""
+        status_labels = self._get_status_labels()
         
-        # Метрики транспортных средств
-        for status in VehicleStatus:
-            count = session.query(Vehicle).filter(Vehicle.status == status).count()
-            vehicles_total.labels(status=status.value).set(count)
+        session = self.session_factory()
+        try:
+            counts = {
+                (metric_name, status): count
+                for metric_name, status, count in session.execute(_BUSINESS_COUNTS_SQL)
+            }
+        except Exception:
+            # Оставляем предыдущий снимок
+            now = time.monotonic()
+            if now - self._last_error_log >= self.ERROR_LOG_INTERVAL_SECONDS:
+                self._last_error_log = now
+                logger.exception("Error collecting business metrics")
+            return
+        finally:
+            session.close()
         
-        # Метрики водителей
-        for status in DriverStatus:
-            count = session.query(Driver).filter(Driver.status == status).count()
-            drivers_total.labels(status=status.value).set(count)
-            
-    except Exception as e:
-        print(f"Error updating business metrics: {e}")
\ No newline at end of file
+        families = []
+        for (name, documentation), labels in zip(_BUSINESS_METRICS, status_labels):
+            family = GaugeMetricFamily(name, documentation, labels=['status'])
+            for db_status, label in labels:
+                family.add_metric([label], counts.get((name, db_status), 0))
+            families.append(family)
+        self._families = tuple(families)
+    
+    def collect(self):
+        return iter(self._families)
+    
+    async def _refresh_loop(self, interval_seconds: float):
+        while True:
+            await asyncio.to_thread(self.refresh)
+            await asyncio.sleep(interval_seconds)
+    
+    def start_refresh(self, interval_seconds: float = 30.0):
+        """Запускает фоновое обновление снимка в текущем event loop"""
+        self.stop_refresh()
+        self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_loop(interval_seconds))
+    
+    def stop_refresh(self):
+        """Останавливает фоновое обновление снимка"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+business_metrics_collector = BusinessMetricsCollector(SessionLocal)
+REGISTRY.register(business_metrics_collector)
@@ -1,14 +1,27 @@
+import orjson
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
+
+def _json_serializer(value) -> str:
+    """JSON column serializer (orjson returns bytes, the DBAPI expects str)"""
+    return orjson.dumps(value).decode()
+
+
 # Create database engine with SQLite threading fix
 engine = create_engine(
     settings.database_url,
     pool_pre_ping=True,
     pool_recycle=300,
     echo=settings.debug,
+    # Compiled SQL cache (default 500 entries); sized for the ORM statements of
+    # all models plus the per-endpoint query variants so they are not evicted
+    query_cache_size=1200,
+    # JSON/JSONB columns (e.g. Route.waypoints) are (de)serialized with orjson
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
     connect_args={
         "check_same_thread": False  # Fix for SQLite threading issues
     }
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, SmallInteger, String, Float, DateTime, Boolean, Text
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from app.database import Base
+from app.models.time_of_day import hhmm_property
 
 class Customer(Base):
     __tablename__ = "customers"
@@ -22,20 +23,21 @@ class Customer(Base):
     business_type = Column(String(100))
     is_active = Column(Boolean, default=True)
     
-    # Time preferences
-    preferred_delivery_start = Column(String(5))  # HH:MM format
-    preferred_delivery_end = Column(String(5))    # HH:MM format
+    # Time preferences (minutes since midnight, 0-1439)
+    preferred_delivery_start = Column(SmallInteger)
+    preferred_delivery_end = Column(SmallInteger)
     
-    # Extended time windows (for manual corrections)
-    actual_working_hours_start = Column(String(5))  # Реальное время начала работы
-    actual_working_hours_end = Column(String(5))    # Реальное время окончания работы
-    lunch_break_start = Column(String(5))           # Время начала обеда
-    lunch_break_end = Column(String(5))             # Время окончания обеда
+    # Extended time windows (for manual corrections), minutes since midnight
+    actual_working_hours_start = Column(SmallInteger)  # Реальное время начала работы
+    actual_working_hours_end = Column(SmallInteger)    # Реальное время окончания работы
+    lunch_break_start = Column(SmallInteger)           # Время начала обеда
+    lunch_break_end = Column(SmallInteger)             # Время окончания обеда
     
     # Special requirements
-    preferred_driver_ids = Column(Text)  # JSON array of preferred driver IDs
-    restricted_driver_ids = Column(Text)  # JSON array of restricted driver IDs
-    entry_restrictions = Column(Text)     # Особенности въезда на территорию
+    # Rarely read free-text columns are deferred: loaded on first access, not with every row
+    preferred_driver_ids = deferred(Column(Text))  # JSON array of preferred driver IDs
+    restricted_driver_ids = deferred(Column(Text))  # JSON array of restricted driver IDs
+    entry_restrictions = deferred(Column(Text))     # Особенности въезда на территорию
     requires_unloading_help = Column(Boolean, default=False)
     has_unloading_equipment = Column(Boolean, default=True)
     max_vehicle_size = Column(String(50))  # Ограничения по размеру ТС
@@ -47,14 +49,24 @@ class Customer(Base):
     historical_delays = Column(Integer, default=0)  # Количество задержек
     
     # Additional notes
-    notes = Column(Text)  # Дополнительные заметки для логистов
+    notes = deferred(Column(Text))  # Дополнительные заметки для логистов
     
     # Metadata
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
-    orders = relationship("Order", back_populates="customer")
+    # Reverse collections are not read by the application: lazy="raise_on_sql" turns
+    # an accidental load into an error instead of a silent SELECT; use selectinload()
+    orders = relationship("Order", back_populates="customer", lazy="raise_on_sql")
+    
+    # "HH:MM" views for display
+    preferred_delivery_start_str = hhmm_property("preferred_delivery_start")
+    preferred_delivery_end_str = hhmm_property("preferred_delivery_end")
+    actual_working_hours_start_str = hhmm_property("actual_working_hours_start")
+    actual_working_hours_end_str = hhmm_property("actual_working_hours_end")
+    lunch_break_start_str = hhmm_property("lunch_break_start")
+    lunch_break_end_str = hhmm_property("lunch_break_end")
     
     def __repr__(self):
         return f"<Customer(id={self.id}, name='{self.name}', city='{self.city}')>"
\ No newline at end of file
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, Enum
+from sqlalchemy import Column, Integer, SmallInteger, String, Float, DateTime, Boolean, Text, Enum, Index, text, true, false
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum as PyEnum
 from app.database import Base
+from app.models.time_of_day import hhmm_property
 
 class DriverStatus(PyEnum):
     AVAILABLE = "available"
@@ -17,6 +18,14 @@ class ExperienceLevel(PyEnum):
 class Driver(Base):
     __tablename__ = "drivers"
     
+    __table_args__ = (
+        # Status breakdown for business metrics and dashboards (GROUP BY status)
+        Index("ix_drivers_status", "status"),
+    )
+    # Literal defaults are filled in by the database (server_default); fetch them
+    # back with RETURNING during the INSERT instead of a later refresh SELECT
+    __mapper_args__ = {"eager_defaults": True}
+    
     id = Column(Integer, primary_key=True, index=True)
     employee_id = Column(String(50), unique=True, nullable=False, index=True)
     
@@ -32,34 +41,39 @@ class Driver(Base):
     license_categories = Column(String(20))  # A, B, C, D, etc.
     
     # Experience and skills
-    experience_level = Column(Enum(ExperienceLevel), default=ExperienceLevel.JUNIOR)
-    years_of_experience = Column(Float, default=0.0)
-    max_stops_per_route = Column(Integer, default=15)  # Based on experience
+    experience_level = Column(Enum(ExperienceLevel), server_default=text("'JUNIOR'"))
+    years_of_experience = Column(Float, server_default=text("0.0"))
+    max_stops_per_route = Column(Integer, server_default=text("15"))  # Based on experience
     
     # Working constraints
-    max_working_hours = Column(Integer, default=8)
-    shift_start_time = Column(String(5))  # HH:MM format
-    shift_end_time = Column(String(5))    # HH:MM format
+    max_working_hours = Column(Integer, server_default=text("8"))
+    shift_start_time = Column(SmallInteger)  # Minutes since midnight
+    shift_end_time = Column(SmallInteger)    # Minutes since midnight
     
     # Current status
-    status = Column(Enum(DriverStatus), default=DriverStatus.OFF_DUTY)
+    status = Column(Enum(DriverStatus), server_default=text("'OFF_DUTY'"))
     current_latitude = Column(Float)
     current_longitude = Column(Float)
     
     # Performance metrics
-    average_delivery_time = Column(Float, default=0.0)  # minutes
-    on_time_delivery_rate = Column(Float, default=0.0)  # percentage
-    customer_rating = Column(Float, default=5.0)        # 1-5 scale
-    total_deliveries = Column(Integer, default=0)
+    average_delivery_time = Column(Float, server_default=text("0.0"))  # minutes
+    on_time_delivery_rate = Column(Float, server_default=text("0.0"))  # percentage
+    customer_rating = Column(Float, server_default=text("5.0"))        # 1-5 scale
+    total_deliveries = Column(Integer, server_default=text("0"))
+    
+    # Denormalized route aggregates, maintained by Route mapper events (see route.py)
+    active_routes_count = Column(Integer, server_default=text("0"))    # planned + active routes
+    active_total_duration = Column(Integer, server_default=text("0"))  # minutes across active routes
+    completed_routes = Column(Integer, server_default=text("0"))
     
     # Preferences and restrictions
     preferred_areas = Column(Text)  # JSON array of area codes
     restricted_areas = Column(Text) # JSON array of restricted areas
-    can_handle_fragile = Column(Boolean, default=True)
-    can_handle_high_value = Column(Boolean, default=False)
-    specialization = Column(String, default="Стандартная доставка")
-    can_work_nights = Column(Boolean, default=False)
-    can_work_weekends = Column(Boolean, default=True)
+    can_handle_fragile = Column(Boolean, server_default=true())
+    can_handle_high_value = Column(Boolean, server_default=false())
+    specialization = Column(String, server_default=text("'Стандартная доставка'"))
+    can_work_nights = Column(Boolean, server_default=false())
+    can_work_weekends = Column(Boolean, server_default=true())
     notes = Column(Text, nullable=True)
     
     # Metadata
@@ -68,9 +82,15 @@ class Driver(Base):
     last_active = Column(DateTime(timezone=True))
     
     # Relationships
-    routes = relationship("Route", back_populates="driver")
-    orders = relationship("Order", back_populates="driver")
-    vehicles = relationship("Vehicle", back_populates="driver")
+    # Reverse collections are not read by the application: lazy="raise_on_sql" turns
+    # an accidental load into an error instead of a silent SELECT; use selectinload()
+    routes = relationship("Route", back_populates="driver", lazy="raise_on_sql")
+    orders = relationship("Order", back_populates="driver", lazy="raise_on_sql")
+    vehicles = relationship("Vehicle", back_populates="driver", lazy="raise_on_sql")
+    
+    # "HH:MM" views for display
+    shift_start_time_str = hhmm_property("shift_start_time")
+    shift_end_time_str = hhmm_property("shift_end_time")
     
     def __repr__(self):
         return f"<Driver(id={self.id}, name='{self.first_name} {self.last_name}', experience='{self.experience_level}')>"
@@ -91,19 +111,15 @@ class Driver(Base):
     
     def update_performance_metrics(self, delivery_time: float, was_on_time: bool, rating: float):
         """Update driver performance metrics after delivery"""
-        # Update average delivery time
-        total_time = self.average_delivery_time * self.total_deliveries + delivery_time
+        # Incremental means: avg += (x - avg) / n, with no avg * n products
         self.total_deliveries += 1
-        self.average_delivery_time = total_time / self.total_deliveries
+        n = self.total_deliveries
+        
+        # Update average delivery time
+        self.average_delivery_time += (delivery_time - self.average_delivery_time) / n
         
-        # Update on-time delivery rate
-        if was_on_time:
-            on_time_count = self.on_time_delivery_rate * (self.total_deliveries - 1) / 100
-            self.on_time_delivery_rate = ((on_time_count + 1) / self.total_deliveries) * 100
-        else:
-            on_time_count = self.on_time_delivery_rate * (self.total_deliveries - 1) / 100
-            self.on_time_delivery_rate = (on_time_count / self.total_deliveries) * 100
+        # Update on-time delivery rate (percent)
+        self.on_time_delivery_rate += ((100.0 if was_on_time else 0.0) - self.on_time_delivery_rate) / n
         
-        # Update customer rating (weighted average)
-        total_rating = self.customer_rating * (self.total_deliveries - 1) + rating
-        self.customer_rating = total_rating / self.total_deliveries
\ No newline at end of file
+        # Update customer rating (running average)
+        self.customer_rating += (rating - self.customer_rating) / n
@@ -0,0 +1,61 @@
+"""
+Enum columns stored as SMALLINT ordinals
+"""
+from enum import Enum as PyEnum
+from typing import Optional, Type
+
+from sqlalchemy import SmallInteger
+from sqlalchemy.types import TypeDecorator
+
+
+def enum_ordinal(member: PyEnum) -> int:
+    """Stored value of an enum member: its position in the enum definition"""
+    return list(type(member)).index(member)
+
+
+def ordinal_predicate(column: str, *members: PyEnum) -> str:
+    """SQL predicate matching the given members, e.g. for partial index WHERE clauses"""
+    ordinals = ", ".join(str(enum_ordinal(member)) for member in members)
+    return f"{column} IN ({ordinals})"
+
+
+class SmallIntEnum(TypeDecorator):
+    """
+    Python enum persisted as its ordinal in a SMALLINT column
+
+    Ordinals follow definition order, so new members must be appended to the
+    end of the enum; reordering or removing members requires a data migration.
+    Bind values may be members or their names/values (for code that assigns
+    e.g. RouteStatus.ACTIVE.value); loaded values are always members.
+
+    Anything else raises LookupError on bind, in filters as well as in
+    INSERT/UPDATE, so no row can be written that would fail to load.
+    """
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, enum_class: Type[PyEnum]):
+        super().__init__()
+        self.enum_class = enum_class
+        self._int_to_member = tuple(enum_class)
+        self._member_to_int = {}
+        for ordinal, member in enumerate(self._int_to_member):
+            self._member_to_int[member] = ordinal
+            self._member_to_int[member.name] = ordinal
+            self._member_to_int[member.value] = ordinal
+
+    def process_bind_param(self, value, dialect) -> Optional[int]:
+        if value is None:
+            return None
+        try:
+            return self._member_to_int[value]
+        except (KeyError, TypeError):
+            raise LookupError(f"{value!r} is not a valid {self.enum_class.__name__}") from None
+
+    def process_result_value(self, value, dialect) -> Optional[PyEnum]:
+        if value is None:
+            return None
+        if not 0 <= value < len(self._int_to_member):
+            raise LookupError(f"{value!r} is not a valid {self.enum_class.__name__} ordinal")
+        return self._int_to_member[value]
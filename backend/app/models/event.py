@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Enum, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Enum, JSON, Index, text, false
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum as PyEnum
+from datetime import datetime, timezone
 from app.database import Base
 
 class EventType(PyEnum):
@@ -32,15 +33,32 @@ class EventStatus(PyEnum):
     IGNORED = "ignored"
     ESCALATED = "escalated"
 
+def _as_utc(value):
+    """SQLite returns naive datetimes for DateTime(timezone=True); its CURRENT_TIMESTAMP is UTC"""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        # Partial index over events not yet broadcast to WebSocket clients
+        Index(
+            "ix_events_unnotified", "id",
+            postgresql_where=text("notifications_sent = false"),
+            sqlite_where=text("notifications_sent = 0")
+        ),
+    )
+    # Literal defaults are filled in by the database (server_default); fetch them
+    # back with RETURNING during the INSERT instead of a later refresh SELECT
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
     
     # Event classification
     event_type = Column(Enum(EventType), nullable=False, index=True)
-    severity = Column(Enum(EventSeverity), default=EventSeverity.MEDIUM)
-    status = Column(Enum(EventStatus), default=EventStatus.ACTIVE)
+    severity = Column(Enum(EventSeverity), server_default=text("'MEDIUM'"))
+    status = Column(Enum(EventStatus), server_default=text("'ACTIVE'"))
     
     # Event details
     title = Column(String(255), nullable=False)
@@ -64,13 +82,13 @@ class Event(Base):
     resolved_at = Column(DateTime(timezone=True))
     
     # Impact assessment
-    estimated_delay_minutes = Column(Integer, default=0)
-    affected_orders_count = Column(Integer, default=0)
-    cost_impact = Column(Float, default=0.0)
+    estimated_delay_minutes = Column(Integer, server_default=text("0"))
+    affected_orders_count = Column(Integer, server_default=text("0"))
+    cost_impact = Column(Float, server_default=text("0.0"))
     
     # Reoptimization trigger
-    triggers_reoptimization = Column(Boolean, default=False)
-    reoptimization_threshold_exceeded = Column(Boolean, default=False)
+    triggers_reoptimization = Column(Boolean, server_default=false())
+    reoptimization_threshold_exceeded = Column(Boolean, server_default=false())
     
     # Event data and context
     event_data = Column(JSON)  # Flexible JSON field for event-specific data
@@ -83,7 +101,7 @@ class Event(Base):
     resolved_by = Column(String(100))  # User ID or system component
     
     # Notification tracking
-    notifications_sent = Column(Boolean, default=False)
+    notifications_sent = Column(Boolean, server_default=false())
     notification_recipients = Column(Text)  # JSON array of recipients
     
     # Metadata
@@ -97,6 +115,20 @@ class Event(Base):
     order = relationship("Order", foreign_keys=[order_id])
     route_stop = relationship("RouteStop", foreign_keys=[route_stop_id])
     
+    # Event types that trigger reoptimization at high severity
+    _CRITICAL_EVENTS = frozenset({
+        EventType.VEHICLE_BREAKDOWN,
+        EventType.DRIVER_UNAVAILABLE,
+        EventType.TRAFFIC_DELAY
+    })
+    _HIGH_SEVERITIES = frozenset({EventSeverity.HIGH, EventSeverity.CRITICAL})
+    # Next severity level on escalation (CRITICAL stays CRITICAL)
+    _ESCALATION = {
+        EventSeverity.LOW: EventSeverity.MEDIUM,
+        EventSeverity.MEDIUM: EventSeverity.HIGH,
+        EventSeverity.HIGH: EventSeverity.CRITICAL
+    }
+    
     def __repr__(self):
         return f"<Event(id={self.id}, type='{self.event_type}', severity='{self.severity}', status='{self.status}')>"
     
@@ -108,40 +140,30 @@ class Event(Base):
     @property
     def duration_minutes(self) -> int:
         """Calculate event duration in minutes"""
-        if self.resolved_at:
-            duration = self.resolved_at - self.detected_at
-            return int(duration.total_seconds() / 60)
-        else:
-            current_time = func.now()
-            duration = current_time - self.detected_at
-            return int(duration.total_seconds() / 60)
+        end = _as_utc(self.resolved_at) or datetime.now(timezone.utc)
+        return int((end - _as_utc(self.detected_at)).total_seconds() // 60)
     
     def should_trigger_reoptimization(self, threshold_minutes: int = 15) -> bool:
-        """Determine if event should trigger route reoptimization"""
-        if self.triggers_reoptimization:
-            return True
-        
-        # Check if delay exceeds threshold
-        if self.estimated_delay_minutes >= threshold_minutes:
+        """Determine if event should trigger route reoptimization (does not modify the event)"""
+        return (
+            self.triggers_reoptimization
+            # Check if delay exceeds threshold
+            or self.estimated_delay_minutes >= threshold_minutes
+            # Check event type criticality
+            or (self.event_type in self._CRITICAL_EVENTS and self.severity in self._HIGH_SEVERITIES)
+        )
+    
+    def mark_threshold_exceeded(self, threshold_minutes: int = 15) -> bool:
+        """Flag the event if its estimated delay exceeds the reoptimization threshold"""
+        exceeded = self.estimated_delay_minutes >= threshold_minutes
+        if exceeded:
             self.reoptimization_threshold_exceeded = True
-            return True
-        
-        # Check event type criticality
-        critical_events = [
-            EventType.VEHICLE_BREAKDOWN,
-            EventType.DRIVER_UNAVAILABLE,
-            EventType.TRAFFIC_DELAY
-        ]
-        
-        if self.event_type in critical_events and self.severity in [EventSeverity.HIGH, EventSeverity.CRITICAL]:
-            return True
-        
-        return False
+        return exceeded
     
     def resolve(self, resolution_notes: str = None, resolved_by: str = "system"):
         """Mark event as resolved"""
         self.status = EventStatus.RESOLVED
-        self.resolved_at = func.now()
+        self.resolved_at = datetime.now(timezone.utc)
         if resolution_notes:
             self.resolution_notes = resolution_notes
         self.resolved_by = resolved_by
@@ -149,12 +171,7 @@ class Event(Base):
     def escalate(self, escalation_notes: str = None):
         """Escalate event to higher severity"""
         self.status = EventStatus.ESCALATED
-        if self.severity == EventSeverity.LOW:
-            self.severity = EventSeverity.MEDIUM
-        elif self.severity == EventSeverity.MEDIUM:
-            self.severity = EventSeverity.HIGH
-        elif self.severity == EventSeverity.HIGH:
-            self.severity = EventSeverity.CRITICAL
+        self.severity = self._ESCALATION.get(self.severity, self.severity)
         
         if escalation_notes:
             self.manual_response = escalation_notes
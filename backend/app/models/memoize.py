@@ -0,0 +1,30 @@
+"""
+Per-instance memoization of values derived from model columns
+"""
+from typing import Iterable
+
+from sqlalchemy import event
+
+
+def invalidate_on_change(model, cached_names: Iterable[str], source_attributes: Iterable[str]) -> None:
+    """
+    Drop functools.cached_property values of model instances when their inputs change
+
+    The cache lives in the instance __dict__, which SQLAlchemy does not clear on
+    expire/refresh, so those events invalidate it as well as assignments to any
+    of the source columns.
+    """
+    cached_names = tuple(cached_names)
+
+    def _invalidate(target, *args):
+        # Expiry on commit also visits states whose instance was already garbage collected
+        if target is None:
+            return
+        instance_dict = target.__dict__
+        for name in cached_names:
+            instance_dict.pop(name, None)
+
+    for attribute in source_attributes:
+        event.listen(getattr(model, attribute), "set", _invalidate)
+    for identifier in ("expire", "refresh", "refresh_flush"):
+        event.listen(model, identifier, _invalidate)
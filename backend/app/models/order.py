@@ -1,8 +1,14 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, Boolean, Text, ForeignKey, Index, event, select, text
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from enum import Enum as PyEnum
+from functools import cached_property
+from typing import Dict, Iterable, Optional
+import numpy as np
 from app.database import Base
+from app.models.enum_type import SmallIntEnum, ordinal_predicate
+from app.models.memoize import invalidate_on_change
 
 class OrderStatus(PyEnum):
     PENDING = "pending"
@@ -18,9 +24,35 @@ class OrderPriority(PyEnum):
     HIGH = "high"
     URGENT = "urgent"
 
+def _to_epoch(value) -> Optional[int]:
+    """Unix seconds of a datetime (naive values as local time, like datetime.timestamp)"""
+    return int(value.timestamp()) if value is not None else None
+
+def _epoch_default(source: str):
+    """INSERT default deriving an *_epoch column from its datetime parameter (bulk inserts too)"""
+    return lambda context: _to_epoch(context.get_current_parameters().get(source))
+
+ACTIVE_ORDER_STATUSES_SQL = ordinal_predicate(
+    "status", OrderStatus.PENDING, OrderStatus.ASSIGNED, OrderStatus.IN_TRANSIT
+)
+
 class Order(Base):
     __tablename__ = "orders"
     
+    __table_args__ = (
+        # Status breakdown for business metrics and dashboards (GROUP BY status)
+        Index("ix_orders_status", "status"),
+        # Partial index over the open orders the optimizer polls for
+        Index(
+            "ix_orders_active_status", "status",
+            postgresql_where=text(ACTIVE_ORDER_STATUSES_SQL),
+            sqlite_where=text(ACTIVE_ORDER_STATUSES_SQL)
+        ),
+        # Special-handling filters (has_fragile / has_temperature_controlled)
+        Index("ix_orders_fragile_items", "fragile_items"),
+        Index("ix_orders_temperature_controlled_items", "temperature_controlled_items"),
+    )
+    
     id = Column(Integer, primary_key=True, index=True)
     order_number = Column(String(50), unique=True, nullable=False, index=True)
     
@@ -38,6 +70,9 @@ class Order(Base):
     # Time windows
     time_window_start = Column(DateTime(timezone=True), nullable=False)
     time_window_end = Column(DateTime(timezone=True), nullable=False)
+    # Unix-seconds mirrors of the window for integer arithmetic (durations, solver arrays)
+    time_window_start_epoch = Column(BigInteger, default=_epoch_default("time_window_start"))
+    time_window_end_epoch = Column(BigInteger, default=_epoch_default("time_window_end"))
     estimated_service_time = Column(Integer, default=15)  # minutes
     
     # Order details
@@ -46,14 +81,16 @@ class Order(Base):
     value = Column(Float, default=0.0)   # monetary value
     
     # Status and priority
-    status = Column(Enum(OrderStatus), default=OrderStatus.PENDING)
-    priority = Column(Enum(OrderPriority), default=OrderPriority.MEDIUM)
+    status = Column(SmallIntEnum(OrderStatus), default=OrderStatus.PENDING)
+    priority = Column(SmallIntEnum(OrderPriority), default=OrderPriority.MEDIUM)
     
     # Special requirements
     requires_signature = Column(Boolean, default=False)
     fragile = Column(Boolean, default=False)
     temperature_controlled = Column(Boolean, default=False)
-    special_instructions = Column(Text)
+    # Large free-text columns are deferred as one "bulk" group: list queries skip
+    # them, and the first access loads the whole group in a single SELECT
+    special_instructions = deferred(Column(Text), group="bulk")
     
     # Scheduling
     planned_delivery_time = Column(DateTime(timezone=True))
@@ -64,9 +101,17 @@ class Order(Base):
     complexity_level = Column(String, nullable=True)
     weather_condition = Column(String, nullable=True)
     traffic_condition = Column(String, nullable=True)
-    risk_factors = Column(Text, nullable=True)
+    risk_factors = deferred(Column(Text, nullable=True), group="bulk")
     cost_multiplier = Column(Float, default=1.0)
     
+    # Denormalized order item totals, maintained by OrderItem mapper events
+    total_value = Column(Float, default=0.0)    # sum of item final prices
+    total_weight = Column(Float, default=0.0)   # kg
+    total_volume = Column(Float, default=0.0)   # m³
+    total_items = Column(Integer, default=0)    # sum of item quantities
+    fragile_items = Column(Integer, default=0)                # items flagged fragile
+    temperature_controlled_items = Column(Integer, default=0) # items needing temperature control
+    
     # Metadata
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -74,48 +119,146 @@ class Order(Base):
     # Relationships
     customer = relationship("Customer", back_populates="orders")
     driver = relationship("Driver", back_populates="orders")
-    route_stops = relationship("RouteStop", back_populates="order")
-    order_items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+    # Not read by the application; raise instead of a silent lazy SELECT (use selectinload())
+    route_stops = relationship("RouteStop", back_populates="order", lazy="raise_on_sql")
+    # Batch-load items with one "WHERE order_id IN (...)" per query instead of one
+    # lazy SELECT per order; use selectinload(Order.order_items) in queries that
+    # opt out of it (e.g. with lazyload/raiseload) but still need the items
+    order_items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan", lazy="selectin")
     
     def __repr__(self):
         return f"<Order(id={self.id}, number='{self.order_number}', status='{self.status}')>"
     
-    @property
+    @classmethod
+    def bulk_arrays(cls, session, ids: Iterable[int]) -> Dict[str, np.ndarray]:
+        """
+        Solver inputs of the given orders as contiguous NumPy arrays, in one SELECT
+        
+        Rows are ordered by id. Weights, volumes and coordinates are float32,
+        time windows are int64 epoch seconds.
+        """
+        rows = session.execute(
+            select(
+                cls.id, cls.weight, cls.volume,
+                cls.delivery_latitude, cls.delivery_longitude,
+                cls.time_window_start_epoch, cls.time_window_end_epoch
+            )
+            .where(cls.id.in_(list(ids)))
+            .order_by(cls.id)
+        ).all()
+        count = len(rows)
+        order_ids, weights, volumes, latitudes, longitudes, starts, ends = zip(*rows) if rows else ((),) * 7
+        
+        return {
+            "id": np.fromiter(order_ids, dtype=np.int64, count=count),
+            "weight": np.fromiter((w or 0.0 for w in weights), dtype=np.float32, count=count),
+            "volume": np.fromiter((v or 0.0 for v in volumes), dtype=np.float32, count=count),
+            "latitude": np.fromiter(latitudes, dtype=np.float32, count=count),
+            "longitude": np.fromiter(longitudes, dtype=np.float32, count=count),
+            "time_window_start": np.fromiter(starts, dtype=np.int64, count=count),
+            "time_window_end": np.fromiter(ends, dtype=np.int64, count=count),
+        }
+    
+    @cached_property
     def time_window_duration_minutes(self) -> int:
         """Calculate time window duration in minutes"""
-        if self.time_window_start and self.time_window_end:
-            delta = self.time_window_end - self.time_window_start
-            return int(delta.total_seconds() / 60)
+        start, end = self.time_window_start_epoch, self.time_window_end_epoch
+        if start is not None and end is not None:
+            return (end - start) // 60
         return 0
     
     def is_time_window_valid(self, delivery_time: DateTime) -> bool:
         """Check if delivery time falls within the time window"""
         return self.time_window_start <= delivery_time <= self.time_window_end
     
-    @property
+    # Instances read the denormalized columns; at class level the totals are
+    # correlated SUM subqueries over order_items, so queries and reports
+    # (e.g. db.query(Order.id, Order.total_order_value)) aggregate in SQL
+    
+    @classmethod
+    def _item_sum(cls, expression):
+        """Correlated SUM over the order's items, 0 when there are none"""
+        from app.models.order_item import OrderItem  # order_item imports this module
+        return (
+            select(func.coalesce(func.sum(expression(OrderItem)), 0))
+            .where(OrderItem.order_id == cls.id)
+            .scalar_subquery()
+        )
+    
+    @hybrid_property
     def total_order_value(self) -> float:
-        """Calculate total order value from order items"""
-        return sum(item.final_price for item in self.order_items)
+        """Total order value from order items"""
+        return self.total_value or 0.0
     
-    @property
+    @total_order_value.expression
+    def total_order_value(cls):
+        return cls._item_sum(lambda item: item.final_price)
+    
+    @hybrid_property
     def total_order_weight(self) -> float:
-        """Calculate total order weight from order items"""
-        return sum(item.total_weight for item in self.order_items)
+        """Total order weight from order items"""
+        return self.total_weight or 0.0
+    
+    @total_order_weight.expression
+    def total_order_weight(cls):
+        return cls._item_sum(lambda item: item.product_weight * item.quantity)
     
-    @property
+    @hybrid_property
     def total_order_volume(self) -> float:
-        """Calculate total order volume from order items"""
-        return sum(item.total_volume for item in self.order_items)
+        """Total order volume from order items"""
+        return self.total_volume or 0.0
     
-    @property
+    @total_order_volume.expression
+    def total_order_volume(cls):
+        return cls._item_sum(lambda item: item.product_volume * item.quantity)
+    
+    @hybrid_property
     def item_count(self) -> int:
-        """Get total number of items in the order"""
-        return sum(item.quantity for item in self.order_items)
+        """Total number of items in the order"""
+        return self.total_items or 0
+    
+    @item_count.expression
+    def item_count(cls):
+        return cls._item_sum(lambda item: item.quantity)
+    
+    @hybrid_property
+    def has_fragile(self) -> bool:
+        """Whether any order item is fragile"""
+        return (self.fragile_items or 0) > 0
+    
+    @has_fragile.expression
+    def has_fragile(cls):
+        return cls.fragile_items > 0
+    
+    @hybrid_property
+    def has_temperature_controlled(self) -> bool:
+        """Whether any order item needs temperature control"""
+        return (self.temperature_controlled_items or 0) > 0
+    
+    @has_temperature_controlled.expression
+    def has_temperature_controlled(cls):
+        return cls.temperature_controlled_items > 0
     
     def has_fragile_items(self) -> bool:
         """Check if order contains fragile items"""
-        return any(item.fragile for item in self.order_items)
+        return self.has_fragile
     
     def has_temperature_controlled_items(self) -> bool:
         """Check if order contains temperature-controlled items"""
-        return any(item.temperature_controlled for item in self.order_items)
\ No newline at end of file
+        return self.has_temperature_controlled
+
+
+# Keep the epoch mirrors in step with ORM assignments; the INSERT defaults cover Core inserts
+@event.listens_for(Order.time_window_start, "set")
+def _sync_time_window_start_epoch(target, value, oldvalue, initiator):
+    target.time_window_start_epoch = _to_epoch(value)
+
+@event.listens_for(Order.time_window_end, "set")
+def _sync_time_window_end_epoch(target, value, oldvalue, initiator):
+    target.time_window_end_epoch = _to_epoch(value)
+
+# Memoized per instance, recomputed after the time window is assigned or reloaded
+invalidate_on_change(
+    Order, ("time_window_duration_minutes",),
+    ("time_window_start", "time_window_end", "time_window_start_epoch", "time_window_end_epoch")
+)
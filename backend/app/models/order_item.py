@@ -2,18 +2,28 @@
 Модель элементов заказа для связи заказов с товарами
 """
 
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Text, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Text, Boolean, Computed, Index, event, inspect, update
+from sqlalchemy.orm import Session, relationship, object_session
+from sqlalchemy.orm.util import identity_key
 from sqlalchemy.sql import func
 from app.database import Base
+from app.models.order import Order
 
 class OrderItem(Base):
     __tablename__ = "order_items"
     
+    __table_args__ = (
+        # Выборка позиций заказа (selectin-загрузка, пересчёт итогов) и поиск
+        # дубликатов товара в заказе; заменяет отдельный индекс по order_id
+        Index("ix_order_items_order_product", "order_id", "product_id"),
+    )
+    # Вычисляемые столбцы возвращаются через RETURNING сразу при INSERT/UPDATE
+    __mapper_args__ = {"eager_defaults": True}
+    
     id = Column(Integer, primary_key=True, index=True)
     
     # Foreign keys
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
     
     # Quantity and pricing
@@ -32,6 +42,10 @@ class OrderItem(Base):
     product_weight = Column(Float, default=0.0)  # Weight per unit
     product_volume = Column(Float, default=0.0)  # Volume per unit in m³
     
+    # Итоги позиции - хранимые вычисляемые столбцы, пересчитываются БД при записи
+    total_weight = Column(Float, Computed("product_weight * quantity", persisted=True))
+    total_volume = Column(Float, Computed("product_volume * quantity", persisted=True))
+    
     # Special handling requirements
     special_instructions = Column(Text)
     requires_signature = Column(Boolean, default=False)
@@ -49,16 +63,6 @@ class OrderItem(Base):
     def __repr__(self):
         return f"<OrderItem(id={self.id}, order_id={self.order_id}, product_id={self.product_id}, quantity={self.quantity})>"
     
-    @property
-    def total_weight(self) -> float:
-        """Calculate total weight for this order item"""
-        return self.product_weight * self.quantity
-    
-    @property
-    def total_volume(self) -> float:
-        """Calculate total volume for this order item"""
-        return self.product_volume * self.quantity
-    
     def calculate_total_price(self) -> float:
         """Calculate total price before discounts"""
         return self.unit_price * self.quantity
@@ -89,4 +93,91 @@ class OrderItem(Base):
         self.product_weight = product.weight
         self.product_volume = product.volume_m3
         self.fragile = product.fragile
-        self.temperature_controlled = product.temperature_sensitive
\ No newline at end of file
+        self.temperature_controlled = product.temperature_sensitive
+
+
+# Денормализованные итоги заказа (Order.total_*): каждая позиция вносит свой вклад,
+# изменения применяются дельтами в той же транзакции, что и flush позиции
+ORDER_TOTAL_ATTRS = (
+    "total_value", "total_weight", "total_volume", "total_items",
+    "fragile_items", "temperature_controlled_items",
+)
+_ITEM_TOTAL_SOURCES = (
+    "final_price", "quantity", "product_weight", "product_volume",
+    "fragile", "temperature_controlled", "order_id",
+)
+
+def _order_item_totals(final_price, quantity, product_weight, product_volume,
+                       fragile, temperature_controlled) -> tuple:
+    """Вклад одной позиции в итоги заказа (в порядке ORDER_TOTAL_ATTRS)"""
+    quantity = quantity or 0
+    return (
+        final_price or 0.0,
+        (product_weight or 0.0) * quantity,
+        (product_volume or 0.0) * quantity,
+        quantity,
+        1 if fragile else 0,
+        1 if temperature_controlled else 0,
+    )
+
+def _current_totals(target) -> tuple:
+    return _order_item_totals(*(getattr(target, attr) for attr in _ITEM_TOTAL_SOURCES[:-1]))
+
+def _previous_value(target, attr: str):
+    """Значение атрибута до текущего flush"""
+    history = inspect(target).attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(target, attr)
+
+def _apply_order_totals(connection, target, order_id, delta: tuple):
+    """Сдвигает итоги заказа на delta и помечает их устаревшими в сессии"""
+    if order_id is None or not any(delta):
+        return
+    orders = Order.__table__
+    connection.execute(
+        update(orders)
+        .where(orders.c.id == order_id)
+        .values({
+            attr: func.coalesce(orders.c[attr], 0) + change
+            for attr, change in zip(ORDER_TOTAL_ATTRS, delta) if change
+        })
+    )
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("stale_order_totals", set()).add(order_id)
+
+# Загружаем прежнее значение при присваивании, даже если атрибут был expired,
+# чтобы after_update мог вычесть старый вклад позиции
+for _attr in _ITEM_TOTAL_SOURCES:
+    event.listen(getattr(OrderItem, _attr), "set", lambda target, value, oldvalue, initiator: value, active_history=True, retval=True)
+
+# Note: bulk query.update()/delete() bypasses mapper events; reconcile_order_totals.py repairs drift
+@event.listens_for(OrderItem, "after_insert")
+def _order_item_after_insert(mapper, connection, target):
+    _apply_order_totals(connection, target, target.order_id, _current_totals(target))
+
+@event.listens_for(OrderItem, "after_update")
+def _order_item_after_update(mapper, connection, target):
+    old_order_id = _previous_value(target, "order_id")
+    old = _order_item_totals(*(_previous_value(target, attr) for attr in _ITEM_TOTAL_SOURCES[:-1]))
+    new = _current_totals(target)
+    
+    if old_order_id == target.order_id:
+        _apply_order_totals(connection, target, target.order_id, tuple(n - o for n, o in zip(new, old)))
+    else:
+        _apply_order_totals(connection, target, old_order_id, tuple(-o for o in old))
+        _apply_order_totals(connection, target, target.order_id, new)
+
+@event.listens_for(OrderItem, "after_delete")
+def _order_item_after_delete(mapper, connection, target):
+    _apply_order_totals(connection, target, target.order_id, tuple(-v for v in _current_totals(target)))
+
+@event.listens_for(Session, "after_flush_postexec")
+def _expire_stale_order_totals(session, flush_context):
+    """Итоги обновлены SQL-запросом в обход ORM: перечитываем их при следующем обращении"""
+    order_ids = session.info.pop("stale_order_totals", None)
+    if not order_ids:
+        return
+    for order_id in order_ids:
+        order = session.identity_map.get(identity_key(Order, order_id))
+        if order is not None:
+            session.expire(order, ORDER_TOTAL_ATTRS)
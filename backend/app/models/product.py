@@ -2,11 +2,14 @@
 Модель товаров для системы управления доставкой
 """
 
-from sqlalchemy import Column, Integer, String, Float, Text, Boolean, Enum, DateTime
+from sqlalchemy import Column, Integer, String, Float, Text, Boolean, DateTime, Computed
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum as PyEnum
+from functools import cached_property
 from app.database import Base
+from app.models.enum_type import SmallIntEnum
+from app.models.memoize import invalidate_on_change
 
 class ProductCategory(PyEnum):
     ELECTRONICS = "electronics"
@@ -27,6 +30,8 @@ class ProductCondition(PyEnum):
 
 class Product(Base):
     __tablename__ = "products"
+    # Fetch the generated volume back with RETURNING instead of a later SELECT
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
     sku = Column(String(100), unique=True, nullable=False, index=True)  # Stock Keeping Unit
@@ -38,18 +43,20 @@ class Product(Base):
     length = Column(Float, nullable=False, default=0.0)  # cm
     width = Column(Float, nullable=False, default=0.0)   # cm
     height = Column(Float, nullable=False, default=0.0)  # cm
+    # Stored generated column: computed by the database on write, filterable/indexable
+    volume_m3 = Column(Float, Computed("length * width * height / 1000000.0", persisted=True))
     
     # Pricing
     base_price = Column(Float, nullable=False, default=0.0)
     cost_price = Column(Float, default=0.0)
     
     # Categorization
-    category = Column(Enum(ProductCategory), nullable=False, default=ProductCategory.OTHER)
+    category = Column(SmallIntEnum(ProductCategory), nullable=False, default=ProductCategory.OTHER)
     subcategory = Column(String(100))
     brand = Column(String(100))
     
     # Condition and handling
-    condition = Column(Enum(ProductCondition), default=ProductCondition.NEW)
+    condition = Column(SmallIntEnum(ProductCondition), default=ProductCondition.NEW)
     fragile = Column(Boolean, default=False)
     hazardous = Column(Boolean, default=False)
     temperature_sensitive = Column(Boolean, default=False)
@@ -69,22 +76,19 @@ class Product(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
-    order_items = relationship("OrderItem", back_populates="product")
+    # Reverse collections are not read by the application: lazy="raise_on_sql" turns
+    # an accidental load into an error instead of a silent SELECT; use selectinload()
+    order_items = relationship("OrderItem", back_populates="product", lazy="raise_on_sql")
     
     def __repr__(self):
         return f"<Product(id={self.id}, sku='{self.sku}', name='{self.name}')>"
     
-    @property
+    @cached_property
     def volume_cm3(self) -> float:
         """Calculate volume in cubic centimeters"""
         return self.length * self.width * self.height
     
-    @property
-    def volume_m3(self) -> float:
-        """Calculate volume in cubic meters"""
-        return self.volume_cm3 / 1_000_000
-    
-    @property
+    @cached_property
     def available_quantity(self) -> int:
         """Calculate available quantity (stock - reserved)"""
         return max(0, self.stock_quantity - self.reserved_quantity)
@@ -107,4 +111,9 @@ class Product(Base):
     
     def release_quantity(self, quantity: int) -> None:
         """Release reserved quantity"""
-        self.reserved_quantity = max(0, self.reserved_quantity - quantity)
\ No newline at end of file
+        self.reserved_quantity = max(0, self.reserved_quantity - quantity)
+
+
+# Memoized per instance, recomputed after any of the inputs is assigned or reloaded
+invalidate_on_change(Product, ("volume_cm3",), ("length", "width", "height"))
+invalidate_on_change(Product, ("available_quantity",), ("stock_quantity", "reserved_quantity"))
@@ -1,8 +1,13 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, JSON, ForeignKey, Index, event, inspect, text, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from enum import Enum as PyEnum
+from functools import cached_property
 from app.database import Base
+from app.models.enum_type import SmallIntEnum, enum_ordinal
+from app.models.driver import Driver
+from app.models.memoize import invalidate_on_change
 
 class RouteStatus(PyEnum):
     PLANNED = "planned"
@@ -18,6 +23,16 @@ class OptimizationType(PyEnum):
 
 class Route(Base):
     __tablename__ = "routes"
+    __table_args__ = (
+        # Active/completed routes per driver (driver load analytics)
+        Index("ix_route_driver_status", "driver_id", "status"),
+        # Partial index over the (small) set of active routes for real-time monitoring
+        Index(
+            "ix_routes_active", "id",
+            postgresql_where=text(f"status = {enum_ordinal(RouteStatus.ACTIVE)}"),
+            sqlite_where=text(f"status = {enum_ordinal(RouteStatus.ACTIVE)}")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     route_number = Column(String(50), unique=True, nullable=False, index=True)
@@ -43,12 +58,12 @@ class Route(Base):
     total_volume = Column(Float, default=0.0)        # m³
     
     # Optimization metrics
-    optimization_type = Column(Enum(OptimizationType), default=OptimizationType.STATIC)
+    optimization_type = Column(SmallIntEnum(OptimizationType), default=OptimizationType.STATIC)
     optimization_score = Column(Float, default=0.0)  # Objective function value
     reoptimization_count = Column(Integer, default=0)
     
     # Status and progress
-    status = Column(Enum(RouteStatus), default=RouteStatus.PLANNED)
+    status = Column(SmallIntEnum(RouteStatus), default=RouteStatus.PLANNED)
     current_stop_index = Column(Integer, default=0)
     completion_percentage = Column(Float, default=0.0)
     
@@ -62,9 +77,9 @@ class Route(Base):
     late_deliveries = Column(Integer, default=0)
     failed_deliveries = Column(Integer, default=0)
     
-    # Route geometry and waypoints
-    route_geometry = Column(Text)  # Encoded polyline or GeoJSON
-    waypoints = Column(Text)       # JSON array of coordinates
+    # Route geometry and waypoints, deferred as one "bulk" group (loaded together on first access)
+    route_geometry = deferred(Column(Text), group="bulk")  # Encoded polyline or GeoJSON
+    waypoints = deferred(Column(JSON().with_variant(JSONB(), "postgresql")), group="bulk")  # [[lat, lon], ...]
     
     # Notes and comments
     notes = Column(Text)
@@ -86,7 +101,8 @@ class Route(Base):
     # Relationships
     vehicle = relationship("Vehicle", back_populates="routes")
     driver = relationship("Driver", back_populates="routes")
-    route_stops = relationship("RouteStop", back_populates="route", order_by="RouteStop.stop_sequence")
+    # Stops are batch-loaded for all routes in a result ("WHERE route_id IN (...)")
+    route_stops = relationship("RouteStop", back_populates="route", order_by="RouteStop.stop_sequence", lazy="selectin")
     
     def __repr__(self):
         return f"<Route(id={self.id}, number='{self.route_number}', status='{self.status}')>"
@@ -96,22 +112,27 @@ class Route(Base):
         """Check if route is currently active"""
         return self.status == RouteStatus.ACTIVE
     
+    @cached_property
+    def _delivery_rates(self) -> tuple:
+        """(delivery success rate, on-time rate) as percentages, sharing one denominator"""
+        total_deliveries = self.on_time_deliveries + self.late_deliveries + self.failed_deliveries
+        if total_deliveries == 0:
+            return (0.0, 0.0)
+        scale = 100 / total_deliveries
+        return (
+            (self.on_time_deliveries + self.late_deliveries) * scale,
+            self.on_time_deliveries * scale
+        )
+    
     @property
     def delivery_success_rate(self) -> float:
         """Calculate delivery success rate as percentage"""
-        total_deliveries = self.on_time_deliveries + self.late_deliveries + self.failed_deliveries
-        if total_deliveries == 0:
-            return 0.0
-        successful_deliveries = self.on_time_deliveries + self.late_deliveries
-        return (successful_deliveries / total_deliveries) * 100
+        return self._delivery_rates[0]
     
     @property
     def on_time_rate(self) -> float:
         """Calculate on-time delivery rate as percentage"""
-        total_deliveries = self.on_time_deliveries + self.late_deliveries + self.failed_deliveries
-        if total_deliveries == 0:
-            return 0.0
-        return (self.on_time_deliveries / total_deliveries) * 100
+        return self._delivery_rates[1]
     
     def calculate_efficiency_metrics(self):
         """Calculate route efficiency metrics"""
@@ -127,15 +148,94 @@ class Route(Base):
         # Distance efficiency (actual vs optimal)
         distance_efficiency = 100.0  # Placeholder - would need optimal distance calculation
         
+        delivery_success_rate, on_time_rate = self._delivery_rates
         return {
             "time_efficiency": time_efficiency,
             "distance_efficiency": distance_efficiency,
-            "delivery_success_rate": self.delivery_success_rate,
-            "on_time_rate": self.on_time_rate
+            "delivery_success_rate": delivery_success_rate,
+            "on_time_rate": on_time_rate
         }
     
     def update_progress(self, completed_stops: int):
         """Update route progress based on completed stops"""
         if self.total_stops > 0:
             self.completion_percentage = (completed_stops / self.total_stops) * 100
-            self.current_stop_index = completed_stops
\ No newline at end of file
+            self.current_stop_index = completed_stops
+
+
+# Memoized per instance, recomputed after the delivery counters are assigned or reloaded
+invalidate_on_change(
+    Route, ("_delivery_rates",),
+    ("on_time_deliveries", "late_deliveries", "failed_deliveries")
+)
+
+# Route statuses counted towards a driver's current load
+ACTIVE_ROUTE_STATUSES = (RouteStatus.PLANNED, RouteStatus.ACTIVE)
+
+def _driver_route_aggregates(status, total_duration) -> tuple:
+    """Contribution of a single route to (active_routes_count, active_total_duration, completed_routes)"""
+    if isinstance(status, str):
+        try:
+            status = RouteStatus(status)
+        except ValueError:
+            return (0, 0, 0)
+    if status in ACTIVE_ROUTE_STATUSES:
+        return (1, total_duration or 0, 0)
+    if status == RouteStatus.COMPLETED:
+        return (0, 0, 1)
+    return (0, 0, 0)
+
+def _apply_driver_aggregates(connection, driver_id, delta: tuple):
+    """Shift a driver's denormalized counters by delta in the flushing transaction"""
+    if driver_id is None or not any(delta):
+        return
+    drivers = Driver.__table__
+    active_routes, active_duration, completed = delta
+    connection.execute(
+        update(drivers)
+        .where(drivers.c.id == driver_id)
+        .values(
+            active_routes_count=drivers.c.active_routes_count + active_routes,
+            active_total_duration=drivers.c.active_total_duration + active_duration,
+            completed_routes=drivers.c.completed_routes + completed,
+        )
+    )
+
+def _previous_value(target, attr: str):
+    """Value of attr before the pending flush"""
+    history = inspect(target).attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(target, attr)
+
+# Load the previous value on assignment even if the attribute was expired,
+# so after_update sees what the counters were built from
+for _attr in (Route.status, Route.total_duration, Route.driver_id):
+    event.listen(_attr, "set", lambda target, value, oldvalue, initiator: value, active_history=True, retval=True)
+
+# Note: bulk query.update()/delete() bypasses mapper events and leaves the counters stale
+@event.listens_for(Route, "after_insert")
+def _route_after_insert(mapper, connection, target):
+    _apply_driver_aggregates(
+        connection, target.driver_id,
+        _driver_route_aggregates(target.status, target.total_duration)
+    )
+
+@event.listens_for(Route, "after_update")
+def _route_after_update(mapper, connection, target):
+    old_driver_id = _previous_value(target, "driver_id")
+    old = _driver_route_aggregates(
+        _previous_value(target, "status"), _previous_value(target, "total_duration")
+    )
+    new = _driver_route_aggregates(target.status, target.total_duration)
+    
+    if old_driver_id == target.driver_id:
+        _apply_driver_aggregates(connection, target.driver_id, tuple(n - o for n, o in zip(new, old)))
+    else:
+        _apply_driver_aggregates(connection, old_driver_id, tuple(-o for o in old))
+        _apply_driver_aggregates(connection, target.driver_id, new)
+
+@event.listens_for(Route, "after_delete")
+def _route_after_delete(mapper, connection, target):
+    _apply_driver_aggregates(
+        connection, target.driver_id,
+        tuple(-v for v in _driver_route_aggregates(target.status, target.total_duration))
+    )
@@ -1,8 +1,13 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Index, text
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
+from datetime import timedelta
 from enum import Enum as PyEnum
 from app.database import Base
+from app.models.enum_type import SmallIntEnum, ordinal_predicate
+
+# Precomputed whole-minute offsets for the common ETA case (no traffic adjustment)
+_ETA_MINUTE_OFFSETS = tuple(timedelta(minutes=minutes) for minutes in range(240))
 
 class StopStatus(PyEnum):
     PENDING = "pending"
@@ -19,18 +24,34 @@ class StopType(PyEnum):
     PICKUP = "pickup"
     BREAK = "break"
 
+OPEN_STOP_STATUSES_SQL = ordinal_predicate(
+    "status", StopStatus.PENDING, StopStatus.APPROACHING, StopStatus.IN_PROGRESS
+)
+
 class RouteStop(Base):
     __tablename__ = "route_stops"
     
+    __table_args__ = (
+        # Route.route_stops loads (WHERE route_id ORDER BY stop_sequence) without a sort.
+        # Not unique: resequencing updates stops one row at a time, passing through duplicates
+        Index("ix_route_stops_route_seq", "route_id", "stop_sequence"),
+        # Partial index over stops still to be served (finished stops dominate the table)
+        Index(
+            "ix_route_stops_open_status", "status",
+            postgresql_where=text(OPEN_STOP_STATUSES_SQL),
+            sqlite_where=text(OPEN_STOP_STATUSES_SQL)
+        ),
+    )
+    
     id = Column(Integer, primary_key=True, index=True)
     
     # Relationships
     route_id = Column(Integer, ForeignKey("routes.id"), nullable=False)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=True)  # Null for depot/break stops
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=True, index=True)  # Null for depot/break stops
     
     # Stop sequence and type
     stop_sequence = Column(Integer, nullable=False)  # Order in route (0-based)
-    stop_type = Column(Enum(StopType), default=StopType.DELIVERY)
+    stop_type = Column(SmallIntEnum(StopType), default=StopType.DELIVERY)
     
     # Location information
     latitude = Column(Float, nullable=False)
@@ -48,7 +69,7 @@ class RouteStop(Base):
     actual_service_time = Column(Integer)  # minutes
     
     # Status and progress
-    status = Column(Enum(StopStatus), default=StopStatus.PENDING)
+    status = Column(SmallIntEnum(StopStatus), default=StopStatus.PENDING)
     
     # Distance and travel metrics
     distance_from_previous = Column(Float, default=0.0)  # km
@@ -70,13 +91,15 @@ class RouteStop(Base):
     failure_reason = Column(String(255))
     
     # Customer interaction
-    customer_signature = Column(Text)  # Base64 encoded signature
+    # Signature/photo/proof payloads are deferred as one "bulk" group: loaded
+    # together on first access instead of with every stop row
+    customer_signature = deferred(Column(Text), group="bulk")  # Base64 encoded signature
     customer_rating = Column(Integer)  # 1-5 scale
     customer_feedback = Column(Text)
     
     # Photos and documentation
-    delivery_photos = Column(Text)  # JSON array of photo URLs
-    proof_of_delivery = Column(Text)
+    delivery_photos = deferred(Column(Text), group="bulk")  # JSON array of photo URLs
+    proof_of_delivery = deferred(Column(Text), group="bulk")
     
     # Metadata
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -146,8 +169,10 @@ class RouteStop(Base):
     
     def estimate_eta(self, current_time: DateTime, traffic_factor: float = 1.0) -> DateTime:
         """Estimate arrival time based on current time and traffic"""
-        if self.travel_time_from_previous:
-            travel_time_adjusted = self.travel_time_from_previous * traffic_factor
-            eta = current_time + timedelta(minutes=travel_time_adjusted)
-            return eta
+        travel_time = self.travel_time_from_previous
+        if travel_time:
+            # Unsaved stops may still hold a float travel time; those take the general path
+            if traffic_factor == 1.0 and isinstance(travel_time, int) and 0 < travel_time < 240:
+                return current_time + _ETA_MINUTE_OFFSETS[travel_time]
+            return current_time + timedelta(minutes=travel_time * traffic_factor)
         return self.planned_arrival_time
\ No newline at end of file
@@ -0,0 +1,32 @@
+"""
+Time-of-day columns stored as minutes since midnight (0-1439)
+"""
+from datetime import time
+from typing import Optional
+
+
+def hhmm_to_minutes(value: Optional[str]) -> Optional[int]:
+    """Parse "HH:MM" into minutes since midnight"""
+    if value is None:
+        return None
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def minutes_to_hhmm(minutes: Optional[int]) -> Optional[str]:
+    """Format minutes since midnight as "HH:MM" """
+    if minutes is None:
+        return None
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def minutes_to_time(minutes: Optional[int]) -> Optional[time]:
+    """Convert minutes since midnight to datetime.time"""
+    if minutes is None:
+        return None
+    return time(minutes // 60, minutes % 60)
+
+
+def hhmm_property(column_name: str) -> property:
+    """Read-only "HH:MM" view of a minutes-since-midnight column (display only)"""
+    return property(lambda self: minutes_to_hhmm(getattr(self, column_name)))
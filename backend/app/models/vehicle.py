@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum as PyEnum
 from app.database import Base
+from app.models.enum_type import SmallIntEnum, ordinal_predicate
 
 class VehicleType(PyEnum):
     VAN = "van"
@@ -16,9 +17,22 @@ class VehicleStatus(PyEnum):
     MAINTENANCE = "maintenance"
     OUT_OF_SERVICE = "out_of_service"
 
+AVAILABLE_VEHICLE_STATUSES_SQL = ordinal_predicate("status", VehicleStatus.AVAILABLE)
+
 class Vehicle(Base):
     __tablename__ = "vehicles"
     
+    __table_args__ = (
+        # Status breakdown for business metrics and dashboards (GROUP BY status)
+        Index("ix_vehicles_status", "status"),
+        # Partial index over the vehicles available for dispatch
+        Index(
+            "ix_vehicles_available_status", "status",
+            postgresql_where=text(AVAILABLE_VEHICLE_STATUSES_SQL),
+            sqlite_where=text(AVAILABLE_VEHICLE_STATUSES_SQL)
+        ),
+    )
+    
     id = Column(Integer, primary_key=True, index=True)
     license_plate = Column(String(20), unique=True, nullable=False, index=True)
     model = Column(String(100), nullable=False)
@@ -26,7 +40,7 @@ class Vehicle(Base):
     year = Column(Integer)
     
     # Vehicle specifications
-    vehicle_type = Column(Enum(VehicleType), nullable=False)
+    vehicle_type = Column(SmallIntEnum(VehicleType), nullable=False)
     max_weight_capacity = Column(Float, nullable=False)  # kg
     max_volume_capacity = Column(Float, nullable=False)  # m³
     fuel_consumption = Column(Float, default=10.0)       # L/100km
@@ -41,7 +55,7 @@ class Vehicle(Base):
     current_longitude = Column(Float)
     depot_latitude = Column(Float, nullable=False)
     depot_longitude = Column(Float, nullable=False)
-    status = Column(Enum(VehicleStatus), default=VehicleStatus.AVAILABLE)
+    status = Column(SmallIntEnum(VehicleStatus), default=VehicleStatus.AVAILABLE)
     
     # Features
     has_gps = Column(Boolean, default=True)
@@ -67,7 +81,9 @@ class Vehicle(Base):
     next_maintenance = Column(DateTime(timezone=True))
     
     # Relationships
-    routes = relationship("Route", back_populates="vehicle")
+    # Reverse collections are not read by the application: lazy="raise_on_sql" turns
+    # an accidental load into an error instead of a silent SELECT; use selectinload()
+    routes = relationship("Route", back_populates="vehicle", lazy="raise_on_sql")
     
     # Driver assignment
     driver_id = Column(Integer, ForeignKey("drivers.id"), nullable=True)
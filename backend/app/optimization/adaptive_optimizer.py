@@ -1,15 +1,26 @@
 import asyncio
 import logging
-from typing import Dict, List, Optional, Tuple, Set
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple, Set
 from datetime import datetime, timedelta
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
+from operator import attrgetter
 import numpy as np
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
 from app.models import Route, RouteStop, Order, Vehicle, Driver, Event
-from app.optimization.vrptw_solver import VRPTWSolver
+from app.models.event import EventType, EventSeverity, EventStatus
+from app.models.order import OrderPriority, OrderStatus
+from app.models.route import RouteStatus
+from app.models.route_stop import StopStatus
+from app.models.vehicle import VehicleStatus
+from app.models.driver import DriverStatus
+from app.core.cache import traffic_leg_cache
+from app.core.metrics import route_monitoring_cycle_duration_seconds, route_monitoring_overruns_total
+from app.optimization.vrptw_solver import VRPTWSolver, EARTH_RADIUS_KM, haversine_distances
 from app.optimization.eta_predictor import ETAPredictor
+from app.services.yandex_maps_service import YandexMapsService
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +35,38 @@ class TriggerType(Enum):
     WEATHER = "weather"
     MANUAL = "manual"
 
-@dataclass
+# Stops the reoptimization strategies may still reorder or reassign
+OPEN_STOP_STATUSES = (StopStatus.PENDING, StopStatus.IN_PROGRESS)
+
+# Triggers that require immediate reassignment of the route's orders
+EMERGENCY_TRIGGER_TYPES = frozenset({TriggerType.VEHICLE_BREAKDOWN, TriggerType.DRIVER_UNAVAILABLE})
+
+# Trigger scores (severity * weight) lie in [0, 1]; routes are prioritized in this many buckets
+PRIORITY_BUCKETS = 10
+
+# Traffic legs (consecutive remaining stops) are cached per ~100 m cell pair and hour of day
+TRAFFIC_CELL_DEGREES = 0.001
+# Legs per Yandex distance matrix request, and matrix requests in flight per monitoring cycle
+TRAFFIC_MATRIX_BATCH = 25
+TRAFFIC_CONCURRENCY = 4
+# Value YandexMapsService puts in matrix cells it got no route for
+UNREACHABLE_MATRIX_VALUE = 999999
+
+# Route trigger checks in flight per monitoring cycle
+ROUTE_CHECK_CONCURRENCY = 16
+
+# Most routes whose last reoptimization is remembered (least recently reoptimized evicted first)
+REOPTIMIZATION_HISTORY_SIZE = 10000
+
+Leg = Tuple[Tuple[float, float], Tuple[float, float]]
+
+@dataclass(slots=True)
+class TriggerMetadata:
+    """Trigger-specific details used by the reoptimization strategies"""
+    traffic_factor: Optional[float] = None
+    new_orders: Tuple[int, ...] = ()  # Unassigned urgent orders to insert into the route
+
+@dataclass(slots=True)
 class ReoptimizationTrigger:
     """Represents a trigger for route reoptimization"""
     trigger_type: TriggerType
@@ -35,7 +77,65 @@ class ReoptimizationTrigger:
     timestamp: datetime
     estimated_delay_minutes: Optional[float] = None
     requires_immediate_action: bool = False
-    metadata: Dict = None
+    metadata: Optional[TriggerMetadata] = None
+
+@dataclass
+class RouteStopsView:
+    """
+    Structure-of-arrays view of a route's stops
+    
+    Built once per monitoring cycle so the trigger checks filter stops with
+    boolean masks instead of re-walking the RouteStop objects.
+    """
+    stops: List[RouteStop]
+    sequence: np.ndarray   # int32 stop_sequence, ascending
+    status: np.ndarray     # StopStatus members (object)
+    order_id: np.ndarray   # int64, 0 for depot/break stops
+    latitude: np.ndarray   # float64, NaN when missing
+    longitude: np.ndarray  # float64, NaN when missing
+    
+    @classmethod
+    def from_route(cls, route: Route) -> "RouteStopsView":
+        # Loaded ordered by stop_sequence, so this is a linear check unless
+        # stops were resequenced in the session since
+        stops = sorted(route.route_stops, key=attrgetter("stop_sequence"))
+        count = len(stops)
+        return cls(
+            stops=stops,
+            sequence=np.fromiter((stop.stop_sequence for stop in stops), dtype=np.int32, count=count),
+            status=np.array([stop.status for stop in stops], dtype=object),
+            order_id=np.fromiter((stop.order_id or 0 for stop in stops), dtype=np.int64, count=count),
+            latitude=np.fromiter((stop.latitude or np.nan for stop in stops), dtype=np.float64, count=count),
+            longitude=np.fromiter((stop.longitude or np.nan for stop in stops), dtype=np.float64, count=count)
+        )
+    
+    @property
+    def has_coordinates(self) -> np.ndarray:
+        return ~(np.isnan(self.latitude) | np.isnan(self.longitude))
+    
+    def status_in(self, *statuses: StopStatus) -> np.ndarray:
+        mask = np.zeros(len(self.stops), dtype=bool)
+        for status in statuses:
+            mask |= self.status == status
+        return mask
+    
+    def order_ids(self, mask: np.ndarray) -> List[int]:
+        """Order ids of the selected stops (depot/break stops have none)"""
+        return self.order_id[mask & (self.order_id > 0)].tolist()
+
+@dataclass
+class RouteTriggerSummary:
+    """Triggers of one route with the aggregates used to prioritize and plan its reoptimization"""
+    scored_triggers: List[Tuple[float, ReoptimizationTrigger]] = field(default_factory=list)
+    top_score: float = 0.0
+    max_severity: float = 0.0
+    has_emergency: bool = False
+    
+    def add(self, score: float, trigger: ReoptimizationTrigger):
+        self.scored_triggers.append((score, trigger))
+        self.top_score = max(self.top_score, score)
+        self.max_severity = max(self.max_severity, trigger.severity)
+        self.has_emergency = self.has_emergency or trigger.trigger_type in EMERGENCY_TRIGGER_TYPES
 
 class AdaptiveOptimizer:
     """
@@ -49,21 +149,30 @@ class AdaptiveOptimizer:
         eta_predictor: ETAPredictor,
         delay_threshold_minutes: float = 15.0,
         traffic_threshold: float = 1.5,
-        reoptimization_cooldown_minutes: float = 30.0
+        reoptimization_cooldown_minutes: float = 30.0,
+        maps_service: Optional[YandexMapsService] = None
     ):
         self.vrptw_solver = vrptw_solver
         self.eta_predictor = eta_predictor
+        # Source of real traffic factors; traffic is simulated without it
+        self.maps_service = maps_service
         self.delay_threshold_minutes = delay_threshold_minutes
         self.traffic_threshold = traffic_threshold
         self.reoptimization_cooldown_minutes = reoptimization_cooldown_minutes
         
-        # Track recent reoptimizations to avoid thrashing
-        self.last_reoptimization: Dict[int, datetime] = {}
+        # Track recent reoptimizations to avoid thrashing, oldest first; bounded
+        # and pruned every cycle so it does not grow with every route ever seen
+        self.last_reoptimization: OrderedDict[int, datetime] = OrderedDict()
+        # End of each route's cooldown, precomputed for the per-cycle check of every route
+        self._cooldown_until: Dict[int, datetime] = {}
         
         # Active monitoring
         self.monitoring_active = False
         self.monitoring_interval_seconds = 60  # Check every minute
         
+        # Unassigned urgent orders within this distance of a route's stops trigger reoptimization
+        self.urgent_order_radius_km = 5.0
+        
         # Trigger weights for prioritization
         self.trigger_weights = {
             TriggerType.VEHICLE_BREAKDOWN: 1.0,
@@ -75,19 +184,42 @@ class AdaptiveOptimizer:
             TriggerType.WEATHER: 0.4,
             TriggerType.MANUAL: 0.3
         }
+        
+        # Reoptimization strategies by the name _determine_reoptimization_strategy returns
+        self._strategies = {
+            "local": self._local_reoptimization,      # 2-opt/3-opt within the route
+            "global": self._global_reoptimization,    # together with other routes
+            "emergency": self._emergency_reoptimization  # immediate reassignment
+        }
     
     async def start_monitoring(self, db: Session):
         """Start continuous monitoring of active routes"""
         self.monitoring_active = True
         logger.info("Started adaptive route monitoring")
         
+        loop = asyncio.get_running_loop()
+        next_deadline = loop.time()
+        
         while self.monitoring_active:
+            cycle_start = loop.time()
             try:
                 await self._monitor_routes(db)
-                await asyncio.sleep(self.monitoring_interval_seconds)
             except Exception as e:
                 logger.error(f"Error in route monitoring: {e}")
-                await asyncio.sleep(self.monitoring_interval_seconds)
+            
+            cycle_duration = loop.time() - cycle_start
+            route_monitoring_cycle_duration_seconds.observe(cycle_duration)
+            if cycle_duration > self.monitoring_interval_seconds:
+                route_monitoring_overruns_total.inc()
+                logger.warning(
+                    f"Route monitoring cycle took {cycle_duration:.2f}s, "
+                    f"longer than the {self.monitoring_interval_seconds}s interval"
+                )
+            
+            # Fixed-rate schedule: cycles start every interval regardless of their
+            # duration; after an overrun the missed cycles are skipped, not run back to back
+            next_deadline = max(next_deadline + self.monitoring_interval_seconds, loop.time())
+            await asyncio.sleep(next_deadline - loop.time())
     
     def stop_monitoring(self):
         """Stop route monitoring"""
@@ -97,26 +229,58 @@ class AdaptiveOptimizer:
     async def _monitor_routes(self, db: Session):
         """Monitor all active routes for reoptimization triggers"""
         
-        # Get all active routes
-        active_routes = db.query(Route).filter(
-            Route.status.in_(["planned", "in_progress"])
+        self._prune_reoptimization_history(datetime.utcnow())
+        
+        # Get all active routes; vehicles and drivers are batch-loaded with them
+        # (route_stops are selectin-loaded by the relationship itself)
+        active_routes = db.query(Route).options(
+            selectinload(Route.vehicle),
+            selectinload(Route.driver)
+        ).filter(
+            Route.status.in_([RouteStatus.PLANNED, RouteStatus.ACTIVE])
         ).all()
         
         if not active_routes:
             return
         
-        triggers = []
+        stop_views = {route.id: RouteStopsView.from_route(route) for route in active_routes}
+        
+        # Unassigned urgent orders are the same for every route: load them once per cycle
+        urgent_orders = self._get_urgent_orders(db, datetime.utcnow(), list(stop_views.values()))
+        
+        # Traffic on the remaining legs of all routes in one batch per cycle
+        traffic_factors = None
+        if self.maps_service:
+            legs = set()
+            for route in active_routes:
+                stops = stop_views[route.id]
+                legs.update(self._route_legs(stops, self._route_progress(route, stops)[1]))
+            traffic_factors = await self._fetch_traffic_factors(list(legs))
+        
+        # Check routes concurrently; the checks only use the data loaded above,
+        # so they never touch the (non-thread-safe) session
+        sem = asyncio.Semaphore(ROUTE_CHECK_CONCURRENCY)
+        
+        async def _check(route: Route) -> List[ReoptimizationTrigger]:
+            async with sem:
+                return await self._check_route_triggers(
+                    route, stop_views[route.id], urgent_orders, traffic_factors
+                )
         
-        for route in active_routes:
-            # Check for various trigger conditions
-            route_triggers = await self._check_route_triggers(db, route)
-            triggers.extend(route_triggers)
+        results = await asyncio.gather(*[_check(route) for route in active_routes])
+        triggers = [trigger for route_triggers in results for trigger in route_triggers]
         
         # Process triggers if any found
         if triggers:
             await self._process_triggers(db, triggers)
     
-    async def _check_route_triggers(self, db: Session, route: Route) -> List[ReoptimizationTrigger]:
+    async def _check_route_triggers(
+        self, 
+        route: Route, 
+        stops: RouteStopsView, 
+        urgent_orders: List[Order], 
+        traffic_factors: Optional[Dict[Leg, float]] = None
+    ) -> List[ReoptimizationTrigger]:
         """Check a single route for reoptimization triggers"""
         triggers = []
         current_time = datetime.utcnow()
@@ -125,43 +289,58 @@ class AdaptiveOptimizer:
         if self._is_in_cooldown(route.id, current_time):
             return triggers
         
+        # Route progress is computed once and shared by the stop-based checks
+        current_stop, remaining = self._route_progress(route, stops)
+        
         # Check delay trigger
-        delay_trigger = self._check_delay_trigger(route, current_time)
+        delay_trigger = self._check_delay_trigger(route, stops, current_stop, remaining, current_time)
         if delay_trigger:
             triggers.append(delay_trigger)
         
         # Check traffic trigger
-        traffic_trigger = await self._check_traffic_trigger(route, current_time)
+        traffic_trigger = await self._check_traffic_trigger(route, stops, remaining, traffic_factors, current_time)
         if traffic_trigger:
             triggers.append(traffic_trigger)
         
         # Check vehicle/driver availability
-        availability_trigger = self._check_availability_trigger(route, current_time)
+        availability_trigger = self._check_availability_trigger(route, stops, current_time)
         if availability_trigger:
             triggers.append(availability_trigger)
         
         # Check for new urgent orders in the area
-        urgent_order_trigger = await self._check_urgent_orders_trigger(db, route, current_time)
+        urgent_order_trigger = await self._check_urgent_orders_trigger(route, stops, urgent_orders, current_time)
         if urgent_order_trigger:
             triggers.append(urgent_order_trigger)
         
         return triggers
     
-    def _check_delay_trigger(self, route: Route, current_time: datetime) -> Optional[ReoptimizationTrigger]:
-        """Check if route has significant delays"""
+    def _route_progress(self, route: Route, stops: RouteStopsView) -> Tuple[Optional[RouteStop], np.ndarray]:
+        """Current stop (if the route has started) and the mask of stops from the current one on"""
+        # Binary search on the sorted sequence: first stop at or after the current one
+        start = int(np.searchsorted(stops.sequence, route.current_stop_index or 1, side="left"))
+        remaining = np.zeros(len(stops.stops), dtype=bool)
+        remaining[start:] = True
         
-        if not route.current_stop_index or route.current_stop_index == 0:
-            return None
+        current_stop = None
+        if (route.current_stop_index and start < len(stops.stops)
+                and stops.sequence[start] == route.current_stop_index):
+            current_stop = stops.stops[start]
         
-        # Get current route stop
-        current_stops = [stop for stop in route.route_stops 
-                        if stop.sequence_number == route.current_stop_index]
+        return current_stop, remaining
+    
+    def _check_delay_trigger(
+        self, 
+        route: Route, 
+        stops: RouteStopsView, 
+        current_stop: Optional[RouteStop], 
+        remaining: np.ndarray, 
+        current_time: datetime
+    ) -> Optional[ReoptimizationTrigger]:
+        """Check if route has significant delays"""
         
-        if not current_stops:
+        if not current_stop:
             return None
         
-        current_stop = current_stops[0]
-        
         # Calculate delay
         if current_stop.planned_arrival_time and current_time > current_stop.planned_arrival_time:
             delay_minutes = (current_time - current_stop.planned_arrival_time).total_seconds() / 60
@@ -171,8 +350,7 @@ class AdaptiveOptimizer:
                     trigger_type=TriggerType.DELAY,
                     severity=min(1.0, delay_minutes / (self.delay_threshold_minutes * 3)),
                     affected_routes=[route.id],
-                    affected_orders=[stop.order_id for stop in route.route_stops 
-                                   if stop.sequence_number >= route.current_stop_index],
+                    affected_orders=stops.order_ids(remaining),
                     description=f"Route {route.id} delayed by {delay_minutes:.1f} minutes",
                     timestamp=current_time,
                     estimated_delay_minutes=delay_minutes,
@@ -181,25 +359,33 @@ class AdaptiveOptimizer:
         
         return None
     
-    async def _check_traffic_trigger(self, route: Route, current_time: datetime) -> Optional[ReoptimizationTrigger]:
+    async def _check_traffic_trigger(
+        self, 
+        route: Route, 
+        stops: RouteStopsView, 
+        remaining: np.ndarray, 
+        traffic_factors: Optional[Dict[Leg, float]], 
+        current_time: datetime
+    ) -> Optional[ReoptimizationTrigger]:
         """Check for significant traffic conditions affecting the route"""
         
-        # This would integrate with Yandex Maps traffic API
-        # For now, simulate traffic checking
-        
-        # Get remaining stops
-        remaining_stops = [stop for stop in route.route_stops 
-                          if stop.sequence_number >= (route.current_stop_index or 1)]
-        
-        if len(remaining_stops) < 2:
+        if np.count_nonzero(remaining) < 2:
             return None
         
-        # Simulate traffic factor calculation
-        # In production, this would call Yandex Maps API
-        traffic_factor = np.random.uniform(1.0, 2.0)  # Simulate traffic conditions
+        if traffic_factors is None:
+            # No maps service configured: simulate traffic conditions
+            traffic_factor = np.random.uniform(1.0, 2.0)
+        else:
+            # Mean slowdown over the remaining legs with traffic data
+            leg_factors = [
+                traffic_factors[leg] for leg in self._route_legs(stops, remaining) if leg in traffic_factors
+            ]
+            if not leg_factors:
+                return None
+            traffic_factor = float(np.mean(leg_factors))
         
         if traffic_factor > self.traffic_threshold:
-            affected_orders = [stop.order_id for stop in remaining_stops if stop.order_id]
+            affected_orders = stops.order_ids(remaining)
             
             return ReoptimizationTrigger(
                 trigger_type=TriggerType.TRAFFIC,
@@ -209,35 +395,98 @@ class AdaptiveOptimizer:
                 description=f"Heavy traffic detected on route {route.id} (factor: {traffic_factor:.2f})",
                 timestamp=current_time,
                 estimated_delay_minutes=(traffic_factor - 1.0) * 30,
-                metadata={"traffic_factor": traffic_factor}
+                metadata=TriggerMetadata(traffic_factor=traffic_factor)
             )
         
         return None
     
-    def _check_availability_trigger(self, route: Route, current_time: datetime) -> Optional[ReoptimizationTrigger]:
+    def _route_legs(self, stops: RouteStopsView, mask: np.ndarray) -> List[Leg]:
+        """(origin, destination) coordinates of consecutive selected stops"""
+        located = mask & stops.has_coordinates
+        points = list(zip(stops.latitude[located].tolist(), stops.longitude[located].tolist()))
+        return list(zip(points, points[1:]))
+    
+    def _traffic_leg_key(self, leg: Leg, hour: int) -> str:
+        (origin_lat, origin_lon), (destination_lat, destination_lon) = leg
+        cells = (int(np.floor(value / TRAFFIC_CELL_DEGREES))
+                 for value in (origin_lat, origin_lon, destination_lat, destination_lon))
+        return "{}:{}>{}:{}".format(*cells) + f"@{hour}"
+    
+    async def _fetch_traffic_factors(self, legs: List[Leg]) -> Dict[Leg, float]:
+        """
+        Traffic factors (time in traffic / free-flow time) of the legs
+        
+        Cached legs are read in one batch; the rest are requested from the
+        Yandex distance matrix API, TRAFFIC_MATRIX_BATCH legs per request, with
+        the requests running concurrently. Legs without data are left out.
+        """
+        hour = datetime.utcnow().hour
+        leg_keys = {leg: self._traffic_leg_key(leg, hour) for leg in legs}
+        
+        cached = dict(zip(leg_keys.values(), await traffic_leg_cache.aget_many(list(leg_keys.values()))))
+        factors = {leg: cached[key] for leg, key in leg_keys.items() if cached.get(key) is not None}
+        missing = [leg for leg in legs if leg not in factors]
+        
+        sem = asyncio.Semaphore(TRAFFIC_CONCURRENCY)
+        
+        async def _batch(batch: List[Leg]) -> Dict[Leg, float]:
+            async with sem:
+                matrix = await self.maps_service.get_distance_matrix(
+                    origins=[origin for origin, _ in batch],
+                    destinations=[destination for _, destination in batch]
+                )
+            if not matrix or matrix.get("status") != "OK":
+                return {}
+            
+            # Leg i is origin i -> destination i: the matrix diagonal
+            batch_factors = {}
+            for i, leg in enumerate(batch):
+                free_flow = matrix["time_matrix"][i][i]
+                in_traffic = matrix["traffic_time_matrix"][i][i]
+                if 0 < free_flow < UNREACHABLE_MATRIX_VALUE:
+                    batch_factors[leg] = in_traffic / free_flow
+            return batch_factors
+        
+        if missing:
+            batches = [missing[i:i + TRAFFIC_MATRIX_BATCH] for i in range(0, len(missing), TRAFFIC_MATRIX_BATCH)]
+            fetched: Dict[Leg, float] = {}
+            for batch_factors in await asyncio.gather(*[_batch(batch) for batch in batches]):
+                fetched.update(batch_factors)
+            if fetched:
+                await traffic_leg_cache.aset_many({leg_keys[leg]: factor for leg, factor in fetched.items()})
+            factors.update(fetched)
+        
+        return factors
+    
+    def _check_availability_trigger(
+        self, 
+        route: Route, 
+        stops: RouteStopsView, 
+        current_time: datetime
+    ) -> Optional[ReoptimizationTrigger]:
         """Check if vehicle or driver becomes unavailable"""
         
-        # Check vehicle status
-        if route.vehicle and route.vehicle.status not in ["available", "in_transit"]:
+        open_stops = stops.status_in(*OPEN_STOP_STATUSES)
+        
+        # Check vehicle status (a vehicle out on its route is IN_USE)
+        if route.vehicle and route.vehicle.status not in (VehicleStatus.AVAILABLE, VehicleStatus.IN_USE):
             return ReoptimizationTrigger(
                 trigger_type=TriggerType.VEHICLE_BREAKDOWN,
                 severity=1.0,
                 affected_routes=[route.id],
-                affected_orders=[stop.order_id for stop in route.route_stops 
-                               if stop.status in ["pending", "in_progress"] and stop.order_id],
+                affected_orders=stops.order_ids(open_stops),
                 description=f"Vehicle {route.vehicle.license_plate} unavailable: {route.vehicle.status}",
                 timestamp=current_time,
                 requires_immediate_action=True
             )
         
-        # Check driver availability
-        if route.driver and not route.driver.is_available():
+        # Check driver availability (a driver out on a route is BUSY, not is_available)
+        if route.driver and route.driver.status not in (DriverStatus.AVAILABLE, DriverStatus.BUSY):
             return ReoptimizationTrigger(
                 trigger_type=TriggerType.DRIVER_UNAVAILABLE,
                 severity=0.9,
                 affected_routes=[route.id],
-                affected_orders=[stop.order_id for stop in route.route_stops 
-                               if stop.status in ["pending", "in_progress"] and stop.order_id],
+                affected_orders=stops.order_ids(open_stops),
                 description=f"Driver {route.driver.full_name} unavailable",
                 timestamp=current_time,
                 requires_immediate_action=True
@@ -245,42 +494,87 @@ class AdaptiveOptimizer:
         
         return None
     
-    async def _check_urgent_orders_trigger(
+    def _get_urgent_orders(
         self, 
         db: Session, 
+        current_time: datetime, 
+        route_stops: List[RouteStopsView]
+    ) -> List[Order]:
+        """Unassigned high-priority orders due today that may lie near one of the routes"""
+        bounding_box = self._stops_bounding_box(route_stops, self.urgent_order_radius_km)
+        if bounding_box is None:
+            return []
+        
+        min_lat, max_lat, min_lon, max_lon = bounding_box
+        day_start = datetime.combine(current_time.date(), datetime.min.time())
+        
+        # The bounding box keeps far-away orders in the database; the exact
+        # per-route distance check is done in _check_urgent_orders_trigger
+        return db.query(Order).filter(
+            ~Order.route_stops.any(),  # Not on any route yet
+            Order.priority.in_([OrderPriority.HIGH, OrderPriority.URGENT]),
+            Order.status == OrderStatus.PENDING,
+            Order.time_window_start >= day_start,
+            Order.time_window_start < day_start + timedelta(days=1),
+            Order.delivery_latitude.between(min_lat, max_lat),
+            Order.delivery_longitude.between(min_lon, max_lon)
+        ).all()
+    
+    def _stops_bounding_box(
+        self, 
+        route_stops: List[RouteStopsView], 
+        margin_km: float
+    ) -> Optional[Tuple[float, float, float, float]]:
+        """(min_lat, max_lat, min_lon, max_lon) around all route stops, widened by margin_km"""
+        located = [stops.has_coordinates for stops in route_stops]
+        latitudes = np.concatenate([stops.latitude[mask] for stops, mask in zip(route_stops, located)] or [[]])
+        longitudes = np.concatenate([stops.longitude[mask] for stops, mask in zip(route_stops, located)] or [[]])
+        
+        if not len(latitudes):
+            return None
+        
+        min_lat, max_lat = latitudes.min(), latitudes.max()
+        min_lon, max_lon = longitudes.min(), longitudes.max()
+        
+        km_per_degree = np.pi * EARTH_RADIUS_KM / 180
+        lat_margin = margin_km / km_per_degree
+        # A degree of longitude is shortest at the latitude farthest from the equator
+        widest_lat = min(89.0, max(abs(min_lat), abs(max_lat)) + lat_margin)
+        lon_margin = margin_km / (km_per_degree * np.cos(np.radians(widest_lat)))
+        
+        return (
+            float(min_lat - lat_margin), float(max_lat + lat_margin),
+            float(min_lon - lon_margin), float(max_lon + lon_margin)
+        )
+    
+    async def _check_urgent_orders_trigger(
+        self, 
         route: Route, 
+        stops: RouteStopsView, 
+        urgent_orders: List[Order], 
         current_time: datetime
     ) -> Optional[ReoptimizationTrigger]:
         """Check for new urgent orders that could be added to the route"""
         
-        # Find unassigned urgent orders
-        urgent_orders = db.query(Order).filter(
-            Order.route_stop_id.is_(None),
-            Order.priority >= 4,  # High priority orders
-            Order.status == "pending",
-            Order.delivery_date == current_time.date()
-        ).all()
-        
         if not urgent_orders:
             return None
         
         # Check if any urgent orders are near the route
-        route_coordinates = [(stop.latitude, stop.longitude) 
-                           for stop in route.route_stops 
-                           if stop.latitude and stop.longitude]
-        
-        nearby_urgent_orders = []
-        for order in urgent_orders:
-            if order.delivery_latitude and order.delivery_longitude:
-                # Simple distance check (in production, use proper geospatial queries)
-                for route_lat, route_lon in route_coordinates:
-                    distance = self._calculate_distance(
-                        order.delivery_latitude, order.delivery_longitude,
-                        route_lat, route_lon
-                    )
-                    if distance < 5.0:  # Within 5km
-                        nearby_urgent_orders.append(order)
-                        break
+        located = stops.has_coordinates
+        candidate_orders = [order for order in urgent_orders 
+                            if order.delivery_latitude and order.delivery_longitude]
+        
+        if not located.any() or not candidate_orders:
+            return None
+        
+        # Orders x stops Haversine distances in one vectorized pass
+        distances = haversine_distances(
+            [order.delivery_latitude for order in candidate_orders],
+            [order.delivery_longitude for order in candidate_orders],
+            stops.latitude[located], stops.longitude[located]
+        )
+        is_nearby = (distances < self.urgent_order_radius_km).any(axis=1)
+        nearby_urgent_orders = [order for order, nearby in zip(candidate_orders, is_nearby) if nearby]
         
         if nearby_urgent_orders:
             return ReoptimizationTrigger(
@@ -290,27 +584,15 @@ class AdaptiveOptimizer:
                 affected_orders=[order.id for order in nearby_urgent_orders],
                 description=f"Found {len(nearby_urgent_orders)} urgent orders near route {route.id}",
                 timestamp=current_time,
-                metadata={"new_orders": [order.id for order in nearby_urgent_orders]}
+                metadata=TriggerMetadata(new_orders=tuple(order.id for order in nearby_urgent_orders))
             )
         
         return None
     
-    def _calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-        """Calculate distance between two points in kilometers"""
-        # Simplified distance calculation (Haversine formula would be more accurate)
-        lat_diff = abs(lat1 - lat2)
-        lon_diff = abs(lon1 - lon2)
-        return np.sqrt(lat_diff**2 + lon_diff**2) * 111  # Rough km conversion
-    
     def _is_in_cooldown(self, route_id: int, current_time: datetime) -> bool:
         """Check if route is in reoptimization cooldown period"""
-        if route_id not in self.last_reoptimization:
-            return False
-        
-        last_reopt = self.last_reoptimization[route_id]
-        cooldown_end = last_reopt + timedelta(minutes=self.reoptimization_cooldown_minutes)
-        
-        return current_time < cooldown_end
+        cooldown_end = self._cooldown_until.get(route_id)
+        return cooldown_end is not None and current_time < cooldown_end
     
     async def _process_triggers(self, db: Session, triggers: List[ReoptimizationTrigger]):
         """Process and prioritize reoptimization triggers"""
@@ -318,112 +600,213 @@ class AdaptiveOptimizer:
         if not triggers:
             return
         
-        # Sort triggers by priority (severity * weight)
-        prioritized_triggers = sorted(
-            triggers,
-            key=lambda t: t.severity * self.trigger_weights.get(t.trigger_type, 0.5),
-            reverse=True
-        )
-        
-        # Group triggers by affected routes
-        route_triggers: Dict[int, List[ReoptimizationTrigger]] = {}
-        for trigger in prioritized_triggers:
+        # Single pass: score triggers (severity * weight), group them by affected
+        # route and aggregate what the strategy choice needs
+        route_summaries: Dict[int, RouteTriggerSummary] = {}
+        for trigger in triggers:
+            score = trigger.severity * self.trigger_weights.get(trigger.trigger_type, 0.5)
             for route_id in trigger.affected_routes:
-                if route_id not in route_triggers:
-                    route_triggers[route_id] = []
-                route_triggers[route_id].append(trigger)
+                route_summaries.setdefault(route_id, RouteTriggerSummary()).add(score, trigger)
         
-        # Process each route's triggers
-        for route_id, route_trigger_list in route_triggers.items():
-            await self._reoptimize_route(db, route_id, route_trigger_list)
+        # One transaction per cycle: each route's writes go to a savepoint, so a
+        # failing route is rolled back on its own and the batch commits once
+        reoptimized: List[int] = []
+        failed: List[int] = []
+        try:
+            for route_id, route_triggers, strategy in self._plan_reoptimizations(route_summaries):
+                success = await self._reoptimize_route(db, route_id, route_triggers, strategy)
+                (reoptimized if success else failed).append(route_id)
+            
+            db.commit()
+        except Exception as e:
+            logger.error(f"Error committing reoptimization of routes {reoptimized + failed}: {e}")
+            db.rollback()
+            return
+        
+        if failed:
+            logger.warning(f"Reoptimization failed for routes {failed}")
+        
+        # Start cooldowns only for reoptimizations that were actually committed
+        reoptimized_at = datetime.utcnow()
+        for route_id in reoptimized:
+            self._record_reoptimization(route_id, reoptimized_at)
+    
+    def _plan_reoptimizations(
+        self,
+        route_summaries: Dict[int, RouteTriggerSummary]
+    ) -> Iterator[Tuple[int, List[ReoptimizationTrigger], str]]:
+        """Routes to reoptimize, in processing order, with their triggers and strategy"""
+        
+        # Emergency routes are dispatched first as they are found, with no
+        # prioritization. They still run one after another: every route
+        # shares the cycle's session, and its savepoints cannot interleave
+        buckets: List[List[int]] = [[] for _ in range(PRIORITY_BUCKETS)]
+        for route_id, summary in route_summaries.items():
+            if summary.has_emergency:
+                yield route_id, [trigger for _, trigger in summary.scored_triggers], "emergency"
+                continue
+            # Bucket queue by the route's highest trigger score (O(n), no full sort);
+            # routes within a bucket keep the order their triggers were found in
+            bucket = min(PRIORITY_BUCKETS - 1, int(summary.top_score * PRIORITY_BUCKETS))
+            buckets[bucket].append(route_id)
+        
+        # Then the remaining routes, highest-priority triggers first
+        for route_id in (route_id for bucket in reversed(buckets) for route_id in bucket):
+            summary = route_summaries[route_id]
+            # A route has only a handful of triggers per cycle
+            summary.scored_triggers.sort(key=lambda scored: scored[0], reverse=True)
+            strategy = self._determine_reoptimization_strategy(
+                summary.max_severity, summary.has_emergency, len(summary.scored_triggers)
+            )
+            yield route_id, [trigger for _, trigger in summary.scored_triggers], strategy
+    
+    def _record_reoptimization(self, route_id: int, reoptimized_at: datetime):
+        """Remember a committed reoptimization and start the route's cooldown"""
+        self.last_reoptimization[route_id] = reoptimized_at
+        self.last_reoptimization.move_to_end(route_id)
+        self._cooldown_until[route_id] = reoptimized_at + timedelta(
+            minutes=self.reoptimization_cooldown_minutes
+        )
+        
+        while len(self.last_reoptimization) > REOPTIMIZATION_HISTORY_SIZE:
+            evicted_id, _ = self.last_reoptimization.popitem(last=False)
+            self._cooldown_until.pop(evicted_id, None)
+    
+    def _prune_reoptimization_history(self, current_time: datetime):
+        """Forget reoptimizations older than twice the cooldown (their cooldown is long over)"""
+        cutoff = current_time - timedelta(minutes=2 * self.reoptimization_cooldown_minutes)
+        # Entries are kept in reoptimization time order, so expired ones are at the front
+        while self.last_reoptimization:
+            route_id, reoptimized_at = next(iter(self.last_reoptimization.items()))
+            if reoptimized_at >= cutoff:
+                break
+            self.last_reoptimization.popitem(last=False)
+            self._cooldown_until.pop(route_id, None)
     
     async def _reoptimize_route(
         self, 
         db: Session, 
         route_id: int, 
-        triggers: List[ReoptimizationTrigger]
-    ):
-        """Reoptimize a specific route based on triggers"""
+        triggers: List[ReoptimizationTrigger],
+        strategy: str
+    ) -> bool:
+        """
+        Reoptimize a specific route based on triggers, using the given strategy
+        
+        Writes go to savepoints of the caller's transaction; the caller commits.
+        Returns whether the route was reoptimized.
+        """
         
         try:
             route = db.query(Route).filter(Route.id == route_id).first()
             if not route:
                 logger.error(f"Route {route_id} not found for reoptimization")
-                return
+                return False
             
             logger.info(f"Reoptimizing route {route_id} due to {len(triggers)} triggers")
             
-            # Create event for reoptimization
-            event = Event(
-                event_type="reoptimization",
-                severity="medium",
-                title=f"Route {route_id} Reoptimization",
-                description=f"Triggered by: {', '.join([t.trigger_type.value for t in triggers])}",
-                route_id=route_id,
-                vehicle_id=route.vehicle_id,
-                driver_id=route.driver_id,
-                timestamp=datetime.utcnow(),
-                estimated_delay_minutes=max([t.estimated_delay_minutes or 0 for t in triggers]),
-                triggers_reoptimization=True,
-                metadata={
-                    "triggers": [
-                        {
-                            "type": t.trigger_type.value,
-                            "severity": t.severity,
-                            "description": t.description
-                        } for t in triggers
-                    ]
-                }
+            delays = np.fromiter(
+                (t.estimated_delay_minutes or 0.0 for t in triggers),
+                dtype=np.float64, count=len(triggers)
             )
-            db.add(event)
-            
-            # Determine reoptimization strategy based on trigger types
-            strategy = self._determine_reoptimization_strategy(triggers)
+            max_delay_minutes = float(delays.max()) if delays.size else 0.0
             
-            if strategy == "local":
-                # Local reoptimization (2-opt, 3-opt)
-                success = await self._local_reoptimization(db, route, triggers)
-            elif strategy == "global":
-                # Global reoptimization with other routes
-                success = await self._global_reoptimization(db, route, triggers)
-            else:
-                # Emergency reoptimization (immediate reassignment)
-                success = await self._emergency_reoptimization(db, route, triggers)
-            
-            if success:
-                # Update last reoptimization time
-                self.last_reoptimization[route_id] = datetime.utcnow()
-                
-                # Update route metrics
-                route.reoptimization_count = (route.reoptimization_count or 0) + 1
-                route.last_reoptimization_time = datetime.utcnow()
+            # The attempt is kept only if the strategy succeeds: a failing strategy
+            # may already have changed the route and its stops
+            success = False
+            savepoint = db.begin_nested()
+            try:
+                event = self._reoptimization_event(route, triggers, max_delay_minutes)
+                db.add(event)
                 
-                event.status = "resolved"
-                event.resolution_notes = f"Route reoptimized using {strategy} strategy"
+                success = await self._strategies[strategy](db, route, triggers)
                 
+                if success:
+                    # Update route metrics
+                    route.reoptimization_count = (route.reoptimization_count or 0) + 1
+                    route.last_reoptimization_time = datetime.utcnow()
+                    
+                    event.status = EventStatus.RESOLVED
+                    event.resolved_at = datetime.utcnow()
+                    event.resolution_notes = f"Route reoptimized using {strategy} strategy"
+                    
+                    savepoint.commit()
+            except Exception as e:
+                logger.error(f"Error reoptimizing route {route_id}: {e}")
+                success = False
+            
+            if success:
                 logger.info(f"Successfully reoptimized route {route_id}")
-            else:
-                event.status = "failed"
-                event.resolution_notes = "Reoptimization failed"
-                logger.error(f"Failed to reoptimize route {route_id}")
+                return True
             
-            db.commit()
+            savepoint.rollback()
+            logger.error(f"Failed to reoptimize route {route_id}")
+            
+            # Record the failed attempt on its own; the event stays active for manual follow-up
+            with db.begin_nested():
+                db.add(self._reoptimization_event(route, triggers, max_delay_minutes, failed_strategy=strategy))
+            return False
             
         except Exception as e:
-            logger.error(f"Error reoptimizing route {route_id}: {e}")
-            db.rollback()
+            logger.error(f"Error recording reoptimization of route {route_id}: {e}")
+            return False
     
-    def _determine_reoptimization_strategy(self, triggers: List[ReoptimizationTrigger]) -> str:
-        """Determine the best reoptimization strategy based on triggers"""
+    def _reoptimization_event(
+        self,
+        route: Route,
+        triggers: List[ReoptimizationTrigger],
+        max_delay_minutes: float,
+        failed_strategy: Optional[str] = None
+    ) -> Event:
+        """Event for a reoptimization attempt; a failed emergency asks for manual reassignment"""
+        event = Event(
+            event_type=EventType.REOPTIMIZATION_TRIGGERED,
+            severity=EventSeverity.MEDIUM,
+            title=f"Route {route.id} Reoptimization",
+            description=f"Triggered by: {', '.join([t.trigger_type.value for t in triggers])}",
+            route_id=route.id,
+            vehicle_id=route.vehicle_id,
+            driver_id=route.driver_id,
+            event_timestamp=datetime.utcnow(),
+            estimated_delay_minutes=round(max_delay_minutes),
+            triggers_reoptimization=True,
+            event_data={
+                "triggers": [
+                    {
+                        "type": t.trigger_type.value,
+                        "severity": t.severity,
+                        "description": t.description
+                    } for t in triggers
+                ]
+            }
+        )
+        
+        if failed_strategy:
+            event.resolution_notes = f"Reoptimization failed ({failed_strategy} strategy)"
+        if failed_strategy == "emergency":
+            unfinished_orders = sorted({order_id for t in triggers for order_id in t.affected_orders})
+            event.event_type = EventType.MANUAL_INTERVENTION
+            event.severity = EventSeverity.HIGH
+            event.title = f"Emergency: Route {route.id} needs manual reassignment"
+            event.affected_orders_count = len(unfinished_orders)
+            event.event_data["unfinished_orders"] = unfinished_orders
+        
+        return event
+    
+    def _determine_reoptimization_strategy(
+        self, 
+        max_severity: float, 
+        has_emergency: bool, 
+        trigger_count: int
+    ) -> str:
+        """Determine the best reoptimization strategy from the route's trigger aggregates"""
         
         # Check for emergency situations
-        emergency_triggers = [TriggerType.VEHICLE_BREAKDOWN, TriggerType.DRIVER_UNAVAILABLE]
-        if any(t.trigger_type in emergency_triggers for t in triggers):
+        if has_emergency:
             return "emergency"
         
         # Check for high severity or multiple triggers
-        max_severity = max(t.severity for t in triggers)
-        if max_severity > 0.8 or len(triggers) > 2:
+        if max_severity > 0.8 or trigger_count > 2:
             return "global"
         
         # Default to local optimization
@@ -441,8 +824,8 @@ class AdaptiveOptimizer:
             # Get remaining stops
             remaining_stops = [
                 stop for stop in route.route_stops 
-                if stop.sequence_number >= (route.current_stop_index or 1)
-                and stop.status in ["pending", "in_progress"]
+                if stop.stop_sequence >= (route.current_stop_index or 1)
+                and stop.status in OPEN_STOP_STATUSES
             ]
             
             if len(remaining_stops) < 3:
@@ -457,7 +840,7 @@ class AdaptiveOptimizer:
             
             # Update stop sequences
             for i, stop in enumerate(optimized_stops):
-                stop.sequence_number = (route.current_stop_index or 1) + i
+                stop.stop_sequence = (route.current_stop_index or 1) + i
                 
                 # Update ETA predictions
                 if i > 0:
@@ -489,7 +872,7 @@ class AdaptiveOptimizer:
         try:
             # Get all active routes in the area
             nearby_routes = db.query(Route).filter(
-                Route.status.in_(["planned", "in_progress"]),
+                Route.status.in_([RouteStatus.PLANNED, RouteStatus.ACTIVE]),
                 Route.id != route.id,
                 Route.planned_date == route.planned_date
             ).all()
@@ -499,15 +882,15 @@ class AdaptiveOptimizer:
             
             # Add orders from current route
             for stop in route.route_stops:
-                if (stop.sequence_number >= (route.current_stop_index or 1) 
-                    and stop.status in ["pending", "in_progress"] 
+                if (stop.stop_sequence >= (route.current_stop_index or 1) 
+                    and stop.status in OPEN_STOP_STATUSES 
                     and stop.order):
                     all_orders.append(stop.order)
             
             # Add new urgent orders if any
             for trigger in triggers:
-                if trigger.trigger_type == TriggerType.NEW_URGENT_ORDER:
-                    new_order_ids = trigger.metadata.get("new_orders", [])
+                if trigger.trigger_type == TriggerType.NEW_URGENT_ORDER and trigger.metadata:
+                    new_order_ids = trigger.metadata.new_orders
                     new_orders = db.query(Order).filter(Order.id.in_(new_order_ids)).all()
                     all_orders.extend(new_orders)
             
@@ -525,8 +908,9 @@ class AdaptiveOptimizer:
                 if nearby_route.driver:
                     drivers.append(nearby_route.driver)
             
-            # Solve VRPTW for the orders
-            solution = self.vrptw_solver.solve_vrptw(
+            # Solve VRPTW for the orders, off the event loop: the solve and its Redis cache lookups block
+            solution = await asyncio.to_thread(
+                self.vrptw_solver.solve_vrptw,
                 orders=all_orders,
                 vehicles=vehicles,
                 drivers=drivers,
@@ -557,14 +941,14 @@ class AdaptiveOptimizer:
         """Handle emergency situations requiring immediate reassignment"""
         
         try:
-            # Mark route as disrupted
-            route.status = "disrupted"
+            # Take the route out of service while its orders are reassigned
+            route.status = RouteStatus.OPTIMIZING
             
             # Get unfinished orders
             unfinished_orders = []
             for stop in route.route_stops:
-                if (stop.sequence_number >= (route.current_stop_index or 1) 
-                    and stop.status in ["pending", "in_progress"] 
+                if (stop.stop_sequence >= (route.current_stop_index or 1) 
+                    and stop.status in OPEN_STOP_STATUSES 
                     and stop.order):
                     unfinished_orders.append(stop.order)
                     # Reset order assignment
@@ -575,32 +959,23 @@ class AdaptiveOptimizer:
             
             # Find alternative vehicles and drivers
             available_vehicles = db.query(Vehicle).filter(
-                Vehicle.status == "available",
+                Vehicle.status == VehicleStatus.AVAILABLE,
                 Vehicle.id != route.vehicle_id
             ).all()
             
             available_drivers = db.query(Driver).filter(
-                Driver.current_status == "available",
+                Driver.status == DriverStatus.AVAILABLE,
                 Driver.id != route.driver_id
             ).all()
             
             if not available_vehicles or not available_drivers:
-                # Create emergency event for manual handling
-                emergency_event = Event(
-                    event_type="emergency_reassignment_needed",
-                    severity="high",
-                    title=f"Emergency: Route {route.id} needs manual reassignment",
-                    description=f"No available resources for {len(unfinished_orders)} orders",
-                    route_id=route.id,
-                    timestamp=datetime.utcnow(),
-                    requires_manual_intervention=True,
-                    metadata={"unfinished_orders": [order.id for order in unfinished_orders]}
-                )
-                db.add(emergency_event)
+                # The failed attempt is recorded as a manual intervention event
+                logger.warning(f"No available resources for {len(unfinished_orders)} orders of route {route.id}")
                 return False
             
             # Create new emergency routes
-            emergency_solution = self.vrptw_solver.solve_vrptw(
+            emergency_solution = await asyncio.to_thread(
+                self.vrptw_solver.solve_vrptw,
                 orders=unfinished_orders,
                 vehicles=available_vehicles[:3],  # Use up to 3 vehicles
                 drivers=available_drivers[:3],
@@ -635,7 +1010,7 @@ class AdaptiveOptimizer:
             timestamp=datetime.utcnow()
         )
         
-        await self._reoptimize_route(db, route_id, [trigger])
+        await self._process_triggers(db, [trigger])
         
         return {
             "status": "triggered",
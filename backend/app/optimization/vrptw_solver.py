@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 from ortools.constraint_solver import routing_enums_pb2
 from ortools.constraint_solver import pywrapcp
 import logging
+import threading
 import time
 from concurrent.futures import ThreadPoolExecutor
 
@@ -19,6 +20,43 @@ from app.core.exceptions import (
 
 logger = logging.getLogger(__name__)
 
+EARTH_RADIUS_KM = 6371
+
+def haversine_distances(
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+    other_latitudes: np.ndarray,
+    other_longitudes: np.ndarray
+) -> np.ndarray:
+    """
+    Haversine distances (km) from every point of one set to every point of another
+    
+    Returns a len(latitudes) x len(other_latitudes) matrix; computed in float64
+    regardless of the input dtype.
+    """
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    other_lat = np.radians(np.asarray(other_latitudes, dtype=np.float64))
+    other_lon = np.radians(np.asarray(other_longitudes, dtype=np.float64))
+    
+    delta_lat = np.subtract.outer(lat, other_lat)
+    delta_lon = np.subtract.outer(lon, other_lon)
+    
+    a = np.sin(delta_lat / 2) ** 2 + np.outer(np.cos(lat), np.cos(other_lat)) * np.sin(delta_lon / 2) ** 2
+    # Rounding can push a slightly outside [0, 1] for (anti)coincident points
+    a = np.clip(a, 0.0, 1.0)
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    
+    return EARTH_RADIUS_KM * c
+
+def haversine_matrix(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """
+    Pairwise Haversine distances (km) between points, computed on whole arrays
+    
+    Accepts the contiguous coordinate arrays of Order.bulk_arrays.
+    """
+    return haversine_distances(latitudes, longitudes, latitudes, longitudes)
+
 class SAAVObjective:
     """
     Slot-Aware Adaptive VRPTW Objective Function
@@ -92,7 +130,12 @@ class VRPTWSolver:
         self.saav_objective = SAAVObjective(*objective_weights)
         self.adaptation_count = 0
         self.use_cache = True
+        # Locations and matrix of the last build, reused for overlapping location sets
+        self._previous_locations: List[Tuple[float, float]] = []
+        self._previous_matrix: Optional[np.ndarray] = None
         self.executor = ThreadPoolExecutor(max_workers=4)
+        # Async callers run solves in worker threads; the solve state above is per-instance
+        self._solve_lock = threading.Lock()
         
     def solve_static_routes(
         self, 
@@ -117,6 +160,17 @@ class VRPTWSolver:
             InvalidInputException: If input data is invalid
             NoFeasibleSolutionException: If no solution can be found
         """
+        with self._solve_lock:
+            return self._solve_static_routes(orders, vehicles, drivers, depot_coords)
+    
+    def _solve_static_routes(
+        self,
+        orders: List[Order],
+        vehicles: List[Vehicle],
+        drivers: List[Driver],
+        depot_coords: Optional[Tuple[float, float]]
+    ) -> Dict:
+        """Static solve body, run under the solve lock"""
         start_time = time.time()
         logger.info(f"Starting static VRPTW optimization for {len(orders)} orders")
         
@@ -306,30 +360,19 @@ class VRPTWSolver:
             if cached_matrix is not None:
                 logger.debug("Using cached distance matrix")
                 self.distance_matrix = cached_matrix
+                self._remember_matrix(locations)
                 self._build_time_matrix_from_distance()
                 return
         
-        num_locations = len(locations)
-        self.distance_matrix = np.zeros((num_locations, num_locations))
-        
-        # Calculate distances in parallel for better performance
-        def calculate_distance_row(i):
-            row = np.zeros(num_locations)
-            lat1, lon1 = locations[i]
-            for j in range(num_locations):
-                if i == j:
-                    row[j] = 0
-                else:
-                    lat2, lon2 = locations[j]
-                    row[j] = self._haversine_distance(lat1, lon1, lat2, lon2)
-            return i, row
-        
-        # Use thread pool for parallel computation
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            futures = [executor.submit(calculate_distance_row, i) for i in range(num_locations)]
-            for future in futures:
-                i, row = future.result()
-                self.distance_matrix[i] = row
+        self.distance_matrix = self._extend_previous_matrix(locations)
+        if self.distance_matrix is None:
+            # All pairs at once on coordinate arrays instead of a Python loop per pair
+            coords = np.array(locations, dtype=np.float64)
+            self.distance_matrix = haversine_matrix(coords[:, 0], coords[:, 1])
+            
+            # Same precision as the cached copy, so cache hits and misses give identical matrices
+            self.distance_matrix = self.distance_matrix.astype(np.float32)
+        self._remember_matrix(locations)
         
         # Cache the distance matrix
         if self.use_cache:
@@ -339,6 +382,42 @@ class VRPTWSolver:
         # Build time matrix from distance matrix
         self._build_time_matrix_from_distance()
     
+    def _remember_matrix(self, locations: List[Tuple[float, float]]):
+        self._previous_locations = locations
+        self._previous_matrix = self.distance_matrix
+    
+    def _extend_previous_matrix(self, locations: List[Tuple[float, float]]) -> Optional[np.ndarray]:
+        """
+        Distance matrix for locations built from the previous one
+        
+        Consecutive (re)optimizations mostly share their locations: distances
+        between known locations are copied, only the rows/columns of new
+        locations are computed. None if no location is known.
+        """
+        if self._previous_matrix is None:
+            return None
+        
+        previous_index = {location: i for i, location in enumerate(self._previous_locations)}
+        known = np.array([previous_index.get(location, -1) for location in locations])
+        is_new = known < 0
+        if is_new.all():
+            return None
+        
+        matrix = np.empty((len(locations), len(locations)), dtype=np.float32)
+        old = np.flatnonzero(~is_new)
+        matrix[np.ix_(old, old)] = self._previous_matrix[np.ix_(known[old], known[old])]
+        
+        new = np.flatnonzero(is_new)
+        if len(new):
+            coords = np.array(locations, dtype=np.float64)
+            block = haversine_distances(
+                coords[new, 0], coords[new, 1], coords[:, 0], coords[:, 1]
+            ).astype(np.float32)
+            matrix[new, :] = block
+            matrix[:, new] = block.T
+        
+        return matrix
+    
     def _build_time_matrix_from_distance(self):
         """Build time matrix from distance matrix"""
         # Assume average speed of 40 km/h in city
@@ -346,7 +425,7 @@ class VRPTWSolver:
     
     def _haversine_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """Calculate Haversine distance between two points"""
-        R = 6371  # Earth's radius in kilometers
+        R = EARTH_RADIUS_KM
         
         lat1_rad = np.radians(lat1)
         lat2_rad = np.radians(lat2)
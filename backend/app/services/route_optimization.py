@@ -4,6 +4,7 @@ import numpy as np
 from typing import List, Tuple, Dict, Any, Optional
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from functools import lru_cache
 import json
 
 @dataclass
@@ -44,12 +45,26 @@ class OptimizationResult:
     computation_time: float
     violations: List[str] = None
 
+@lru_cache(maxsize=65536)
+def _haversine_km(point1: Tuple[float, float], point2: Tuple[float, float]) -> float:
+    """Расстояние (км) между точками (lat, lng) по формуле гаверсинусов, с мемоизацией"""
+    lat1, lng1 = point1
+    lat2, lng2 = point2
+    R = 6371  # Радиус Земли в км
+    
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+    
+    a = (math.sin(dlat / 2) * math.sin(dlat / 2) +
+         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
+         math.sin(dlng / 2) * math.sin(dlng / 2))
+    
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return R * c
+
 class RouteOptimizationService:
     """Сервис оптимизации маршрутов с различными алгоритмами"""
     
-    def __init__(self):
-        self.distance_cache = {}
-    
     def optimize_route(
         self,
         points: List[OptimizationPoint],
@@ -542,24 +557,11 @@ class RouteOptimizationService:
     
     def _calculate_distance(self, lat1: float, lng1: float, lat2: float, lng2: float) -> float:
         """Расчет расстояния между двумя точками"""
-        cache_key = f"{lat1},{lng1},{lat2},{lng2}"
-        if cache_key in self.distance_cache:
-            return self.distance_cache[cache_key]
-        
-        R = 6371  # Радиус Земли в км
-        
-        dlat = math.radians(lat2 - lat1)
-        dlng = math.radians(lng2 - lng1)
-        
-        a = (math.sin(dlat / 2) * math.sin(dlat / 2) +
-             math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
-             math.sin(dlng / 2) * math.sin(dlng / 2))
-        
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-        distance = R * c
-        
-        self.distance_cache[cache_key] = distance
-        return distance
+        point1, point2 = (lat1, lng1), (lat2, lng2)
+        # Расстояние симметрично: одна запись кэша на пару точек в любом порядке
+        if point2 < point1:
+            point1, point2 = point2, point1
+        return _haversine_km(point1, point2)
     
     def _calculate_route_distance(self, points: List[OptimizationPoint], route: List[int]) -> float:
         """Расчет общего расстояния маршрута"""
@@ -753,9 +755,6 @@ class RouteOptimizationService:
         route.append(depot_idx)
         return route
     
-    def __init__(self):
-        self.distance_cache = {}
-    
     def calculate_distance(self, lat1: float, lng1: float, lat2: float, lng2: float) -> float:
         """Публичный метод для расчета расстояния между двумя точками"""
         return self._calculate_distance(lat1, lng1, lat2, lng2)
@@ -69,6 +69,11 @@ class YandexMapsService:
     Provides routing, traffic information, and ETA predictions
     """
     
+    # Shared connection pool: concurrent requests (e.g. heatmap fan-out)
+    # reuse warm keep-alive connections instead of opening new ones
+    MAX_CONNECTIONS = 32
+    KEEPALIVE_TIMEOUT_SECONDS = 30
+    
     def __init__(self, api_key: str = None):
         self.api_key = api_key or settings.yandex_maps_api_key
         self.base_url = "https://api.routing.yandex.net"
@@ -85,18 +90,30 @@ class YandexMapsService:
         # Session for connection pooling
         self.session: Optional[aiohttp.ClientSession] = None
     
-    async def __aenter__(self):
-        """Async context manager entry"""
-        self.session = aiohttp.ClientSession(
+    def _new_session(self) -> aiohttp.ClientSession:
+        return aiohttp.ClientSession(
             timeout=aiohttp.ClientTimeout(total=30),
-            connector=aiohttp.TCPConnector(limit=100)
+            connector=aiohttp.TCPConnector(
+                limit=self.MAX_CONNECTIONS,
+                keepalive_timeout=self.KEEPALIVE_TIMEOUT_SECONDS,
+                ttl_dns_cache=300
+            )
         )
+    
+    async def __aenter__(self):
+        """Async context manager entry"""
+        self.session = self._new_session()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit"""
-        if self.session:
+        await self.close()
+    
+    async def close(self):
+        """Close the shared HTTP session"""
+        if self.session and not self.session.closed:
             await self.session.close()
+        self.session = None
     
     async def _rate_limit(self):
         """Implement rate limiting for API requests"""
@@ -112,10 +129,7 @@ class YandexMapsService:
     async def _ensure_session(self):
         """Ensure aiohttp session is created"""
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=30),
-                connector=aiohttp.TCPConnector(limit=100)
-            )
+            self.session = self._new_session()
     
     async def geocode_address(self, address: str) -> Optional[Tuple[float, float]]:
         """
@@ -133,6 +147,7 @@ class YandexMapsService:
             return self.geocoding_cache[address]
         
         await self._rate_limit()
+        await self._ensure_session()
         
         try:
             params = {
@@ -189,6 +204,7 @@ class YandexMapsService:
         """
         
         await self._rate_limit()
+        await self._ensure_session()
         
         try:
             # Build route points
@@ -326,6 +342,7 @@ class YandexMapsService:
         """
         
         await self._rate_limit()
+        await self._ensure_session()
         
         try:
             # Convert coordinates to Yandex format
@@ -434,6 +451,7 @@ class YandexMapsService:
         """
         
         await self._rate_limit()
+        await self._ensure_session()
         
         try:
             (min_lat, min_lon), (max_lat, max_lon) = bounds
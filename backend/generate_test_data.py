@@ -3,7 +3,7 @@ from datetime import datetime, timedelta
 from typing import List, Tuple
 from faker import Faker
 
-from sqlalchemy import func
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
 
 from app.database import SessionLocal
@@ -11,6 +11,7 @@ from app.models import Customer, Vehicle, Driver, Order
 from app.models.order import OrderStatus, OrderPriority
 from app.models.vehicle import VehicleStatus, VehicleType
 from app.models.driver import DriverStatus, ExperienceLevel
+from app.models.time_of_day import hhmm_to_minutes
 
 fake = Faker('ru_RU')
 
@@ -63,8 +64,8 @@ def create_customers(session: Session, count: int = 50) -> List[Customer]:
             city="Москва",
             postal_code=fake.postcode(),
             business_type=random.choice(['retail', 'wholesale', 'manufacturing', 'services']),
-            preferred_delivery_start="09:00",
-            preferred_delivery_end="18:00",
+            preferred_delivery_start=hhmm_to_minutes("09:00"),
+            preferred_delivery_end=hhmm_to_minutes("18:00"),
             is_active=True
         )
         
@@ -91,8 +92,8 @@ def create_drivers(session: Session, count: int = 15) -> List[Driver]:
             experience_level=random.choice(list(ExperienceLevel)),
             status=random.choice([DriverStatus.AVAILABLE, DriverStatus.OFF_DUTY]),
             max_working_hours=random.choice([8, 10, 12]),
-            shift_start_time="08:00",
-            shift_end_time="18:00"
+            shift_start_time=hhmm_to_minutes("08:00"),
+            shift_end_time=hhmm_to_minutes("18:00")
         )
         
         session.add(driver)
@@ -139,8 +140,12 @@ def create_vehicles(session: Session, drivers: List[Driver], count: int = 10) ->
     print(f"Создано {count} транспортных средств")
     return vehicles
 
+# Один INSERT ... RETURNING на все заказы (executemany) вместо unit of work для
+# каждого объекта; оператор строится один раз, его компиляция берется из кэша
+_ORDER_INSERT = insert(Order).returning(Order)
+
 def create_orders(session: Session, customers: List[Customer], count: int = 200) -> List[Order]:
-    orders = []
+    rows = []
     
     for i in range(count):
         customer = random.choice(customers)
@@ -156,7 +161,7 @@ def create_orders(session: Session, customers: List[Customer], count: int = 200)
         )
         time_end = time_start + timedelta(hours=random.randint(1, 4))
         
-        order = Order(
+        rows.append(dict(
             order_number=f"ORD{i+1:06d}",
             customer_id=customer.id,
             delivery_address=fake.address(),
@@ -185,11 +190,9 @@ def create_orders(session: Session, customers: List[Customer], count: int = 200)
                 "Негабаритный груз",
                 "Ценный груз"
             ]) if random.random() < 0.3 else None
-        )
-        
-        session.add(order)
-        orders.append(order)
+        ))
     
+    orders = session.scalars(_ORDER_INSERT, rows).all()
     session.commit()
     print(f"Создано {count} заказов")
     return orders
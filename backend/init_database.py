@@ -12,6 +12,7 @@ from app.models.driver import Driver, DriverStatus, ExperienceLevel
 from app.models.order import Order, OrderStatus, OrderPriority
 from app.models.route import Route, RouteStatus
 from app.models.event import Event, EventType
+from app.models.time_of_day import hhmm_to_minutes
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -49,8 +50,8 @@ def seed_sample_data():
                 city="Moscow",
                 postal_code="101000",
                 business_type="retail",
-                preferred_delivery_start="09:00",
-                preferred_delivery_end="17:00"
+                preferred_delivery_start=hhmm_to_minutes("09:00"),
+                preferred_delivery_end=hhmm_to_minutes("17:00")
             ),
             Customer(
                 name="Jane Doe",
@@ -62,8 +63,8 @@ def seed_sample_data():
                 city="Moscow",
                 postal_code="101001",
                 business_type="office",
-                preferred_delivery_start="10:00",
-                preferred_delivery_end="16:00"
+                preferred_delivery_start=hhmm_to_minutes("10:00"),
+                preferred_delivery_end=hhmm_to_minutes("16:00")
             ),
             Customer(
                 name="Bob Johnson",
@@ -75,8 +76,8 @@ def seed_sample_data():
                 city="Moscow",
                 postal_code="101002",
                 business_type="restaurant",
-                preferred_delivery_start="08:00",
-                preferred_delivery_end="18:00"
+                preferred_delivery_start=hhmm_to_minutes("08:00"),
+                preferred_delivery_end=hhmm_to_minutes("18:00")
             )
         ]
         
@@ -129,8 +130,8 @@ def seed_sample_data():
                 email="mike.wilson@company.com",
                 experience_level=ExperienceLevel.EXPERIENCED,
                 max_working_hours=8,
-                shift_start_time="08:00",
-                shift_end_time="17:00",
+                shift_start_time=hhmm_to_minutes("08:00"),
+                shift_end_time=hhmm_to_minutes("17:00"),
                 status=DriverStatus.AVAILABLE,
                 current_latitude=55.7558,
                 current_longitude=37.6176
@@ -144,8 +145,8 @@ def seed_sample_data():
                 email="sarah.davis@company.com",
                 experience_level=ExperienceLevel.INTERMEDIATE,
                 max_working_hours=8,
-                shift_start_time="09:00",
-                shift_end_time="18:00",
+                shift_start_time=hhmm_to_minutes("09:00"),
+                shift_end_time=hhmm_to_minutes("18:00"),
                 status=DriverStatus.AVAILABLE,
                 current_latitude=55.7608,
                 current_longitude=37.6142
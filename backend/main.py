@@ -1,29 +1,30 @@
 import os
+import sys
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse, Response
 import uvicorn
 
-from app.api.routes import router as api_router
+from app.api.routes import router as api_router, maps_service as api_maps_service
 from app.api.websocket import websocket_router
 from app.api.v1.monitoring import router as monitoring_router
 from app.api.v1.drivers import router as drivers_router
 from app.api.v1.routes import router as routes_router
 from app.api.v1.simulation import router as simulation_router
-from app.api.v1.testing import router as testing_router
-from app.api.v1.traffic import router as traffic_router
+from app.api.v1.testing import router as testing_router, scenario_runner
+from app.api.v1.traffic import router as traffic_router, yandex_service as traffic_yandex_service
 from app.api.v1.route_geometry import router as route_geometry_router
 from app.api.v1.delivery_generator import router as delivery_generator_router
 from app.optimization.vrptw_solver import VRPTWSolver
 from app.optimization.adaptive_optimizer import AdaptiveOptimizer
 from app.services.yandex_maps_service import YandexMapsService
 from app.optimization.eta_predictor import ETAPredictor
-from app.database import get_db
-from app.core.metrics import get_metrics, update_business_metrics, CONTENT_TYPE_LATEST
-from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import get_metrics, business_metrics_collector, CONTENT_TYPE_LATEST
+from app.core.cache import start_cache_cleanup, stop_cache_cleanup
 
 logging.basicConfig(
     level=logging.INFO,
@@ -58,6 +59,9 @@ async def lifespan(app: FastAPI):
         app.state.yandex_maps_service = yandex_maps_service
         app.state.eta_predictor = eta_predictor
         
+        start_cache_cleanup()
+        business_metrics_collector.start_refresh()
+        
         logger.info("VRPTW optimization system started successfully")
         
         yield
@@ -68,6 +72,14 @@ async def lifespan(app: FastAPI):
     finally:
         if adaptive_optimizer:
             adaptive_optimizer.stop_monitoring()
+        await scenario_runner.shutdown()
+        stop_cache_cleanup()
+        business_metrics_collector.stop_refresh()
+        await traffic_yandex_service.close()
+        if api_maps_service:
+            await api_maps_service.close()
+        if yandex_maps_service:
+            await yandex_maps_service.close()
         logger.info("VRPTW optimization system stopped")
 
 
@@ -129,10 +141,13 @@ async def health_check():
     }
 
 @app.get("/metrics")
-async def metrics(db: Session = Depends(get_db)):
+async def metrics(request: Request):
     """Prometheus metrics endpoint."""
-    update_business_metrics(db)
-    return Response(content=get_metrics(), media_type=CONTENT_TYPE_LATEST)
+    # Business metrics are refreshed in the background; scrapes only serialize.
+    # A body that is already gzip-encoded is passed through by GZipMiddleware.
+    content, encoding = get_metrics(request.headers.get("accept-encoding", ""))
+    headers = {"Content-Encoding": encoding, "Vary": "Accept-Encoding"} if encoding else None
+    return Response(content=content, media_type=CONTENT_TYPE_LATEST, headers=headers)
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -140,5 +155,10 @@ if __name__ == "__main__":
         host="127.0.0.1",
         port=8000,
         reload=True,
+        # libuv-based event loop (shipped with uvicorn[standard]); not available on Windows
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        # WebSocket keep-alive via protocol ping frames
+        ws_ping_interval=settings.ws_heartbeat_interval,
+        ws_ping_timeout=10,
         log_level="debug"
     )
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""
+Сверка денормализованных итогов заказов (Order.total_*) с позициями заказа
+
+Итоги поддерживаются событиями OrderItem, но массовые query.update()/delete()
+обходят их. Скрипт пересчитывает итоги из order_items и исправляет расхождения;
+рассчитан на периодический запуск (cron).
+"""
+import logging
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+
+from sqlalchemy import case, exists, func, or_, select, update
+
+from app.database import SessionLocal
+from app.models.order import Order
+from app.models.order_item import OrderItem
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Допуск на погрешность накопления дельт с плавающей точкой
+TOLERANCE = 1e-6
+
+# Итог заказа -> суммируемое выражение по его позициям (как в гибридных свойствах Order)
+ITEM_AGGREGATES = {
+    Order.total_value: OrderItem.final_price,
+    Order.total_weight: OrderItem.product_weight * OrderItem.quantity,
+    Order.total_volume: OrderItem.product_volume * OrderItem.quantity,
+    Order.total_items: OrderItem.quantity,
+    Order.fragile_items: case((OrderItem.fragile, 1), else_=0),
+    Order.temperature_controlled_items: case((OrderItem.temperature_controlled, 1), else_=0),
+}
+
+
+def _drifted(expected: dict):
+    return or_(*(
+        func.abs(func.coalesce(column, 0) - value) > TOLERANCE
+        for column, value in expected.items()
+    ))
+
+
+def _build_statements():
+    """Строит запросы сверки один раз: один GROUP BY по order_items вместо подзапроса на заказ"""
+    item_totals = (
+        select(
+            OrderItem.order_id,
+            *(func.coalesce(func.sum(value), 0).label(column.key) for column, value in ITEM_AGGREGATES.items())
+        )
+        .group_by(OrderItem.order_id)
+        .subquery()
+    )
+    expected = {column: item_totals.c[column.key] for column in ITEM_AGGREGATES}
+    # UPDATE ... FROM (агрегат) - пересчитываются только заказы с расхождениями
+    with_items = (
+        update(Order)
+        .where(Order.id == item_totals.c.order_id, _drifted(expected))
+        .values({column.key: value for column, value in expected.items()})
+        .execution_options(synchronize_session=False)
+    )
+    # Заказы без позиций в агрегат не попадают: их итоги обнуляются отдельно
+    without_items = (
+        update(Order)
+        .where(~exists().where(OrderItem.order_id == Order.id), _drifted(dict.fromkeys(ITEM_AGGREGATES, 0)))
+        .values(dict.fromkeys((column.key for column in ITEM_AGGREGATES), 0))
+        .execution_options(synchronize_session=False)
+    )
+    return with_items, without_items
+
+
+RECONCILE_STATEMENTS = _build_statements()
+
+
+def reconcile_order_totals() -> int:
+    """Пересчитывает итоги заказов с расхождениями, возвращает число исправленных заказов"""
+    db = SessionLocal()
+    try:
+        fixed = sum(db.execute(statement).rowcount for statement in RECONCILE_STATEMENTS)
+        db.commit()
+        return fixed
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    fixed = reconcile_order_totals()
+    logger.info(f"Order totals reconciled, {fixed} orders corrected")
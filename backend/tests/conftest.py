@@ -54,6 +54,25 @@ def db_session(test_db):
     session.close()
 
 
+@pytest.fixture
+def db():
+    """In-memory database session with all tables, independent of the app engine"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+    import app.models  # noqa: F401  (registers all tables on Base.metadata)
+    
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    
+    yield session
+    
+    session.close()
+    engine.dispose()
+
+
 @pytest.fixture
 def sample_orders():
     """Create sample orders for testing"""
@@ -0,0 +1,358 @@
+"""
+Unit tests for the Adaptive Optimizer
+"""
+
+import pytest
+from datetime import datetime, timedelta
+
+from app.models import Route, RouteStop, Vehicle, Driver, Order, Customer, Event
+from app.models.driver import DriverStatus
+from app.models.event import EventType, EventStatus
+from app.models.route import RouteStatus
+from app.models.route_stop import StopStatus
+from app.models.vehicle import VehicleStatus, VehicleType
+from app.optimization import adaptive_optimizer
+from app.optimization.adaptive_optimizer import (
+    AdaptiveOptimizer,
+    ReoptimizationTrigger,
+    RouteStopsView,
+    RouteTriggerSummary,
+    TriggerType
+)
+
+
+def make_route(route_id=1, vehicle_status=VehicleStatus.IN_USE, driver_status=DriverStatus.BUSY):
+    """Create a transient route with three delivery stops, the first one completed"""
+    route = Route(id=route_id, current_stop_index=2)
+    route.vehicle = Vehicle(id=route_id, license_plate=f"TEST-{route_id}", status=vehicle_status)
+    route.driver = Driver(id=route_id, first_name="Driver", last_name="Test", status=driver_status)
+    route.route_stops = [
+        RouteStop(
+            stop_sequence=sequence,
+            order_id=100 + sequence,
+            status=StopStatus.COMPLETED if sequence == 1 else StopStatus.PENDING,
+            latitude=55.75 + sequence * 0.01,
+            longitude=37.61
+        )
+        for sequence in (1, 2, 3)
+    ]
+    return route
+
+
+class TestAvailabilityTrigger:
+    """Tests for the vehicle and driver availability trigger"""
+
+    @pytest.fixture
+    def optimizer(self):
+        """Create optimizer instance"""
+        return AdaptiveOptimizer(None, None)
+
+    def check(self, optimizer, route):
+        return optimizer._check_availability_trigger(
+            route, RouteStopsView.from_route(route), datetime.utcnow()
+        )
+
+    @pytest.mark.parametrize("vehicle_status", [VehicleStatus.AVAILABLE, VehicleStatus.IN_USE])
+    @pytest.mark.parametrize("driver_status", [DriverStatus.AVAILABLE, DriverStatus.BUSY])
+    def test_working_route_has_no_trigger(self, optimizer, vehicle_status, driver_status):
+        """A vehicle and driver out on their route do not trigger reoptimization"""
+        route = make_route(vehicle_status=vehicle_status, driver_status=driver_status)
+
+        assert self.check(optimizer, route) is None
+
+    @pytest.mark.parametrize("vehicle_status", [VehicleStatus.MAINTENANCE, VehicleStatus.OUT_OF_SERVICE])
+    def test_vehicle_breakdown(self, optimizer, vehicle_status):
+        """An unusable vehicle triggers an emergency for the open stops"""
+        trigger = self.check(optimizer, make_route(vehicle_status=vehicle_status))
+
+        assert trigger.trigger_type == TriggerType.VEHICLE_BREAKDOWN
+        assert trigger.affected_orders == [102, 103]
+        assert trigger.requires_immediate_action
+
+    def test_driver_unavailable(self, optimizer):
+        """An off-duty driver triggers an emergency for the open stops"""
+        trigger = self.check(optimizer, make_route(driver_status=DriverStatus.OFF_DUTY))
+
+        assert trigger.trigger_type == TriggerType.DRIVER_UNAVAILABLE
+        assert trigger.affected_orders == [102, 103]
+
+
+class TestRouteProgress:
+    """Tests for locating the current stop of a route"""
+
+    @pytest.fixture
+    def optimizer(self):
+        """Create optimizer instance"""
+        return AdaptiveOptimizer(None, None)
+
+    def progress(self, optimizer, route):
+        current_stop, remaining = optimizer._route_progress(route, RouteStopsView.from_route(route))
+        return current_stop and current_stop.stop_sequence, remaining.tolist()
+
+    @pytest.mark.parametrize("current_stop_index, expected", [
+        (2, (2, [False, True, True])),
+        (3, (3, [False, False, True])),
+        (4, (None, [False, False, False])),
+        (0, (None, [True, True, True])),
+        (None, (None, [True, True, True])),
+    ])
+    def test_current_stop(self, optimizer, current_stop_index, expected):
+        """The current stop and the stops from it on"""
+        route = make_route()
+        route.current_stop_index = current_stop_index
+
+        assert self.progress(optimizer, route) == expected
+
+    def test_gap_in_sequence(self, optimizer):
+        """With no stop at the current index, the remaining stops start at the next one"""
+        route = make_route()
+        route.route_stops[1].stop_sequence = 4  # Sequence 1, 4, 3 (loaded out of order)
+
+        assert self.progress(optimizer, route) == (None, [False, True, True])
+
+
+class TestReoptimizationPlanning:
+    """Tests for the order and strategy of planned reoptimizations"""
+
+    @pytest.fixture
+    def optimizer(self):
+        """Create optimizer instance"""
+        return AdaptiveOptimizer(None, None)
+
+    def summaries(self, optimizer, *route_triggers):
+        """Route summaries as _process_triggers builds them, from (route_id, trigger_type, severity)"""
+        summaries = {}
+        for route_id, trigger_type, severity in route_triggers:
+            trigger = ReoptimizationTrigger(
+                trigger_type=trigger_type,
+                severity=severity,
+                affected_routes=[route_id],
+                affected_orders=[],
+                description=f"{trigger_type.value} {severity}",
+                timestamp=datetime.utcnow()
+            )
+            score = severity * optimizer.trigger_weights[trigger_type]
+            summaries.setdefault(route_id, RouteTriggerSummary()).add(score, trigger)
+        return summaries
+
+    def test_ordered_by_priority(self, optimizer):
+        """Routes are planned by highest trigger score, routes in the same bucket in the order found"""
+        summaries = self.summaries(
+            optimizer,
+            (1, TriggerType.DELAY, 0.3),
+            (3, TriggerType.TRAFFIC, 0.9),
+            (4, TriggerType.DELAY, 0.35),
+            (6, TriggerType.NEW_URGENT_ORDER, 0.5),
+        )
+
+        plan = [(route_id, strategy) for route_id, _, strategy in optimizer._plan_reoptimizations(summaries)]
+
+        assert plan == [(3, "global"), (6, "local"), (1, "local"), (4, "local")]
+
+    def test_emergencies_first_then_by_priority(self, optimizer):
+        """Emergency routes come first as found, then the rest by highest trigger score"""
+        summaries = self.summaries(
+            optimizer,
+            (1, TriggerType.DELAY, 0.3),
+            (2, TriggerType.VEHICLE_BREAKDOWN, 1.0),
+            (3, TriggerType.TRAFFIC, 0.9),
+            (4, TriggerType.DELAY, 0.35),
+            (5, TriggerType.DRIVER_UNAVAILABLE, 1.0),
+            (6, TriggerType.NEW_URGENT_ORDER, 0.5),
+        )
+
+        plan = [(route_id, strategy) for route_id, _, strategy in optimizer._plan_reoptimizations(summaries)]
+
+        assert plan == [
+            (2, "emergency"), (5, "emergency"),
+            (3, "global"), (6, "local"),
+            (1, "local"), (4, "local"),  # Same bucket: order found
+        ]
+
+    def test_route_triggers(self, optimizer):
+        """A route's triggers are passed highest score first; many triggers or an emergency decide the strategy"""
+        summaries = self.summaries(
+            optimizer,
+            (1, TriggerType.TRAFFIC, 0.5),
+            (1, TriggerType.DELAY, 0.6),
+            (1, TriggerType.WEATHER, 0.9),
+            (2, TriggerType.DELAY, 0.5),
+            (2, TriggerType.DRIVER_UNAVAILABLE, 0.2),
+        )
+
+        plan = {
+            route_id: ([trigger.trigger_type for trigger in triggers], strategy)
+            for route_id, triggers, strategy in optimizer._plan_reoptimizations(summaries)
+        }
+
+        assert plan[1] == ([TriggerType.DELAY, TriggerType.WEATHER, TriggerType.TRAFFIC], "global")
+        assert plan[2][1] == "emergency"
+
+
+class TestReoptimizationHistory:
+    """Tests for the reoptimization cooldowns and their bounded history"""
+
+    @pytest.fixture
+    def optimizer(self):
+        """Create optimizer instance with a 30 minute cooldown"""
+        return AdaptiveOptimizer(None, None, reoptimization_cooldown_minutes=30)
+
+    def test_cooldown(self, optimizer):
+        """A route is in cooldown for the configured time after its reoptimization"""
+        now = datetime.utcnow()
+        optimizer._record_reoptimization(1, now)
+
+        assert optimizer._is_in_cooldown(1, now + timedelta(minutes=29))
+        assert not optimizer._is_in_cooldown(1, now + timedelta(minutes=30))
+        assert not optimizer._is_in_cooldown(2, now)
+
+    def test_prune_forgets_old_reoptimizations(self, optimizer):
+        """Entries older than twice the cooldown are dropped, newer ones kept"""
+        now = datetime.utcnow()
+        optimizer._record_reoptimization(1, now - timedelta(minutes=90))
+        optimizer._record_reoptimization(2, now - timedelta(minutes=61))
+        optimizer._record_reoptimization(3, now - timedelta(minutes=10))
+
+        optimizer._prune_reoptimization_history(now)
+
+        assert list(optimizer.last_reoptimization) == [3]
+        assert set(optimizer._cooldown_until) == {3}
+
+    def test_history_is_bounded(self, optimizer, monkeypatch):
+        """Past the history size, the least recently reoptimized route is forgotten"""
+        monkeypatch.setattr(adaptive_optimizer, "REOPTIMIZATION_HISTORY_SIZE", 2)
+        now = datetime.utcnow()
+        for minutes, route_id in enumerate((1, 2, 1, 3)):
+            optimizer._record_reoptimization(route_id, now + timedelta(minutes=minutes))
+
+        assert list(optimizer.last_reoptimization) == [1, 3]
+        assert set(optimizer._cooldown_until) == {1, 3}
+
+
+def add_route(db, vehicle_status=VehicleStatus.AVAILABLE, driver_status=DriverStatus.BUSY):
+    """Persist a planned route of three delivery stops, scheduled ahead of time"""
+    now = datetime.utcnow()
+    customer = Customer(name="Customer", phone="+79000000000", address="Address", latitude=55.75, longitude=37.61)
+    vehicle = Vehicle(
+        license_plate="TEST-1", model="Van", vehicle_type=VehicleType.VAN, status=vehicle_status,
+        max_weight_capacity=1000.0, max_volume_capacity=10.0, depot_latitude=55.75, depot_longitude=37.61
+    )
+    driver = Driver(
+        employee_id="E1", first_name="Driver", last_name="Test", phone="+79000000001",
+        license_number="L1", status=driver_status
+    )
+    route = Route(
+        route_number="R1", vehicle=vehicle, driver=driver, status=RouteStatus.PLANNED,
+        planned_date=now, planned_start_time=now, current_stop_index=1
+    )
+    for sequence in (1, 2, 3):
+        order = Order(
+            order_number=f"O{sequence}", customer=customer, delivery_address="Address",
+            delivery_latitude=55.75 + sequence * 0.01, delivery_longitude=37.61,
+            time_window_start=now, time_window_end=now + timedelta(hours=4)
+        )
+        route.route_stops.append(RouteStop(
+            stop_sequence=sequence, order=order, address="Address",
+            latitude=order.delivery_latitude, longitude=order.delivery_longitude,
+            planned_arrival_time=now + timedelta(hours=sequence),
+            planned_departure_time=now + timedelta(hours=sequence, minutes=15)
+        ))
+    db.add(route)
+    db.commit()
+    return route.id
+
+
+class TestReoptimizationCommit:
+    """Tests for the savepoint and commit handling of reoptimization"""
+
+    @pytest.fixture
+    def optimizer(self):
+        """Create optimizer instance without simulated traffic triggers"""
+        optimizer = AdaptiveOptimizer(None, None)
+        optimizer.traffic_threshold = 2.0  # Above the simulated traffic factors
+        return optimizer
+
+    def trigger(self, route_id, trigger_type=TriggerType.DELAY, severity=0.5):
+        return ReoptimizationTrigger(
+            trigger_type=trigger_type,
+            severity=severity,
+            affected_routes=[route_id],
+            affected_orders=[1, 2, 3],
+            description="test",
+            timestamp=datetime.utcnow()
+        )
+
+    def stop_sequences(self, db, route_id):
+        return [stop.stop_sequence for stop in db.get(Route, route_id).route_stops]
+
+    @pytest.mark.asyncio
+    async def test_healthy_route_is_left_alone(self, db, optimizer):
+        """A monitoring cycle over a healthy planned route writes nothing"""
+        add_route(db)
+
+        await optimizer._monitor_routes(db)
+
+        db.expire_all()
+        assert [route.status for route in db.query(Route).all()] == [RouteStatus.PLANNED]
+        assert db.query(Event).count() == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_emergency_is_rolled_back(self, db, optimizer):
+        """A broken-down vehicle with no replacement leaves the route intact and asks for manual help"""
+        route_id = add_route(db, vehicle_status=VehicleStatus.MAINTENANCE)
+
+        await optimizer._monitor_routes(db)
+
+        db.expire_all()
+        route = db.get(Route, route_id)
+        assert route.status == RouteStatus.PLANNED
+        assert self.stop_sequences(db, route_id) == [1, 2, 3]
+        event = db.query(Event).one()
+        assert event.event_type == EventType.MANUAL_INTERVENTION
+        assert event.status == EventStatus.ACTIVE
+        assert event.event_data["unfinished_orders"] == [stop.order_id for stop in route.route_stops]
+        assert route_id not in optimizer.last_reoptimization
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("outcome", ["failure", "exception"])
+    async def test_failed_strategy_writes_are_discarded(self, db, optimizer, outcome):
+        """Changes made by a strategy before failing are rolled back and the failure is recorded"""
+        route_id = add_route(db)
+
+        async def failing_strategy(db, route, triggers):
+            route.status = RouteStatus.CANCELLED
+            route.route_stops[0].stop_sequence = 9
+            db.flush()
+            if outcome == "exception":
+                raise RuntimeError("solver failed")
+            return False
+
+        optimizer._strategies["local"] = failing_strategy
+        await optimizer._process_triggers(db, [self.trigger(route_id)])
+
+        db.expire_all()
+        assert db.get(Route, route_id).status == RouteStatus.PLANNED
+        assert self.stop_sequences(db, route_id) == [1, 2, 3]
+        event = db.query(Event).one()
+        assert event.event_type == EventType.REOPTIMIZATION_TRIGGERED
+        assert event.status == EventStatus.ACTIVE
+        assert route_id not in optimizer.last_reoptimization
+
+    @pytest.mark.asyncio
+    async def test_successful_strategy_is_committed(self, db, optimizer):
+        """A successful strategy commits its writes and starts the route's cooldown"""
+        route_id = add_route(db)
+
+        async def strategy(db, route, triggers):
+            route.optimization_score = 0.9
+            return True
+
+        optimizer._strategies["local"] = strategy
+        await optimizer._process_triggers(db, [self.trigger(route_id)])
+        db.rollback()  # Nothing may be left uncommitted
+
+        route = db.get(Route, route_id)
+        assert route.optimization_score == 0.9
+        assert route.reoptimization_count == 1
+        assert db.query(Event).one().status == EventStatus.RESOLVED
+        assert optimizer._is_in_cooldown(route_id, datetime.utcnow())
@@ -0,0 +1,243 @@
+"""
+Unit tests for caching utilities
+"""
+
+import os
+import pickle
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from app.core.cache import SimpleCache, RedisCache, DistanceMatrixCache, cache_result, _build_cache_key
+
+
+class TestSimpleCache:
+    """Tests for the in-memory LRU cache"""
+
+    @pytest.fixture
+    def clock(self, monkeypatch):
+        """Controllable time.monotonic() for TTL checks"""
+        clock = [1000.0]
+        monkeypatch.setattr("app.core.cache.time.monotonic", lambda: clock[0])
+        return clock
+
+    def test_evicts_least_recently_used(self):
+        """Over maxsize, the entry read or written longest ago is evicted"""
+        cache = SimpleCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+
+        cache.set("c", 3)
+
+        assert list(cache.cache) == ["a", "c"]
+        assert cache.get_many(["a", "b", "c"]) == [1, None, 3]
+
+    def test_overwrite_refreshes_recency(self):
+        """Setting an existing key makes it the most recently used"""
+        cache = SimpleCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.set("a", 10)
+
+        cache.set("c", 3)
+
+        assert cache.get("a") == 10
+        assert cache.get("b") is None
+
+    def test_expired_entry_is_a_miss(self, clock):
+        """An entry is returned until its TTL passes, then dropped on read"""
+        cache = SimpleCache(default_ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=120)
+
+        clock[0] += 60
+        assert cache.get("a") == 1
+
+        clock[0] += 1
+        assert cache.get("a") is None
+        assert "a" not in cache.cache
+        assert cache.get("b") == 2
+
+    def test_cleanup_expired(self, clock):
+        """cleanup_expired drops only expired entries and keeps the LRU order"""
+        cache = SimpleCache(default_ttl_seconds=60)
+        cache.set("a", 1, ttl=120)
+        cache.set("b", 2)
+        cache.set("c", 3, ttl=120)
+
+        clock[0] += 90
+        cache.cleanup_expired()
+
+        assert list(cache.cache) == ["a", "c"]
+
+
+class TestDistanceMatrixCache:
+    """Tests for distance matrices cached by location set"""
+
+    @pytest.fixture
+    def cache(self):
+        return DistanceMatrixCache()
+
+    def test_hit_in_another_order_is_permuted(self, cache):
+        """The same locations in another order hit the cache, rows and columns in the new order"""
+        locations = [(55.75, 37.61), (55.70, 37.50), (55.80, 37.70), (55.70, 37.40)]
+        matrix = np.arange(16, dtype=np.float32).reshape(4, 4)
+        cache.set_matrix(locations, matrix)
+
+        order = [2, 0, 3, 1]
+        cached = cache.get_matrix([locations[i] for i in order])
+
+        assert cache.get_matrix_key(locations) == cache.get_matrix_key([locations[i] for i in order])
+        np.testing.assert_array_equal(cached, matrix[np.ix_(order, order)])
+
+    def test_other_locations_miss(self, cache):
+        """A different location set is a miss"""
+        cache.set_matrix([(55.75, 37.61), (55.70, 37.50)], np.zeros((2, 2)))
+
+        assert cache.get_matrix([(55.75, 37.61), (55.70, 37.51)]) is None
+
+
+class TestCacheResult:
+    """Tests for the cache_result decorator"""
+
+    @pytest.fixture
+    def cached_identity(self):
+        """Cached function returning its argument with its type"""
+        cache = SimpleCache()
+        calls = []
+
+        @cache_result(cache, key_prefix="test")
+        def identity(value):
+            calls.append(value)
+            return (type(value).__name__, value)
+
+        identity.calls = calls
+        return identity
+
+    @pytest.mark.parametrize("first, second", [(-1, -2), (1, 1.0), (1, True), (0, False)])
+    def test_colliding_hashes_get_distinct_keys(self, cached_identity, first, second):
+        """Arguments with equal hash() values are cached separately"""
+        assert cached_identity(first) == (type(first).__name__, first)
+        assert cached_identity(second) == (type(second).__name__, second)
+        assert cached_identity.calls == [first, second]
+
+    def test_repeated_call_is_cached(self, cached_identity):
+        """The same arguments are computed once"""
+        cached_identity(42)
+        cached_identity(42)
+
+        assert cached_identity.calls == [42]
+
+    def test_keyword_order_does_not_matter(self):
+        """Keyword arguments give the same key in any order"""
+        assert _build_cache_key("test", (), {"a": 1, "b": "x"}) == _build_cache_key("test", (), {"b": "x", "a": 1})
+
+    def test_lists_are_keyed_by_content(self, cached_identity):
+        """Unhashable arguments of equal length are still cached separately"""
+        cached_identity([1, 2])
+        cached_identity([3, 4])
+        cached_identity([1, 2])
+
+        assert cached_identity.calls == [[1, 2], [3, 4]]
+
+    def test_key_is_stable_across_processes(self):
+        """Workers with different hash seeds build the same key for a shared Redis"""
+        script = "from app.core.cache import _build_cache_key; print(_build_cache_key('test', ('Moscow', 1.5), {}))"
+        keys = {
+            subprocess.run(
+                [sys.executable, "-c", script], check=True, capture_output=True, text=True,
+                env=dict(os.environ, PYTHONHASHSEED=seed)
+            ).stdout.strip()
+            for seed in ("1", "2")
+        }
+
+        assert keys == {_build_cache_key("test", ("Moscow", 1.5), {})}
+
+
+class FakeRedis:
+    """In-memory stand-in for the redis.Redis calls RedisCache makes"""
+
+    def __init__(self):
+        self.store = {}
+
+    def ping(self):
+        return True
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def setex(self, key, ttl, value):
+        assert isinstance(value, bytes)
+        self.store[key] = value
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def execute(self):
+        return []
+
+
+class TestRedisCache:
+    """Tests for the Redis-backed cache encoding"""
+
+    @pytest.fixture
+    def redis_client(self):
+        return FakeRedis()
+
+    def connect(self, cache, client):
+        cache._client = client
+        return cache
+
+    def test_values_round_trip_as_json(self, redis_client):
+        """Values are stored as JSON bytes and loaded back"""
+        cache = self.connect(RedisCache(prefix="test"), redis_client)
+
+        cache.set("a", {"level": 3})
+        cache.set_many({"b": 1.5, "c": [1, 2]})
+
+        assert redis_client.store["test:a"] == b'{"level":3}'
+        assert cache.get("a") == {"level": 3}
+        assert cache.get_many(["b", "c", "missing"]) == [1.5, [1, 2], None]
+
+    def test_pickled_values_are_not_loaded(self, redis_client):
+        """A pickle written to Redis by someone else is a miss, never unpickled"""
+        cache = self.connect(RedisCache(prefix="test"), redis_client)
+        redis_client.store["test:a"] = pickle.dumps(Exploit())
+
+        assert cache.get("a") is None
+        assert cache.get_many(["a"]) == [None]
+
+    @pytest.mark.asyncio
+    async def test_async_batch_round_trip(self, redis_client):
+        """aget_many/aset_many go through the same encoding"""
+        cache = self.connect(RedisCache(prefix="test"), redis_client)
+
+        await cache.aset_many({"a": 1.25, "b": 2})
+
+        assert await cache.aget_many(["a", "b", "c"]) == [1.25, 2, None]
+        assert cache.get("a") == 1.25
+
+    def test_distance_matrix_stored_as_raw_bytes(self, redis_client):
+        """Matrices are stored as shape plus float32 data and come back intact"""
+        cache = self.connect(DistanceMatrixCache(), redis_client)
+        locations = [(55.75, 37.61), (55.70, 37.50), (55.80, 37.70)]
+        matrix = np.arange(9, dtype=np.float64).reshape(3, 3)
+
+        cache.set_matrix(locations, matrix)
+
+        (raw,) = redis_client.store.values()
+        assert len(raw) == 8 + 9 * 4
+        np.testing.assert_array_equal(cache.get_matrix(locations), matrix)
+
+
+class Exploit:
+    """Object whose unpickling would run code"""
+
+    def __reduce__(self):
+        return (exec, ("raise SystemExit('unpickled')",))
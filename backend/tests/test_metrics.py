@@ -0,0 +1,71 @@
+"""
+Unit tests for the business metrics collector
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from app.core.metrics import BusinessMetricsCollector
+from app.models import Customer, Driver, Order, Vehicle
+from app.models.driver import DriverStatus
+from app.models.order import OrderStatus
+from app.models.vehicle import VehicleStatus, VehicleType
+
+
+def samples(collector):
+    """Gauge values of the last snapshot as {family: {status label: value}}"""
+    return {
+        family.name: {sample.labels['status']: sample.value for sample in family.samples}
+        for family in collector.collect()
+    }
+
+
+class TestBusinessMetricsCollector:
+    """Tests for the UNION ALL status counts"""
+
+    def populate(self, db):
+        now = datetime.utcnow()
+        customer = Customer(name="Customer", phone="+79000000000", address="Address", latitude=55.75, longitude=37.61)
+        for number, status in enumerate((OrderStatus.PENDING, OrderStatus.PENDING, OrderStatus.DELIVERED)):
+            db.add(Order(
+                order_number=f"O{number}", customer=customer, delivery_address="Address",
+                delivery_latitude=55.75, delivery_longitude=37.61, status=status,
+                time_window_start=now, time_window_end=now + timedelta(hours=4)
+            ))
+        for number, status in enumerate((VehicleStatus.AVAILABLE, VehicleStatus.MAINTENANCE)):
+            db.add(Vehicle(
+                license_plate=f"TEST-{number}", model="Van", vehicle_type=VehicleType.VAN, status=status,
+                max_weight_capacity=1000.0, max_volume_capacity=10.0, depot_latitude=55.75, depot_longitude=37.61
+            ))
+        db.add(Driver(
+            employee_id="E1", first_name="Driver", last_name="Test", phone="+79000000001",
+            license_number="L1", status=DriverStatus.BUSY
+        ))
+        db.commit()
+
+    def test_counts_are_labelled_by_status_value(self, db):
+        """Counts of every table land on the label of their enum member"""
+        self.populate(db)
+        collector = BusinessMetricsCollector(sessionmaker(bind=db.get_bind()))
+
+        collector.refresh()
+        metrics = samples(collector)
+
+        assert metrics['orders_total'][OrderStatus.PENDING.value] == 2
+        assert metrics['orders_total'][OrderStatus.DELIVERED.value] == 1
+        assert metrics['vehicles_total'][VehicleStatus.AVAILABLE.value] == 1
+        assert metrics['vehicles_total'][VehicleStatus.MAINTENANCE.value] == 1
+        assert metrics['drivers_total'][DriverStatus.BUSY.value] == 1
+        assert metrics['drivers_total'][DriverStatus.AVAILABLE.value] == 0
+
+    def test_every_status_is_reported(self, db):
+        """Statuses without rows are exported as zero"""
+        collector = BusinessMetricsCollector(sessionmaker(bind=db.get_bind()))
+
+        collector.refresh()
+        metrics = samples(collector)
+
+        assert metrics['orders_total'] == {status.value: 0 for status in OrderStatus}
+        assert metrics['vehicles_total'] == {status.value: 0 for status in VehicleStatus}
+        assert metrics['drivers_total'] == {status.value: 0 for status in DriverStatus}
@@ -0,0 +1,295 @@
+"""
+Unit tests for model types and denormalized aggregates
+"""
+
+import itertools
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.exc import StatementError
+
+from app.models import Customer, Driver, Order, OrderItem, Product, Route, Vehicle
+from app.models.enum_type import SmallIntEnum
+from app.models.route import RouteStatus
+from app.models.vehicle import VehicleType
+
+_sku_numbers = itertools.count(1)
+
+
+def add_driver(db, number=1):
+    """Add a driver with identifiers unique per number"""
+    driver = Driver(
+        employee_id=f"E{number}", first_name="Driver", last_name="Test",
+        phone=f"+7900000000{number}", license_number=f"L{number}"
+    )
+    db.add(driver)
+    return driver
+
+
+def add_route(db, driver, status=RouteStatus.PLANNED, total_duration=120):
+    """Persist a route of the driver with a vehicle of its own"""
+    now = datetime.utcnow()
+    vehicle = Vehicle(
+        license_plate=f"TEST-{driver.employee_id}", model="Van", vehicle_type=VehicleType.VAN,
+        max_weight_capacity=1000.0, max_volume_capacity=10.0, depot_latitude=55.75, depot_longitude=37.61
+    )
+    route = Route(
+        route_number=f"R-{driver.employee_id}", vehicle=vehicle, driver=driver, status=status,
+        total_duration=total_duration, planned_date=now, planned_start_time=now
+    )
+    db.add(route)
+    db.commit()
+    return route
+
+
+def add_order(db, number=1):
+    """Persist an order of a new customer"""
+    now = datetime.utcnow()
+    order = Order(
+        order_number=f"O{number}", delivery_address="Address",
+        delivery_latitude=55.75, delivery_longitude=37.61,
+        time_window_start=now, time_window_end=now + timedelta(hours=4),
+        customer=Customer(name="Customer", phone="+79000000000", address="Address", latitude=55.75, longitude=37.61)
+    )
+    db.add(order)
+    db.commit()
+    return order
+
+
+def make_item(order, quantity=2, final_price=100.0, weight=1.5, volume=0.01, fragile=False, temperature_controlled=False):
+    """Item of the order for a new product, not yet added to the session"""
+    product = Product(sku=f"SKU-{next(_sku_numbers)}", name="Product", weight=weight)
+    return OrderItem(
+        order=order, product=product, product_name=product.name, product_sku=product.sku,
+        quantity=quantity, unit_price=final_price / quantity, final_price=final_price,
+        product_weight=weight, product_volume=volume,
+        fragile=fragile, temperature_controlled=temperature_controlled
+    )
+
+
+class TestSmallIntEnum:
+    """Tests for enums stored as SMALLINT ordinals"""
+
+    @pytest.fixture
+    def column_type(self):
+        return SmallIntEnum(RouteStatus)
+
+    @pytest.mark.parametrize("value", [RouteStatus.ACTIVE, "ACTIVE", "active"])
+    def test_bind_accepts_members_names_and_values(self, column_type, value):
+        """Members, their names and their values bind to the ordinal"""
+        assert column_type.process_bind_param(value, None) == 1
+
+    @pytest.mark.parametrize("value", ["disrupted", -1, 1.5, object()])
+    def test_bind_rejects_unknown_values(self, column_type, value):
+        """Anything that is not a member raises instead of writing a bad ordinal"""
+        with pytest.raises(LookupError):
+            column_type.process_bind_param(value, None)
+
+    def test_load_rejects_out_of_range_ordinals(self, column_type):
+        """An ordinal with no member raises on load"""
+        assert column_type.process_result_value(4, None) == RouteStatus.OPTIMIZING
+        with pytest.raises(LookupError):
+            column_type.process_result_value(len(RouteStatus), None)
+
+    def test_round_trip(self, db):
+        """Members are stored as ordinals and loaded back as members"""
+        route = add_route(db, add_driver(db), status=RouteStatus.COMPLETED)
+
+        assert db.execute(text("SELECT status FROM routes")).scalar() == 2
+        db.expire_all()
+        assert db.get(Route, route.id).status is RouteStatus.COMPLETED
+        assert db.query(Route).filter(Route.status == "completed").count() == 1
+
+    def test_unknown_value_in_filter_raises(self, db):
+        """A filter on an unknown value fails instead of silently matching nothing"""
+        with pytest.raises(StatementError) as error:
+            db.query(Route).filter(Route.status == "disrupted").all()
+
+        assert isinstance(error.value.orig, LookupError)
+
+
+class TestDriverRouteAggregates:
+    """Tests for the driver counters kept by the Route mapper events"""
+
+    def counters(self, db, driver):
+        db.refresh(driver)
+        return driver.active_routes_count, driver.active_total_duration, driver.completed_routes
+
+    def test_insert_counts_active_route(self, db):
+        """A new planned route adds to the driver's active load"""
+        driver = add_driver(db)
+        add_route(db, driver, total_duration=120)
+
+        assert self.counters(db, driver) == (1, 120, 0)
+
+    def test_status_and_duration_changes(self, db):
+        """Duration changes shift the active load; completion moves the route to completed"""
+        driver = add_driver(db)
+        route = add_route(db, driver, total_duration=120)
+
+        route.total_duration = 90
+        db.commit()
+        assert self.counters(db, driver) == (1, 90, 0)
+
+        route.status = RouteStatus.COMPLETED
+        db.commit()
+        assert self.counters(db, driver) == (0, 0, 1)
+
+    def test_update_of_expired_route(self, db):
+        """The previous values are loaded for an expired route, so the old contribution is removed"""
+        driver = add_driver(db)
+        route = add_route(db, driver, total_duration=120)
+        db.expire_all()
+
+        route.status = RouteStatus.CANCELLED
+        db.commit()
+
+        assert self.counters(db, driver) == (0, 0, 0)
+
+    def test_reassignment_moves_the_route(self, db):
+        """Reassigning a route moves its contribution to the new driver"""
+        driver, other = add_driver(db, 1), add_driver(db, 2)
+        route = add_route(db, driver, total_duration=120)
+
+        route.driver = other
+        db.commit()
+
+        assert self.counters(db, driver) == (0, 0, 0)
+        assert self.counters(db, other) == (1, 120, 0)
+
+    def test_delete_removes_the_route(self, db):
+        """Deleting a route removes its contribution"""
+        driver = add_driver(db)
+        route = add_route(db, driver, status=RouteStatus.COMPLETED)
+
+        db.delete(route)
+        db.commit()
+
+        assert self.counters(db, driver) == (0, 0, 0)
+
+
+class TestOrderTotals:
+    """Tests for the order totals kept by the OrderItem mapper events"""
+
+    def totals(self, order):
+        return order.total_order_value, order.total_order_weight, order.item_count
+
+    def test_items_add_to_totals(self, db):
+        """Inserted items add their value, weight and quantity"""
+        order = add_order(db)
+        db.add_all([
+            make_item(order, quantity=2, final_price=100.0, weight=1.5),
+            make_item(order, quantity=1, final_price=50.0, weight=3.0),
+        ])
+        db.commit()
+
+        assert self.totals(order) == (150.0, 6.0, 3)
+        assert order.total_order_volume == pytest.approx(0.03)
+
+    def test_update_applies_the_difference(self, db):
+        """Changing an item shifts the totals by the change only"""
+        order = add_order(db)
+        item = make_item(order, quantity=2, final_price=100.0, weight=1.5)
+        db.add(item)
+        db.commit()
+
+        item.quantity = 4
+        item.final_price = 180.0
+        db.commit()
+
+        assert self.totals(order) == (180.0, 6.0, 4)
+
+    def test_moved_item_changes_both_orders(self, db):
+        """An item moved to another order leaves the old totals and joins the new ones"""
+        order, other = add_order(db, 1), add_order(db, 2)
+        item = make_item(order, quantity=2, final_price=100.0)
+        db.add(item)
+        db.commit()
+
+        item.order = other
+        db.commit()
+
+        assert self.totals(order) == (0.0, 0.0, 0)
+        assert self.totals(other) == (100.0, 3.0, 2)
+
+    def test_delete_removes_the_item(self, db):
+        """Deleting an item subtracts its contribution"""
+        order = add_order(db)
+        item = make_item(order)
+        db.add(item)
+        db.commit()
+
+        db.delete(item)
+        db.commit()
+
+        assert self.totals(order) == (0.0, 0.0, 0)
+
+
+class TestOrderSpecialHandling:
+    """Tests for the fragile and temperature-controlled item counts"""
+
+    def counts(self, order):
+        return order.fragile_items, order.temperature_controlled_items
+
+    def test_flags_are_counted(self, db):
+        """Each flagged item is counted once; clearing the flag removes it from the count"""
+        order = add_order(db)
+        fragile = make_item(order, quantity=2, fragile=True)
+        db.add_all([fragile, make_item(order, quantity=1, temperature_controlled=True)])
+        db.commit()
+
+        assert self.counts(order) == (1, 1)
+        assert order.has_fragile_items() and order.has_temperature_controlled_items()
+
+        fragile.fragile = False
+        db.commit()
+
+        assert self.counts(order) == (0, 1)
+        assert not order.has_fragile_items()
+
+    def test_moved_item_takes_its_flags(self, db):
+        """An item moved to another order moves its handling counts too"""
+        order, other = add_order(db, 1), add_order(db, 2)
+        item = make_item(order, temperature_controlled=True)
+        db.add(item)
+        db.commit()
+
+        item.order = other
+        db.commit()
+
+        assert self.counts(order) == (0, 0)
+        assert self.counts(other) == (0, 1)
+
+    def test_filters_in_sql(self, db):
+        """has_fragile and has_temperature_controlled filter on the persisted counts"""
+        fragile, chilled = add_order(db, 1), add_order(db, 2)
+        db.add_all([make_item(fragile, fragile=True), make_item(chilled, temperature_controlled=True)])
+        db.commit()
+
+        assert db.query(Order.order_number).filter(Order.has_fragile).all() == [("O1",)]
+        assert db.query(Order.order_number).filter(Order.has_temperature_controlled).all() == [("O2",)]
+
+
+class TestOrderBulkArrays:
+    """Tests for loading solver inputs as NumPy arrays"""
+
+    def test_arrays_follow_order_ids(self, db):
+        """Requested orders come back as typed arrays ordered by id; others are left out"""
+        first, second, skipped = add_order(db, 1), add_order(db, 2), add_order(db, 3)
+        second.weight = 12.5
+        db.commit()
+
+        arrays = Order.bulk_arrays(db, [second.id, first.id])
+
+        np.testing.assert_array_equal(arrays["id"], [first.id, second.id])
+        np.testing.assert_array_equal(arrays["weight"], np.array([0.0, 12.5], dtype=np.float32))
+        assert arrays["latitude"].dtype == np.float32
+        assert arrays["time_window_end"][0] - arrays["time_window_start"][0] == 4 * 3600
+        assert skipped.id not in arrays["id"]
+
+    def test_no_orders(self, db):
+        """An empty id list gives empty arrays"""
+        arrays = Order.bulk_arrays(db, [])
+
+        assert all(len(values) == 0 for values in arrays.values())
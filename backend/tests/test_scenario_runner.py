@@ -0,0 +1,155 @@
+"""
+Unit tests for the test scenario runner
+"""
+
+import asyncio
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1 import testing
+from app.api.v1.testing import ScenarioRunner
+
+
+class TestScenarioRunner:
+    """Tests for bounded scenario execution"""
+
+    @pytest.mark.asyncio
+    async def test_submit_bounds_concurrency(self):
+        """No more than max_concurrency submitted scenarios run at once"""
+        runner = ScenarioRunner(max_concurrency=2)
+        running = 0
+        peak = 0
+
+        async def scenario():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        tasks = [runner.submit(str(i), scenario) for i in range(6)]
+        assert runner.active_tasks == 6
+
+        await asyncio.gather(*tasks)
+
+        assert peak == 2
+        assert runner.active_tasks == 0
+
+    @pytest.mark.asyncio
+    async def test_spawned_tasks_do_not_take_slots(self):
+        """Long-running spawned tasks (countdowns) leave the slots to scenarios"""
+        runner = ScenarioRunner(max_concurrency=1)
+        stop = asyncio.Event()
+
+        countdowns = [runner.spawn(f"countdown:{i}", stop.wait()) for i in range(3)]
+        scenario = runner.submit("0", lambda: asyncio.sleep(0, result="done"))
+
+        assert await asyncio.wait_for(scenario, timeout=1) == "done"
+        assert runner.active_tasks == 3
+
+        stop.set()
+        await asyncio.gather(*countdowns)
+        assert runner.active_tasks == 0
+
+    @pytest.mark.asyncio
+    async def test_shutdown_cancels_unfinished_tasks(self):
+        """Tasks still running after the shutdown timeout are cancelled"""
+        runner = ScenarioRunner(max_concurrency=1, shutdown_timeout_seconds=0.01)
+        countdown = runner.spawn("countdown:0", asyncio.sleep(10))
+        queued = runner.submit("0", lambda: asyncio.sleep(10))
+
+        await runner.shutdown()
+
+        assert countdown.cancelled()
+        assert queued.cancelled()
+
+
+class TestScenarioExecution:
+    """Tests for the slot and session lifetime of a running scenario"""
+
+    @pytest.fixture
+    def runner(self, monkeypatch):
+        """Scenario runner with one slot and recorded DB sessions"""
+        runner = ScenarioRunner(max_concurrency=1, shutdown_timeout_seconds=0.01)
+        sessions = []
+
+        def session_factory():
+            session = Mock()
+            sessions.append(session)
+            return session
+
+        monkeypatch.setattr(testing, "scenario_runner", runner)
+        monkeypatch.setattr(testing, "SessionLocal", session_factory)
+        monkeypatch.setattr(testing, "_collect_system_metrics", AsyncMock(return_value={"total_routes": 1}))
+        monkeypatch.setattr(testing, "_calculate_performance_impact", Mock(return_value={}))
+        runner.sessions = sessions
+        return runner
+
+    def start(self, runner, scenario_id, duration_minutes):
+        testing.active_scenarios[scenario_id] = testing.TestResultState(
+            scenario_id=scenario_id, start_time=datetime.now(), status="running", metrics_before={}
+        )
+        scenario = testing.TestScenario(name="test", parameters=[], duration_minutes=duration_minutes)
+        return runner.submit(scenario_id, lambda: testing._execute_test_scenario_in_session(scenario_id, scenario))
+
+    @pytest.mark.asyncio
+    async def test_waiting_releases_slot_and_session(self, runner):
+        """While the scenario duration runs, its slot is free and its session is closed"""
+        try:
+            await asyncio.wait_for(self.start(runner, "slow", duration_minutes=60), timeout=1)
+            second = self.start(runner, "next", duration_minutes=60)
+            await asyncio.wait_for(second, timeout=1)
+
+            assert all(session.close.called for session in runner.sessions)
+            assert runner.active_tasks == 2  # Both finish steps are waiting
+            assert testing.active_scenarios["slow"].status == "running"
+        finally:
+            await runner.shutdown()
+            testing.active_scenarios.pop("slow", None)
+            testing.active_scenarios.pop("next", None)
+
+    @pytest.mark.asyncio
+    async def test_finish_uses_a_new_session(self, runner):
+        """Final metrics are collected in a session opened after the wait"""
+        try:
+            await self.start(runner, "quick", duration_minutes=0)
+            await asyncio.gather(*runner._tasks)
+
+            result = testing.active_scenarios["quick"]
+            assert result.status == "completed"
+            assert result.metrics_after == {"total_routes": 1}
+            first, finish = runner.sessions
+            assert first is not finish and finish.close.called
+        finally:
+            testing.active_scenarios.pop("quick", None)
+
+
+class TestModifyParameters:
+    """Tests for the manually validated parameter batch body"""
+
+    @pytest.fixture
+    def app(self):
+        app = FastAPI()
+        app.include_router(testing.router, prefix="/testing")
+        return app
+
+    def test_validation_errors_point_into_the_body(self, app):
+        """Schema errors are 422 with loc starting at "body", like FastAPI's own"""
+        response = TestClient(app).post("/testing/parameters/modify", json=[{"parameter_type": "traffic_delay"}])
+
+        assert response.status_code == 422
+        assert {tuple(error["loc"]) for error in response.json()["detail"]} == {
+            ("body", 0, "target_id"), ("body", 0, "value")
+        }
+
+    def test_body_schema_is_documented(self, app):
+        """The request body still appears in the OpenAPI schema"""
+        operation = app.openapi()["paths"]["/testing/parameters/modify"]["post"]
+        schema = operation["requestBody"]["content"]["application/json"]["schema"]
+
+        assert schema["type"] == "array"
+        assert {"parameter_type", "target_id", "value"} <= set(schema["items"]["required"])
@@ -7,7 +7,7 @@ import numpy as np
 from datetime import datetime, timedelta
 from unittest.mock import Mock, patch
 
-from app.optimization.vrptw_solver import VRPTWSolver, SAAVObjective
+from app.optimization.vrptw_solver import VRPTWSolver, SAAVObjective, haversine_distances
 from app.core.exceptions import (
     InvalidInputException,
     NoFeasibleSolutionException,
@@ -173,6 +173,53 @@ class TestVRPTWSolver:
         
         np.testing.assert_array_equal(matrix1, matrix2)
     
+    def test_build_matrices_cache_hit_in_other_order(self, mock_orders):
+        """Test cached matrix is returned in the order of the new locations"""
+        first = VRPTWSolver()
+        first.orders = mock_orders
+        first.use_cache = True
+        first._build_matrices()
+        
+        second = VRPTWSolver()
+        second.orders = list(reversed(mock_orders))
+        second.use_cache = True
+        with patch('app.optimization.vrptw_solver.haversine_matrix') as mock_matrix:
+            second._build_matrices()
+        
+        mock_matrix.assert_not_called()
+        order = [0] + list(range(len(mock_orders), 0, -1))  # Depot stays first
+        np.testing.assert_array_equal(
+            second.distance_matrix, first.distance_matrix[np.ix_(order, order)]
+        )
+    
+    def test_build_matrices_extends_previous(self, solver, mock_orders):
+        """Test only the rows of new locations are computed on a rebuild"""
+        solver.use_cache = False
+        solver.orders = mock_orders[:3]
+        solver._build_matrices()
+        previous = solver.distance_matrix.copy()
+        
+        new_order = Mock(delivery_latitude=55.9, delivery_longitude=37.9)
+        solver.orders = [mock_orders[2], mock_orders[0], new_order]
+        with patch(
+            'app.optimization.vrptw_solver.haversine_distances',
+            wraps=haversine_distances
+        ) as mock_distances:
+            solver._build_matrices()
+        
+        # One new location: a single 1 x n block is computed
+        (args, _), = mock_distances.call_args_list
+        assert len(args[0]) == 1
+        
+        known = [0, 3, 1]  # Depot, mock_orders[2], mock_orders[0] in the previous matrix
+        np.testing.assert_array_equal(solver.distance_matrix[:3, :3], previous[np.ix_(known, known)])
+        
+        fresh = VRPTWSolver()
+        fresh.use_cache = False
+        fresh.orders = solver.orders
+        fresh._build_matrices()
+        np.testing.assert_allclose(solver.distance_matrix, fresh.distance_matrix, rtol=1e-6)
+    
     def test_build_matrices_shape(self, solver, mock_orders):
         """Test that distance matrix has correct shape"""
         solver.orders = mock_orders
@@ -236,6 +283,13 @@ class TestVRPTWSolver:
         with pytest.raises(InvalidInputException):
             solver.solve_static_routes([], mock_vehicles, mock_drivers)
     
+    def test_solve_static_routes_holds_lock(self, solver, mock_orders, mock_vehicles, mock_drivers):
+        """Solves from worker threads do not interleave on the shared solver state"""
+        with patch.object(solver, '_solve_static_routes', side_effect=lambda *args: solver._solve_lock.locked()):
+            assert solver.solve_static_routes(mock_orders, mock_vehicles, mock_drivers) is True
+        
+        assert not solver._solve_lock.locked()
+    
     def test_adaptation_count_increment(self, solver):
         """Test that adaptation count increments properly"""
         initial_count = solver.adaptation_count
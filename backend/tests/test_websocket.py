@@ -0,0 +1,123 @@
+"""
+Unit tests for the WebSocket connection manager
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+from app.api.websocket import ConnectionManager
+
+
+def make_websocket():
+    """Mock WebSocket accepting connections and frames"""
+    websocket = Mock()
+    websocket.accept = AsyncMock()
+    websocket.send_bytes = AsyncMock()
+    websocket.close = AsyncMock()
+    return websocket
+
+
+async def connect_all():
+    """Manager with one connection per type, in connection order"""
+    manager = ConnectionManager()
+    websockets = {}
+    for connection_type in ("routes", "events", "eta", "monitoring"):
+        websockets[connection_type] = make_websocket()
+        await manager.connect(websockets[connection_type], connection_type)
+    return manager, websockets
+
+
+class TestConnectionManager:
+    """Tests for connection bookkeeping"""
+
+    def assert_consistent(self, manager):
+        """Metadata arrays and the index describe the same connections"""
+        assert len(manager._websockets) == len(manager._type_codes) == len(manager._connected_at)
+        assert manager._index == {id(websocket): i for i, websocket in enumerate(manager._websockets)}
+        assert set(manager._websockets) == manager.active_connections["all"]
+
+    @pytest.mark.asyncio
+    async def test_disconnect_moves_last_connection_into_the_slot(self):
+        """Removing a connection swaps the last one into its slot, keeping its metadata"""
+        manager, websockets = await connect_all()
+        monitoring_connected_at = manager._connected_at[3]
+
+        manager.disconnect(websockets["events"])
+
+        assert manager._websockets == [websockets["routes"], websockets["monitoring"], websockets["eta"]]
+        assert [manager._type_names[code] for code in manager._type_codes] == ["routes", "monitoring", "eta"]
+        assert manager._connected_at[1] == monitoring_connected_at
+        assert websockets["events"] not in manager.active_connections["events"]
+        self.assert_consistent(manager)
+
+    @pytest.mark.asyncio
+    async def test_disconnect_last_and_unknown(self):
+        """Removing the last connection pops it; unknown or repeated removals change nothing"""
+        manager, websockets = await connect_all()
+
+        manager.disconnect(websockets["monitoring"])
+        manager.disconnect(websockets["monitoring"])
+        manager.disconnect(make_websocket())
+
+        assert manager._websockets == [websockets["routes"], websockets["events"], websockets["eta"]]
+        self.assert_consistent(manager)
+
+    @pytest.mark.asyncio
+    async def test_stats_after_disconnects(self):
+        """Per-type counts reflect the remaining connections"""
+        manager, websockets = await connect_all()
+
+        manager.disconnect(websockets["routes"])
+        manager.disconnect(websockets["eta"])
+        stats = manager.get_connection_stats()
+
+        assert stats["total_connections"] == 2
+        assert stats["connections_by_type"] == {"routes": 0, "events": 1, "eta": 0, "monitoring": 1}
+        assert sorted(entry["type"] for entry in stats["connection_metadata"]) == ["events", "monitoring"]
+
+
+class TestBroadcast:
+    """Tests for dropping clients that fail to take a frame"""
+
+    @pytest.mark.asyncio
+    async def test_failed_send_disconnects_and_closes(self):
+        """A client that fails to take a broadcast frame is removed and closed"""
+        manager, websockets = await connect_all()
+        websockets["eta"].send_bytes.side_effect = ConnectionError("closed")
+
+        await manager.broadcast_to_all({"type": "ping"})
+
+        assert websockets["eta"] not in manager.active_connections["all"]
+        websockets["eta"].close.assert_awaited_once()
+        websockets["routes"].send_bytes.assert_awaited_once()
+        websockets["routes"].close.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_slow_client_is_closed(self, monkeypatch):
+        """A send that exceeds the timeout drops and closes the client"""
+        monkeypatch.setattr(ConnectionManager, "SEND_TIMEOUT_SECONDS", 0.01)
+        manager, websockets = await connect_all()
+
+        async def stuck_send(payload):
+            await asyncio.sleep(1)
+
+        websockets["events"].send_bytes.side_effect = stuck_send
+
+        await manager.broadcast_to_all({"type": "ping"})
+
+        assert websockets["events"] not in manager.active_connections["all"]
+        websockets["events"].close.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_close_errors_are_ignored(self):
+        """A socket that cannot be closed either is still removed"""
+        manager, websockets = await connect_all()
+        websockets["routes"].send_bytes.side_effect = ConnectionError("closed")
+        websockets["routes"].close.side_effect = RuntimeError("already closed")
+
+        await manager.send_personal_message({"type": "ping"}, websockets["routes"])
+
+        assert websockets["routes"] not in manager.active_connections["all"]
+        websockets["routes"].close.assert_awaited_once()
@@ -20,6 +20,8 @@ interface WebSocketContextType {
 
 const WebSocketContext = createContext<WebSocketContextType | null>(null);
 
+const textDecoder = new TextDecoder();
+
 interface WebSocketProviderProps {
   children: ReactNode;
 }
@@ -44,6 +46,8 @@ export const WebSocketProvider = ({ children }: WebSocketProviderProps) => {
 
     try {
       wsRef.current = new WebSocket(fullUrl);
+      // Сервер отправляет JSON в бинарных кадрах (UTF-8)
+      wsRef.current.binaryType = 'arraybuffer';
 
       wsRef.current.onopen = () => {
         console.log('WebSocket connected to:', fullUrl);
@@ -58,7 +62,8 @@ export const WebSocketProvider = ({ children }: WebSocketProviderProps) => {
 
       wsRef.current.onmessage = (event) => {
         try {
-          const message: WebSocketMessage = JSON.parse(event.data);
+          const raw = typeof event.data === 'string' ? event.data : textDecoder.decode(event.data);
+          const message: WebSocketMessage = JSON.parse(raw);
           setLastMessage(message);
           
           const subscribers = subscribersRef.current.get(message.type);